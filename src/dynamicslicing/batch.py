@@ -0,0 +1,161 @@
+import argparse
+import json
+import os
+import signal
+from multiprocessing import Pool
+from os import path
+from tempfile import TemporaryDirectory
+from time import perf_counter
+from typing import Any, Dict, List
+from dynamicslicing.program_cache import ProgramCache
+from dynamicslicing.session import AnalysisSession
+
+PROGRAM_FILE_NAME = "program.py"
+
+# The session of a pool worker, set by initialize_worker
+worker_session: AnalysisSession = None
+
+
+def find_programs(directory: str) -> List[str]:
+    """ This method finds the programs of a directory which is shaped like tests/milestone3: every sub-directory
+    with a program.py file is a program
+
+    Parameters
+    ----------
+    directory: str
+        The directory to search
+
+    Returns
+    ----------
+    List[str]
+        The absolute paths of the program.py files, sorted
+    """
+    programs: List[str] = []
+    for root, _, files in os.walk(path.abspath(directory)):
+        if PROGRAM_FILE_NAME in files:
+            programs.append(path.join(root, PROGRAM_FILE_NAME))
+    return sorted(programs)
+
+
+def initialize_worker(cache_directory: str) -> None:
+    """ This method prepares a pool worker: its session, which keeps dynapyt warm for all programs of the worker,
+    reads the programs from the program cache
+
+    Parameters
+    ----------
+    cache_directory: str
+        The directory of the program cache
+
+    Returns
+    ----------
+    None
+    """
+    global worker_session
+    # Pool.terminate stops the workers with SIGTERM, a handler inherited from the parent, e.g. the end_execution of
+    # dynapyt, would keep them alive
+    signal.signal(signal.SIGTERM, signal.SIG_DFL)
+    worker_session = AnalysisSession(cache=ProgramCache(cache_directory))
+
+
+def instrument_program_file(program_path: str) -> Dict[str, Any]:
+    """ This method makes sure that the program cache has an entry for a program. It runs in a pool worker
+
+    Parameters
+    ----------
+    program_path: str
+        The absolute path to the program
+
+    Returns
+    ----------
+    Dict[str, Any]
+        The seconds spent, and the error if the program could not be instrumented
+    """
+    start = perf_counter()
+    try:
+        worker_session.finder.cache.get(program_path, worker_session.finder.selected_hooks)
+    except (OSError, ImportError) as error:
+        return {"seconds": perf_counter() - start, "error": f"{type(error).__name__}: {error}"}
+    return {"seconds": perf_counter() - start}
+
+
+def slice_program_file(program_path: str) -> Dict[str, Any]:
+    """ This method slices a program with the line of its slicing comment as criterion. It runs in a pool worker,
+    which only reads the program cache: the entries were written before
+
+    Parameters
+    ----------
+    program_path: str
+        The absolute path to the program
+
+    Returns
+    ----------
+    Dict[str, Any]
+        The response of the session and the seconds spent
+    """
+    start = perf_counter()
+    result = worker_session.run(program_path)
+    result["seconds"] = perf_counter() - start
+    return result
+
+
+def slice_programs(program_paths: List[str], processes: int = None, cache_directory: str = None) -> Dict[str, Any]:
+    """ This method slices many programs in parallel in a process pool. Every worker has its own dynapyt runtime,
+    which is reset in place between its programs.
+    The programs are instrumented into the program cache first, then they are sliced by workers which only read
+    from it
+
+    Parameters
+    ----------
+    program_paths: List[str]
+        The paths to the programs
+
+    processes: int
+        The number of worker processes, the number of CPUs if None
+
+    cache_directory: str
+        The directory of the program cache, a temporary directory if None
+
+    Returns
+    ----------
+    Dict[str, Any]
+        The report: the number of processes, the total seconds and, for every program, its slices, sliced code, the
+        seconds spent to instrument and to slice it, or its error
+    """
+    program_paths = [path.abspath(program_path) for program_path in program_paths]
+    start = perf_counter()
+    with TemporaryDirectory() as temporary_directory:
+        directory = cache_directory if cache_directory is not None else temporary_directory
+        with Pool(processes, initializer=initialize_worker, initargs=(directory, )) as pool:
+            instrumentations = pool.map(instrument_program_file, program_paths)
+            sliceable = [program_path for program_path, instrumentation in zip(program_paths, instrumentations)
+                         if "error" not in instrumentation]
+            slices = dict(zip(sliceable, pool.map(slice_program_file, sliceable)))
+    programs: List[Dict[str, Any]] = []
+    for program_path, instrumentation in zip(program_paths, instrumentations):
+        result = slices.get(program_path, {"status": "error", "error": instrumentation.get("error")})
+        seconds = {"instrument": instrumentation["seconds"], "slice": result.pop("seconds", None)}
+        programs.append(dict(program=program_path, seconds=seconds, **result))
+    return {"processes": processes if processes is not None else os.cpu_count(),
+            "seconds": perf_counter() - start, "programs": programs}
+
+
+def main() -> None:
+    """ This method runs the batch slicer from the command line and writes the JSON report
+
+    Returns
+    ----------
+    None
+    """
+    parser = argparse.ArgumentParser(description="Slice all programs of a directory in parallel")
+    parser.add_argument("directory", help="The directory whose sub-directories contain program.py files")
+    parser.add_argument("--processes", type=int, default=None, help="The number of worker processes")
+    parser.add_argument("--cache", default=None, help="The directory of the persistent program cache")
+    parser.add_argument("--report", default="report.json", help="The path of the JSON report")
+    arguments = parser.parse_args()
+    report = slice_programs(find_programs(arguments.directory), arguments.processes, arguments.cache)
+    with open(arguments.report, "w") as file:
+        json.dump(report, file, indent=2)
+
+
+if __name__ == "__main__":
+    main()
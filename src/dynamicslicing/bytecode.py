@@ -0,0 +1,474 @@
+import ast
+import dis
+import sys
+from collections import namedtuple
+from types import CodeType
+from typing import Dict, List, Optional, Set, Tuple
+
+BYTECODE_POSITIONS_AVAILABLE = sys.version_info >= (3, 11)
+
+Span = Tuple[int, int, int, int]
+Store = namedtuple("Store", ["variable", "attribute", "index"])
+Operation = namedtuple("Operation", ["span", "kind", "name"])
+
+NAME_LOADS = {"LOAD_FAST", "LOAD_FAST_CHECK", "LOAD_NAME", "LOAD_GLOBAL", "LOAD_DEREF", "LOAD_CLASSDEREF",
+              "LOAD_FROM_DICT_OR_GLOBALS", "LOAD_FROM_DICT_OR_DEREF"}
+NAME_STORES = {"STORE_FAST", "STORE_NAME", "STORE_GLOBAL", "STORE_DEREF"}
+SUPER_INSTRUCTIONS = {"LOAD_FAST_LOAD_FAST": ("LOAD_FAST", "LOAD_FAST"),
+                      "STORE_FAST_STORE_FAST": ("STORE_FAST", "STORE_FAST"),
+                      "STORE_FAST_LOAD_FAST": ("STORE_FAST", "LOAD_FAST")}
+ATTRIBUTE_LOADS = {"LOAD_ATTR", "LOAD_METHOD"}
+SUBSCRIPT_LOADS = {"BINARY_SUBSCR"}
+COMPREHENSIONS = {"<listcomp>", "<setcomp>", "<dictcomp>", "<genexpr>"}
+# Instructions which do not compute the value of an assignment: jumps, the implicit return at the end of a body,
+# and the cleanup of a finally clause
+TRANSFERS = {"LOAD_CONST", "RETURN_VALUE", "RETURN_CONST", "RERAISE", "POP_EXCEPT"}
+IGNORED = {"CACHE", "NOP", "RESUME", "EXTENDED_ARG", "PRECALL", "PUSH_NULL", "COPY", "SWAP"}
+
+
+class BytecodeTable():
+    """
+    This class precomputes, from the bytecode of a code file and the source positions of its instructions
+    (Python 3.11+), which names, attributes and elements every expression loads and every line stores. Unlike
+    the syntax tree patterns, it sees tuple unpacking, starred targets and chained attributes, and the hooks
+    look their node up by its location in a dictionary instead of searching the syntax tree.
+
+    Attributes
+    ----------
+    spans : Set[Span]
+        The (start line, start column, end line, end column) of every instruction, i.e. the nodes the table
+        knows about
+
+    loads : Dict[Span, Tuple[str, str]]
+        A dictionary which maps the location of every name read to the name, and to the attribute which is
+        read through it (`a` in `a.b`), otherwise None
+
+    attribute_loads : Dict[Span, Tuple[str, str]]
+        A dictionary which maps the location of every attribute read to the dotted path of its base (None if the
+        base is not a name or an attribute of one) and the attribute name
+
+    subscript_loads : Dict[Span, Tuple[str, str]]
+        A dictionary which maps the location of every element read to the dotted path of its base and the
+        static key (the name or the constant of the index, otherwise None)
+
+    stores : Dict[int, List[Tuple[Span, Store]]]
+        A dictionary which maps every line number to the locations of the targets that start on it and the names,
+        attributes and elements they store, in order. Variables of comprehensions are not included
+
+    operations : Dict[int, List[Operation]]
+        A dictionary which maps every line number to the instructions that start on it, in order, as their
+        location, their kind (load or store of a name, otherwise other) and the name. TRANSFERS and jumps are left
+        out. Used to recognize assignments of a variable to another one (`a = b`)
+
+    unclaimed_names : Dict[Tuple[int, str], List[Span]]
+        The locations of the name reads of the syntax tree, per line number and name, that no single instruction
+        carries. The super-instructions of Python 3.13+ (`LOAD_FAST_LOAD_FAST`) only carry the location of their
+        first name, the second one is taken from here
+    -------
+    """
+    spans: Set[Span]
+    loads: Dict[Span, Tuple[str, Optional[str]]]
+    attribute_loads: Dict[Span, Tuple[Optional[str], str]]
+    subscript_loads: Dict[Span, Tuple[Optional[str], Optional[str]]]
+    stores: Dict[int, List[Tuple[Span, Store]]]
+    operations: Dict[int, List[Operation]]
+    unclaimed_names: Dict[Tuple[int, str], List[Span]]
+
+    def __init__(self, code: CodeType, tree: ast.AST = None) -> None:
+        """
+        Parameters
+        ----------
+        code: CodeType
+            The code object of the module. Nested code objects are analyzed as well
+
+        tree: ast.AST
+            The syntax tree which the code object was compiled from, needed for the second names of
+            super-instructions
+        """
+        self.spans = set()
+        self.loads = dict()
+        self.attribute_loads = dict()
+        self.subscript_loads = dict()
+        self.stores = dict()
+        self.operations = dict()
+        self.unclaimed_names = dict()
+        if tree is not None:
+            self.add_unclaimed_names(code, tree)
+        self.add_code(code)
+
+    @classmethod
+    def from_file(cls, file_path: str) -> "BytecodeTable":
+        """This method compiles a code file and builds its table
+
+        Parameters
+        ----------
+        file_path: str
+            The path to the code file
+
+        Returns
+        -------
+        BytecodeTable
+            The table of the code file
+        """
+        with open(file_path, "r") as file:
+            return cls.from_source(file.read(), file_path)
+
+    @classmethod
+    def from_source(cls, source: str, file_path: str) -> "BytecodeTable":
+        """This method compiles a source and builds its table
+
+        Parameters
+        ----------
+        source: str
+            The source of the code file
+
+        file_path: str
+            The path to the code file
+
+        Returns
+        -------
+        BytecodeTable
+            The table of the source
+        """
+        tree = ast.parse(source, file_path)
+        return cls(compile(tree, file_path, "exec"), tree)
+
+    def add_unclaimed_names(self, code: CodeType, tree: ast.AST) -> None:
+        """Collects the name reads of the syntax tree whose location no single name instruction carries
+
+        Parameters
+        ----------
+        code : CodeType
+            The code object of the module
+
+        tree : ast.AST
+            The syntax tree of the module
+
+        Returns
+        -------
+        None
+        """
+        claimed: Set[Span] = set()
+        codes = [code]
+        while len(codes) > 0:
+            current = codes.pop()
+            for instruction in dis.get_instructions(current):
+                if instruction.opname in NAME_LOADS:
+                    claimed.add(span_of(instruction))
+            codes += [constant for constant in current.co_consts if isinstance(constant, CodeType)]
+        for node in ast.walk(tree):
+            if isinstance(node, ast.Name) and isinstance(node.ctx, ast.Load):
+                span = (node.lineno, node.col_offset, node.end_lineno, node.end_col_offset)
+                if span not in claimed:
+                    self.unclaimed_names.setdefault((node.lineno, node.id), []).append(span)
+        for spans in self.unclaimed_names.values():
+            spans.sort()
+
+    def instructions_of(self, code: CodeType) -> List[dis.Instruction]:
+        """This method returns the instructions of a code object which have a location, with every
+        super-instruction split into its two instructions
+
+        Parameters
+        ----------
+        code : CodeType
+            The code object
+
+        Returns
+        -------
+        List[dis.Instruction]
+            The instructions, in order
+        """
+        instructions = []
+        for instruction in dis.get_instructions(code):
+            span = span_of(instruction)
+            if instruction.opname in IGNORED or span is None:
+                continue
+            if instruction.opname not in SUPER_INSTRUCTIONS:
+                instructions.append(instruction)
+                continue
+            first_opname, second_opname = SUPER_INSTRUCTIONS[instruction.opname]
+            first_name, second_name = instruction.argval
+            instructions.append(instruction._replace(opname=first_opname, argval=first_name))
+            second = instruction._replace(opname=second_opname, argval=second_name)
+            if second_opname in NAME_LOADS:
+                spans = self.unclaimed_names.get((span[0], second_name), [])
+                if len(spans) == 0:
+                    # Without the location the read can not be classified, it is left to the syntax tree
+                    continue
+                line_number, column, end_line_number, end_column = spans.pop(0)
+                second = second._replace(positions=dis.Positions(line_number, end_line_number, column, end_column))
+            instructions.append(second)
+        return instructions
+
+    def add_code(self, code: CodeType) -> None:
+        """Adds the instructions of a code object and of the code objects nested in it
+
+        Parameters
+        ----------
+        code : CodeType
+            The code object
+
+        Returns
+        -------
+        None
+        """
+        instructions = self.instructions_of(code)
+        for instruction in instructions:
+            self.spans.add(span_of(instruction))
+            self.add_operation(instruction)
+        # The spans of the inlined comprehensions (Python 3.12+), in which their variables are saved and restored
+        cleared = [(instruction.argval, span_of(instruction)) for instruction in instructions
+                   if instruction.opname == "LOAD_FAST_AND_CLEAR"]
+        for position, instruction in enumerate(instructions):
+            span = span_of(instruction)
+            if instruction.opname in NAME_LOADS:
+                self.loads.setdefault(span, (instruction.argval, None))
+            elif instruction.opname in ATTRIBUTE_LOADS:
+                base = base_of(instructions, position, span)
+                self.attribute_loads[span] = (path_of(instructions, base), instruction.argval)
+                if base is not None and instructions[base].opname in NAME_LOADS:
+                    self.loads[span_of(instructions[base])] = (instructions[base].argval, instruction.argval)
+            elif instruction.opname in SUBSCRIPT_LOADS:
+                base = base_of(instructions, position, span)
+                self.subscript_loads[span] = (path_of(instructions, base), key_of(instructions, base, position, span))
+            elif instruction.opname in NAME_STORES and code.co_name not in COMPREHENSIONS:
+                if any(name == instruction.argval and contains(outer, span) for name, outer in cleared) == False:
+                    self.stores.setdefault(span[0], []).append((span, Store(instruction.argval, None, None)))
+            elif instruction.opname == "STORE_ATTR":
+                base = base_of(instructions, position, span)
+                self.stores.setdefault(span[0], []).append(
+                    (span, Store(path_of(instructions, base), instruction.argval, None)))
+            elif instruction.opname == "STORE_SUBSCR":
+                base = base_of(instructions, position, span)
+                self.stores.setdefault(span[0], []).append(
+                    (span, Store(path_of(instructions, base), None, key_of(instructions, base, position, span))))
+        for constant in code.co_consts:
+            if isinstance(constant, CodeType):
+                self.add_code(constant)
+
+    def add_operation(self, instruction: dis.Instruction) -> None:
+        """Adds an instruction to operations, unless it is one of TRANSFERS or a jump
+
+        Parameters
+        ----------
+        instruction : dis.Instruction
+            The instruction
+
+        Returns
+        -------
+        None
+        """
+        if instruction.opname in TRANSFERS or instruction.opcode in dis.hasjrel or instruction.opcode in dis.hasjabs:
+            return
+        span = span_of(instruction)
+        if instruction.opname in NAME_LOADS:
+            operation = Operation(span, "load", instruction.argval)
+        elif instruction.opname in NAME_STORES:
+            operation = Operation(span, "store", instruction.argval)
+        else:
+            operation = Operation(span, "other", None)
+        self.operations.setdefault(span[0], []).append(operation)
+
+    def name_load(self, span: Span) -> Optional[Tuple[str, Optional[str]]]:
+        """This method looks a name read up
+
+        Parameters
+        ----------
+        span : Span
+            The location of the node
+
+        Returns
+        -------
+        Tuple[str, str]
+            The name and the attribute read through it, None if the node is not a name read
+        """
+        return self.loads.get(span)
+
+    def stores_of(self, span: Span) -> List[Store]:
+        """This method returns the stores of the targets of an assignment
+
+        Parameters
+        ----------
+        span : Span
+            The location of the assignment
+
+        Returns
+        -------
+        List[Store]
+            The stores, in order
+        """
+        result: List[Store] = []
+        seen: Set[Span] = set()
+        for line_number in range(span[0], span[2] + 1):
+            for store_span, store in self.stores.get(line_number, []):
+                if contains(span, store_span) and store_span not in seen:
+                    seen.add(store_span)
+                    result.append(store)
+        return result
+
+    def reference_of(self, span: Span) -> Tuple[Optional[str], Optional[str]]:
+        """This method checks whether an assignment assigns a variable to another variable, e.g. `a = b`: the
+        only instructions of the assignment, besides TRANSFERS and jumps, load a name and store it
+
+        Parameters
+        ----------
+        span : Span
+            The location of the assignment
+
+        Returns
+        -------
+        (str, str)
+            The (first) left-hand and the right-hand variable names if it is the case, otherwise None, None
+        """
+        operations: List[Operation] = []
+        for line_number in range(span[0], span[2] + 1):
+            for operation in self.operations.get(line_number, []):
+                # The body of a finally clause is compiled once for every way to leave the try statement
+                if contains(span, operation.span) and operation not in operations:
+                    operations.append(operation)
+        if len(operations) < 2 or operations[0].kind != "load":
+            return None, None
+        for operation in operations[1:]:
+            if operation.kind != "store":
+                return None, None
+        return operations[1].name, operations[0].name
+
+
+def contains(outer: Span, inner: Span) -> bool:
+    """ This method checks whether a location lies within another one
+
+    Parameters
+    ----------
+    outer: Span
+        The enclosing location
+
+    inner: Span
+        The enclosed location
+
+    Returns
+    ----------
+    bool
+        True if inner starts and ends within outer
+    """
+    return outer[:2] <= inner[:2] and inner[2:] <= outer[2:]
+
+
+def span_of(instruction: dis.Instruction) -> Optional[Span]:
+    """ This method returns the location of the source code of an instruction
+
+    Parameters
+    ----------
+    instruction: dis.Instruction
+        The instruction
+
+    Returns
+    ----------
+    Span
+        The start line, start column, end line and end column, None if the instruction has no position
+    """
+    positions = instruction.positions
+    if positions is None or positions.lineno is None or positions.col_offset is None:
+        return None
+    return positions.lineno, positions.col_offset, positions.end_lineno, positions.end_col_offset
+
+
+def base_of(instructions: List[dis.Instruction], position: int, span: Span) -> Optional[int]:
+    """ This method finds the instruction which computes the base of an attribute or element access: the widest
+    instruction which starts where the access starts and ends before it
+
+    Parameters
+    ----------
+    instructions: List[dis.Instruction]
+        The instructions of the code object
+
+    position: int
+        The position of the access instruction
+
+    span: Span
+        The location of the access
+
+    Returns
+    ----------
+    int
+        The position of the base instruction, None if it is not found
+    """
+    base = None
+    for candidate in range(position - 1, -1, -1):
+        candidate_span = span_of(instructions[candidate])
+        if candidate_span[2:] <= span[:2]:
+            break
+        if candidate_span[:2] != span[:2] or candidate_span[2:] >= span[2:]:
+            continue
+        if base is None or candidate_span[2:] > span_of(instructions[base])[2:]:
+            base = candidate
+    return base
+
+
+def path_of(instructions: List[dis.Instruction], position: Optional[int]) -> Optional[str]:
+    """ This method returns the dotted path of a name or of a chain of attributes of a name, e.g. `a.b.c`
+
+    Parameters
+    ----------
+    instructions: List[dis.Instruction]
+        The instructions of the code object
+
+    position: int
+        The position of the instruction which computes the value
+
+    Returns
+    ----------
+    str
+        The dotted path, None if the value is not a name or an attribute of one
+    """
+    if position is None:
+        return None
+    instruction = instructions[position]
+    if instruction.opname in NAME_LOADS:
+        return instruction.argval
+    if instruction.opname in ATTRIBUTE_LOADS:
+        base = path_of(instructions, base_of(instructions, position, span_of(instruction)))
+        return None if base is None else f"{base}.{instruction.argval}"
+    return None
+
+
+def key_of(instructions: List[dis.Instruction], base: Optional[int], position: int, span: Span) -> Optional[str]:
+    """ This method returns the static key of an element access: the widest instruction between the base and
+    the end of the access is its index
+
+    Parameters
+    ----------
+    instructions: List[dis.Instruction]
+        The instructions of the code object
+
+    base: int
+        The position of the base instruction
+
+    position: int
+        The position of the access instruction
+
+    span: Span
+        The location of the access
+
+    Returns
+    ----------
+    str
+        The name of the index if it is a variable, the text of the constant if it is a constant, otherwise None
+    """
+    if base is None:
+        return None
+    base_end = span_of(instructions[base])[2:]
+    key = None
+    for instruction in instructions[base + 1:position]:
+        candidate_span = span_of(instruction)
+        if candidate_span[:2] < base_end or candidate_span[2:] >= span[2:]:
+            continue
+        if key is None or candidate_span[:2] < span_of(key)[:2] or \
+                (candidate_span[:2] == span_of(key)[:2] and candidate_span[2:] > span_of(key)[2:]):
+            key = instruction
+    if key is None:
+        return None
+    if key.opname in NAME_LOADS:
+        return key.argval
+    if key.opname == "LOAD_CONST":
+        return str(key.argval)
+    return None
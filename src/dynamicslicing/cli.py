@@ -0,0 +1,223 @@
+import argparse
+import sys
+from os import path
+from time import perf_counter
+from typing import Dict, List
+
+
+class PhaseTimer():
+    """
+    This class measures the wall time of the phases of a run and reports them
+
+    Attributes
+    ----------
+    phases : Dict[str, float]
+        The seconds spent in every finished phase, in order
+
+    current : str
+        The name of the running phase, None if no phase is running
+
+    start : float
+        The time when the running phase started
+    -------
+    """
+    phases: Dict[str, float]
+    current: str
+    start: float
+
+    def __init__(self) -> None:
+        self.phases = dict()
+        self.current = None
+        self.start = 0.0
+
+    def begin(self, phase: str) -> None:
+        """Finishes the running phase, if any, and starts a new one
+
+        Parameters
+        ----------
+        phase: str
+            The name of the new phase
+
+        Returns
+        -------
+        None
+        """
+        self.end()
+        self.current = phase
+        self.start = perf_counter()
+
+    def end(self) -> None:
+        """Finishes the running phase, if any
+
+        Returns
+        -------
+        None
+        """
+        if self.current is not None:
+            self.phases[self.current] = self.phases.get(self.current, 0.0) + perf_counter() - self.start
+            self.current = None
+
+    def report(self) -> str:
+        """This method formats the time of every phase and the total, one per line
+
+        Returns
+        -------
+        str
+            The report
+        """
+        self.end()
+        lines = [f"{phase:<12}{seconds * 1000:10.1f} ms" for phase, seconds in self.phases.items()]
+        lines.append(f"{'total':<12}{sum(self.phases.values()) * 1000:10.1f} ms")
+        return "\n".join(lines)
+
+
+def output_path(output: str, program_path: str, line_number: int, criteria_count: int) -> str:
+    """ This method returns the path of the sliced file of a criterion. With several criteria, the line number is
+    appended to the file name
+
+    Parameters
+    ----------
+    output: str
+        The --output argument, None for sliced.py next to the program
+
+    program_path: str
+        The absolute path to the code file to be sliced
+
+    line_number: int
+        The line number of the criterion
+
+    criteria_count: int
+        The number of criteria
+
+    Returns
+    ----------
+    str
+        The path of the sliced file
+    """
+    if output is None:
+        output = path.join(path.dirname(program_path), "sliced.py")
+    if criteria_count == 1:
+        return output
+    stem, extension = path.splitext(output)
+    return f"{stem}-{line_number}{extension}"
+
+
+def parse_arguments(arguments: List[str] = None) -> argparse.Namespace:
+    """ This method parses the command line arguments
+
+    Parameters
+    ----------
+    arguments: List[str]
+        The arguments, sys.argv[1:] if None
+
+    Returns
+    ----------
+    argparse.Namespace
+        The parsed arguments
+    """
+    parser = argparse.ArgumentParser(
+        prog="dynamicslicing",
+        description="Instrument, run and slice a Python program in a single process")
+    parser.add_argument("program", help="The code file to be sliced")
+    parser.add_argument("--entry", default=None,
+                        help="The code file to run as __main__, the program by default")
+    parser.add_argument("--criterion", type=int, action="append", default=None, metavar="LINE",
+                        help="The line number of a slicing criterion, may be repeated. By default, the line with "
+                             "the slicing comment")
+    parser.add_argument("--module", action="append", default=None, metavar="PATH",
+                        help="Another code file to instrument when it is imported, may be repeated. The slice may "
+                             "reach into it and its sliced code is written to sliced_<module>.py next to it")
+    parser.add_argument("--output", default=None,
+                        help="The path of the sliced file, sliced.py next to the program by default")
+    parser.add_argument("--cache", default=None,
+                        help="The directory of the persistent program cache, none by default")
+    parser.add_argument("--stats", default=None, metavar="PATH",
+                        help="Write the calls and time of every hook and the size of the dependence graph to this "
+                             "JSON file")
+    parser.add_argument("--profile", default=None, metavar="PATH",
+                        help="Write collapsed stacks of the hook time per source line of the program to this file, "
+                             "and the annotated source to PATH.lines")
+    parser.add_argument("--memory", default=None, metavar="PATH",
+                        help="Write the bytes retained by every structure of the analysis and the peak memory, "
+                             "traced with tracemalloc, to this JSON file")
+    parser.add_argument("--spill-limit", type=int, default=None, metavar="RECORDS",
+                        help="Keep only this many line records and variable records in memory, the least recently "
+                             "used others are spilled to disk. All of them are kept in memory by default")
+    parser.add_argument("--spill-directory", default=None,
+                        help="The directory of the files of the spilled records, the temporary directory by default")
+    return parser.parse_args(arguments)
+
+
+def main(arguments: List[str] = None) -> int:
+    """ This method is the `dynamicslicing` console entry point. It instruments the program in memory, runs the
+    entry and slices the program for every criterion with an AnalysisSession, writes the sliced files, also of the
+    other modules which the slices touch, and reports the time of every phase on stderr. A program which raises or
+    exits is sliced as far as it ran
+
+    Parameters
+    ----------
+    arguments: List[str]
+        The command line arguments, sys.argv[1:] if None
+
+    Returns
+    ----------
+    int
+        The exit status, 1 if the program could not be instrumented or sliced
+    """
+    options = parse_arguments(arguments)
+    timer = PhaseTimer()
+    timer.begin("import")
+    from dynamicslicing.program_cache import ProgramCache
+    from dynamicslicing.session import AnalysisSession
+    from dynamicslicing.slice import Slice
+
+    program_path = path.abspath(options.program)
+    timer.begin("instrument")
+    analysis = Slice(program_path + ".orig", statistics_path=options.stats,
+                     profile_path=options.profile, memory_path=options.memory,
+                     spill_limit=options.spill_limit, spill_directory=options.spill_directory)
+    cache = ProgramCache(options.cache) if options.cache is not None else None
+    session = AnalysisSession(cache=cache, analysis=analysis)
+    try:
+        session.instrument(program_path, options.module)
+    except (OSError, ImportError) as error:
+        print(f"dynamicslicing: {error}", file=sys.stderr)
+        return 1
+
+    timer.begin("execute")
+    try:
+        session.execute(program_path, options.entry, options.module)
+    except (Exception, SystemExit) as error:
+        # The program raised or exited, what it ran until then is sliced
+        print(f"dynamicslicing: the program stopped with {type(error).__name__}: {error}", file=sys.stderr)
+
+    timer.begin("slice")
+    try:
+        response = session.slice(options.criterion)
+    except Exception as error:
+        print(f"dynamicslicing: {type(error).__name__}: {error}", file=sys.stderr)
+        return 1
+
+    timer.begin("output")
+    criteria_count = len(response["sliced"])
+    for line_number, sliced_code in response["sliced"].items():
+        # The sliced files of the other code files which the slice touches are sliced_<module>.py next to them
+        sliced_files = {output_path(options.output, program_path, int(line_number), criteria_count): sliced_code}
+        for module_output, module_code in response["modules"][line_number].items():
+            sliced_files[output_path(module_output, program_path, int(line_number), criteria_count)] = module_code
+        for sliced_path, code in sliced_files.items():
+            with open(sliced_path, "w") as file:
+                file.write(code)
+    slices = {int(line_number): lines for line_number, lines in response["slices"].items()}
+    if analysis.statistics is not None:
+        analysis.statistics.write(analysis, slices)
+    if analysis.profile is not None:
+        analysis.profile.write(analysis)
+    if analysis.memory is not None:
+        analysis.memory.write(analysis)
+    print(timer.report(), file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,375 @@
+import sys
+import threading
+from contextvars import ContextVar
+from functools import wraps
+from types import FrameType
+from typing import Any, Callable, Dict, List, Optional, Set, Tuple
+from dynamicslicing.thread_aware import ThreadAwareSlice
+
+
+class InvocationState():
+    """
+    This class is the control-flow state of one invocation of sliced_function_name, together with the invocations
+    nested in it
+
+    Attributes
+    ----------
+    start_analysis : bool
+        Whether the invocation is analyzed
+
+    invocation_depth : int
+        The number of active (nested) invocations
+
+    invocation_start : float
+        The time when the invocation was entered, if it is sampled
+
+    taken_branches : Set[Tuple]
+        The keys of the branches that were taken during the invocation, see Slice.taken_branches
+
+    call_sites : List[int]
+        The call sites of the active functions of other code files in the invocation, see Slice.call_sites
+
+    returned_call_site : Optional[int]
+        The call site of the function of another code file which exits now in the invocation
+
+    invocation_frames : List[FrameType]
+        The frames of the active (nested) invocations
+    -------
+    """
+    start_analysis: bool
+    invocation_depth: int
+    invocation_start: float
+    taken_branches: Set[Tuple]
+    call_sites: List[int]
+    returned_call_site: Optional[int]
+    invocation_frames: List[FrameType]
+
+    def __init__(self) -> None:
+        self.start_analysis = False
+        self.invocation_depth = 0
+        self.invocation_start = 0.0
+        self.taken_branches = set()
+        self.call_sites = list()
+        self.returned_call_site = None
+        self.invocation_frames = list()
+
+
+class ResolvedState(threading.local):
+    """
+    This class holds the state of the invocation which the running hook of the current thread belongs to. It is
+    resolved once when the hook starts, so that the properties which the hook reads do not search the stack again
+
+    Attributes
+    ----------
+    state : InvocationState
+        The state of the invocation of the running hook, None outside a hook
+    -------
+    """
+    state: InvocationState = None
+
+
+def resolving(hook: Callable) -> Callable:
+    """ This method wraps a hook of ContextAwareSlice so that it resolves the state of its invocation once. The
+    docstring is kept, since dynapyt reads the filters of a hook from it
+
+    Parameters
+    ----------
+    hook: Callable
+        The hook
+
+    Returns
+    ----------
+    Callable
+        The wrapper
+    """
+    @wraps(hook)
+    def wrapper(self: "ContextAwareSlice", *args: Any) -> Any:
+        resolved = self.resolved
+        if resolved.state is not None:
+            # A hook of the code which the hook runs, e.g. __str__ of a key, belongs to the same invocation
+            return hook(self, *args)
+        resolved.state = self.resolve()
+        try:
+            return hook(self, *args)
+        finally:
+            resolved.state = None
+    return wrapper
+
+
+class ContextAwareSlice(ThreadAwareSlice):
+    """
+    This class is ThreadAwareSlice for programs in which invocations of sliced_function_name interleave in the same
+    thread: generators which are suspended at a yield, and coroutines which are suspended at an await while other
+    asyncio tasks run. The control-flow state of an invocation is keyed by the frame of sliced_function_name, which
+    is kept while the invocation is suspended, so an event belongs to the invocation whose frame is the innermost
+    one on the stack. When the invocation is suspended its frame is not on the stack anymore and its state is not
+    touched, when it is resumed the frame, and so the state, is found again. The state is resolved once per hook.
+
+    The code which runs outside the frame on behalf of an invocation, e.g. an asyncio task created by it, gets the
+    state through a context variable, which asyncio copies into every new task. Any other code, e.g. a thread started
+    by the invocation, is analyzed while any invocation is analyzed, like with ThreadAwareSlice.
+
+    Attributes
+    ----------
+    invocations : Dict[FrameType, InvocationState]
+        The state of every active or suspended invocation, by the frame of sliced_function_name. A nested invocation
+        shares the state of the outermost one
+
+    context : ContextVar
+        The state of the invocation in which the current task or thread was started
+
+    outside : InvocationState
+        The state of the code which does not belong to any invocation
+
+    resolved : ResolvedState
+        The state of the invocation of the running hook, per thread
+    -------
+    """
+    invocations: Dict[FrameType, InvocationState]
+    context: ContextVar
+    outside: InvocationState
+    resolved: ResolvedState
+
+    def __init__(self, source_path: str = "", **options: Any) -> None:
+        """
+        Parameters
+        ----------
+        source_path: str
+            The path to the code file to be sliced
+
+        options: Any
+            The other arguments of ThreadAwareSlice, e.g. batch_size
+        """
+        self.resolved = ResolvedState()
+        super(ContextAwareSlice, self).__init__(source_path, **options)
+
+    read = resolving(ThreadAwareSlice.read)
+    write = resolving(ThreadAwareSlice.write)
+    augmented_assignment = resolving(ThreadAwareSlice.augmented_assignment)
+    read_attribute = resolving(ThreadAwareSlice.read_attribute)
+    read_subscript = resolving(ThreadAwareSlice.read_subscript)
+    enter_if = resolving(ThreadAwareSlice.enter_if)
+    enter_for = resolving(ThreadAwareSlice.enter_for)
+    enter_while = resolving(ThreadAwareSlice.enter_while)
+    _return = resolving(ThreadAwareSlice._return)
+    enter_call = resolving(ThreadAwareSlice.enter_call)
+    exit_call = resolving(ThreadAwareSlice.exit_call)
+
+    def reset(self, source_path: str = "") -> None:
+        """This method forgets the previous run, including the invocations which were never resumed
+
+        Parameters
+        ----------
+        source_path: str
+            The path to the code file to be sliced in the next run
+
+        Returns
+        -------
+        None
+        """
+        self.invocations = dict()
+        self.context = ContextVar(f"invocation_{id(self)}", default=None)
+        self.outside = InvocationState()
+        super(ContextAwareSlice, self).reset(source_path)
+
+    def state(self) -> InvocationState:
+        """This method returns the state of the invocation which the current event belongs to, as resolved by the
+        running hook, or resolves it
+
+        Returns
+        -------
+        InvocationState
+            The state of the invocation
+        """
+        state = self.resolved.state
+        if state is not None:
+            return state
+        return self.resolve()
+
+    def resolve(self) -> InvocationState:
+        """This method finds the state of the invocation which the current event belongs to
+
+        Returns
+        -------
+        InvocationState
+            The state of the innermost invocation on the stack, of the invocation which started the current task or
+            thread, or outside
+        """
+        invocations = self.invocations
+        if len(invocations) > 0:
+            name = self.sliced_function_name
+            frame = sys._getframe(1)
+            while frame is not None:
+                if frame.f_code.co_name == name:
+                    state = invocations.get(frame)
+                    if state is not None:
+                        return state
+                frame = frame.f_back
+        state = self.context.get()
+        return self.outside if state is None else state
+
+    def sliced_frames(self) -> List[FrameType]:
+        """This method collects the frames of sliced_function_name on the stack
+
+        Returns
+        -------
+        List[FrameType]
+            The frames, innermost first
+        """
+        frames = list()
+        frame = sys._getframe(1)
+        while frame is not None:
+            if frame.f_code.co_name == self.sliced_function_name:
+                frames.append(frame)
+            frame = frame.f_back
+        return frames
+
+    @property
+    def start_analysis(self) -> bool:
+        state = self.state()
+        if state is self.outside:
+            return self.analyzed_invocations > 0
+        return state.start_analysis
+
+    @start_analysis.setter
+    def start_analysis(self, value: bool) -> None:
+        self.state().start_analysis = value
+
+    @property
+    def invocation_depth(self) -> int:
+        return self.state().invocation_depth
+
+    @invocation_depth.setter
+    def invocation_depth(self, value: int) -> None:
+        self.state().invocation_depth = value
+
+    @property
+    def invocation_start(self) -> float:
+        return self.state().invocation_start
+
+    @invocation_start.setter
+    def invocation_start(self, value: float) -> None:
+        self.state().invocation_start = value
+
+    @property
+    def taken_branches(self) -> Set[Tuple]:
+        return self.state().taken_branches
+
+    @taken_branches.setter
+    def taken_branches(self, value: Set[Tuple]) -> None:
+        self.state().taken_branches = value
+
+    @property
+    def call_sites(self) -> List[int]:
+        return self.state().call_sites
+
+    @call_sites.setter
+    def call_sites(self, value: List[int]) -> None:
+        self.state().call_sites = value
+
+    @property
+    def returned_call_site(self) -> Optional[int]:
+        return self.state().returned_call_site
+
+    @returned_call_site.setter
+    def returned_call_site(self, value: Optional[int]) -> None:
+        self.state().returned_call_site = value
+
+    @property
+    def invocation_frames(self) -> List[FrameType]:
+        return self.state().invocation_frames
+
+    @invocation_frames.setter
+    def invocation_frames(self, value: List[FrameType]) -> None:
+        self.state().invocation_frames = value
+
+    def function_enter(self, dyn_ast: str, iid: int, args: List[Any], name: str, is_lambda: bool) -> None:
+        """Hook for when an instrumented function is entered. An invocation of sliced_function_name gets a new state,
+        unless it is nested in another invocation on the stack. Another function is only looked at while an
+        invocation is analyzed
+
+        Parameters
+        ----------
+        dyn_ast : str
+            The path to the original code. Can be used to extract the syntax tree.
+
+        iid : int
+            Unique ID of the syntax tree node.
+
+        args : List[Any]
+            The arguments passed to the function.
+
+        name:
+            Name of the function called.
+
+        is_lambda : bool
+            Whether the function is a lambda function.
+        """
+        if name != self.sliced_function_name:
+            if self.analyzed_invocations > 0:
+                super(ContextAwareSlice, self).function_enter(dyn_ast, iid, args, name, is_lambda)
+            return
+        frames = self.sliced_frames()
+        if len(frames) > 0:
+            state: Optional[InvocationState] = None
+            for frame in frames[1:]:
+                state = self.invocations.get(frame)
+                if state is not None:
+                    break
+            if state is None:
+                state = InvocationState()
+                self.context.set(state)
+            self.invocations[frames[0]] = state
+        previous = self.resolved.state
+        self.resolved.state = state if len(frames) > 0 else self.resolve()
+        try:
+            super(ContextAwareSlice, self).function_enter(dyn_ast, iid, args, name, is_lambda)
+        finally:
+            self.resolved.state = previous
+        if self.sampling_policy.keeps_previous() == False and len(frames) > 0 and state.invocation_depth == 1:
+            # Only the last invocation is analyzed, so the suspended ones stop here
+            with self.lock:
+                for other in set(self.invocations.values()):
+                    if other is not state and other.start_analysis == True:
+                        other.start_analysis = False
+                        self.analyzed_invocations -= 1
+
+    def function_exit(self, dyn_ast: str, function_iid: int, name: str, result: Any) -> Any:
+        """Hook for exiting an instrumented function. The state of an invocation of sliced_function_name is dropped
+        when it returns
+
+        Parameters
+        ----------
+        dyn_ast : str
+            The path to the original code. Can be used to extract the syntax tree.
+
+        function_iid : int
+            Unique ID of the function.
+
+        name : str
+            Name of the function called.
+
+        result : Any
+            The result of the function.
+
+        Returns
+        -------
+        Any
+            If provided, overwrites the returned value.
+        """
+        if name != self.sliced_function_name:
+            if self.analyzed_invocations > 0:
+                super(ContextAwareSlice, self).function_exit(dyn_ast, function_iid, name, result)
+            return
+        frames = self.sliced_frames()
+        state = self.invocations.get(frames[0]) if len(frames) > 0 else None
+        previous = self.resolved.state
+        self.resolved.state = state if state is not None else self.resolve()
+        try:
+            super(ContextAwareSlice, self).function_exit(dyn_ast, function_iid, name, result)
+        finally:
+            self.resolved.state = previous
+        if state is not None:
+            del self.invocations[frames[0]]
+            if state.invocation_depth == 0 and self.context.get() is state:
+                self.context.set(None)
@@ -0,0 +1,417 @@
+from typing import Dict, List, Optional, Sequence, Set
+import libcst as cst
+from libcst.metadata import PositionProvider
+
+
+class ControlFlowGraph():
+    """
+    This class builds the statement-level control-flow graph of one function from its libcst tree, and computes
+    the control dependences of its lines with post-dominators. `break`, `continue`, `return` and `raise` are
+    modeled as jumps, so lines after an early exit depend on the branch which guards the exit.
+
+    Attributes
+    ----------
+    successors : Dict[int, Set[int]]
+        A dictionary which maps every node id to the ids of its successor nodes
+
+    node_lines : Dict[int, List[int]]
+        A dictionary which maps every node id to the line numbers that the node covers
+
+    branch_lines : Dict[int, int]
+        A dictionary which maps the node id of every if, for and while statement to the line number of its header.
+        These are the branches which are recorded at runtime
+
+    jump_nodes : Set[int]
+        A set of the node ids of the lines whose `break`, `continue`, `return` or `raise` skips the next statement
+
+    else_headers : Dict[int, int]
+        A dictionary which maps the node id of every statement in the `else` clause of a loop to the node id of the
+        loop header. The clause cannot be kept without its loop, so its lines depend on the header even if the loop
+        has no `break`
+
+    entry : int
+        The node id of the function entry
+
+    exit : int
+        The node id of the function exit
+    -------
+    """
+    successors: Dict[int, Set[int]]
+    node_lines: Dict[int, List[int]]
+    branch_lines: Dict[int, int]
+    jump_nodes: Set[int]
+    else_headers: Dict[int, int]
+    entry: int
+    exit: int
+
+    def __init__(self, function: cst.FunctionDef, positions) -> None:
+        """
+        Parameters
+        ----------
+        function: cst.FunctionDef
+            The function node whose control-flow graph should be built
+
+        positions: Mapping[cst.CSTNode, CodeRange]
+            The resolved PositionProvider metadata of the module that contains the function
+        """
+        self.positions = positions
+        self.successors = dict()
+        self.node_lines = dict()
+        self.branch_lines = dict()
+        self.jump_nodes = set()
+        self.else_headers = dict()
+        self.exit = self.new_node([])
+        self.entry = self.new_node([])
+        self.successors[self.entry].add(self.build_suite(function.body, self.exit, None, None))
+
+    def new_node(self, lines: List[int]) -> int:
+        """Adds a node to the graph
+
+        Parameters
+        ----------
+        lines : List[int]
+            The line numbers that the node covers
+
+        Returns
+        -------
+        int
+            The id of the new node
+        """
+        node = len(self.node_lines)
+        self.node_lines[node] = lines
+        self.successors[node] = set()
+        return node
+
+    def lines_of(self, node: cst.CSTNode, last_node: cst.CSTNode = None) -> List[int]:
+        """Returns the line numbers from the start of node to the end of last_node (or the end of node)
+
+        Parameters
+        ----------
+        node : cst.CSTNode
+            The first syntax tree node
+
+        last_node : cst.CSTNode
+            The last syntax tree node, if it differs from node
+
+        Returns
+        -------
+        List[int]
+            The covered line numbers
+        """
+        start = self.positions[node].start.line
+        end = self.positions[last_node if last_node is not None else node].end.line
+        return list(range(start, end + 1))
+
+    def build_suite(self, suite: cst.BaseSuite, follow: int, break_target: Optional[int],
+                    continue_target: Optional[int]) -> int:
+        """Builds the nodes of an indented block or of a one-line suite
+
+        Parameters
+        ----------
+        suite : cst.BaseSuite
+            The block of statements
+
+        follow : int
+            The node id which is executed after the block
+
+        break_target : int
+            The node id where a `break` jumps to, None outside of loops
+
+        continue_target : int
+            The node id where a `continue` jumps to, None outside of loops
+
+        Returns
+        -------
+        int
+            The id of the first node of the block
+        """
+        if isinstance(suite, cst.SimpleStatementSuite):
+            return self.build_simple(suite, suite.body, follow, break_target, continue_target)
+        return self.build_statements(suite.body, follow, break_target, continue_target)
+
+    def build_statements(self, statements: Sequence[cst.BaseStatement], follow: int, break_target: Optional[int],
+                         continue_target: Optional[int]) -> int:
+        """Builds the nodes of a sequence of statements, from the last one to the first one
+
+        Parameters
+        ----------
+        statements : Sequence[cst.BaseStatement]
+            The statements of a block
+
+        follow : int
+            The node id which is executed after the last statement
+
+        break_target : int
+            The node id where a `break` jumps to, None outside of loops
+
+        continue_target : int
+            The node id where a `continue` jumps to, None outside of loops
+
+        Returns
+        -------
+        int
+            The id of the first node of the sequence, or follow if the sequence is empty
+        """
+        for statement in reversed(statements):
+            follow = self.build_statement(statement, follow, break_target, continue_target)
+        return follow
+
+    def build_simple(self, node: cst.CSTNode, small_statements: Sequence[cst.BaseSmallStatement], follow: int,
+                     break_target: Optional[int], continue_target: Optional[int]) -> int:
+        """Builds the node of a simple statement line. The first jump in the line decides its successor
+
+        Parameters
+        ----------
+        node : cst.CSTNode
+            The simple statement line or suite
+
+        small_statements : Sequence[cst.BaseSmallStatement]
+            The statements of the line
+
+        follow : int
+            The node id which is executed after the line
+
+        break_target : int
+            The node id where a `break` jumps to, None outside of loops
+
+        continue_target : int
+            The node id where a `continue` jumps to, None outside of loops
+
+        Returns
+        -------
+        int
+            The id of the new node
+        """
+        current = self.new_node(self.lines_of(node))
+        successor = follow
+        for small_statement in small_statements:
+            if isinstance(small_statement, (cst.Return, cst.Raise)):
+                successor = self.exit
+                break
+            elif isinstance(small_statement, cst.Break) and break_target is not None:
+                successor = break_target
+                break
+            elif isinstance(small_statement, cst.Continue) and continue_target is not None:
+                successor = continue_target
+                break
+        if successor != follow:
+            self.jump_nodes.add(current)
+        self.successors[current].add(successor)
+        return current
+
+    def build_statement(self, statement: cst.BaseStatement, follow: int, break_target: Optional[int],
+                        continue_target: Optional[int]) -> int:
+        """Builds the nodes of one statement
+
+        Parameters
+        ----------
+        statement : cst.BaseStatement
+            The statement
+
+        follow : int
+            The node id which is executed after the statement
+
+        break_target : int
+            The node id where a `break` jumps to, None outside of loops
+
+        continue_target : int
+            The node id where a `continue` jumps to, None outside of loops
+
+        Returns
+        -------
+        int
+            The id of the first node of the statement
+        """
+        if isinstance(statement, cst.SimpleStatementLine):
+            return self.build_simple(statement, statement.body, follow, break_target, continue_target)
+        elif isinstance(statement, cst.If):
+            header = self.new_node(self.lines_of(statement, statement.test))
+            self.branch_lines[header] = self.positions[statement].start.line
+            self.successors[header].add(self.build_suite(statement.body, follow, break_target, continue_target))
+            if isinstance(statement.orelse, cst.If):
+                self.successors[header].add(
+                    self.build_statement(statement.orelse, follow, break_target, continue_target))
+            elif isinstance(statement.orelse, cst.Else):
+                self.successors[header].add(
+                    self.build_suite(statement.orelse.body, follow, break_target, continue_target))
+            else:
+                self.successors[header].add(follow)
+            return header
+        elif isinstance(statement, (cst.While, cst.For)):
+            last_header_node = statement.test if isinstance(statement, cst.While) else statement.iter
+            header = self.new_node(self.lines_of(statement, last_header_node))
+            self.branch_lines[header] = self.positions[statement].start.line
+            if statement.orelse is not None:
+                first_else_node = len(self.node_lines)
+                self.successors[header].add(
+                    self.build_suite(statement.orelse.body, follow, break_target, continue_target))
+                for node in range(first_else_node, len(self.node_lines)):
+                    self.else_headers[node] = header
+            else:
+                self.successors[header].add(follow)
+            self.successors[header].add(self.build_suite(statement.body, header, follow, header))
+            return header
+        elif isinstance(statement, cst.Try):
+            header = self.new_node([self.positions[statement].start.line])
+            after = follow
+            if statement.finalbody is not None:
+                after = self.build_suite(statement.finalbody.body, follow, break_target, continue_target)
+            after_body = after
+            if statement.orelse is not None:
+                after_body = self.build_suite(statement.orelse.body, after, break_target, continue_target)
+            self.successors[header].add(self.build_suite(statement.body, after_body, break_target, continue_target))
+            for handler in statement.handlers:
+                handler_node = self.new_node([self.positions[handler].start.line])
+                self.successors[handler_node].add(
+                    self.build_suite(handler.body, after, break_target, continue_target))
+                self.successors[header].add(handler_node)
+            return header
+        elif isinstance(statement, cst.With):
+            header = self.new_node([self.positions[statement].start.line])
+            self.successors[header].add(self.build_suite(statement.body, follow, break_target, continue_target))
+            return header
+        current = self.new_node([self.positions[statement].start.line])
+        self.successors[current].add(follow)
+        return current
+
+    def post_dominators(self) -> Dict[int, Set[int]]:
+        """Computes the post-dominators of every node with the iterative data-flow algorithm
+
+        Returns
+        -------
+        Dict[int, Set[int]]
+            A dictionary which maps every node id to the ids of the nodes which post-dominate it, including itself
+        """
+        all_nodes = set(self.successors.keys())
+        result: Dict[int, Set[int]] = {node: set(all_nodes) for node in all_nodes}
+        result[self.exit] = {self.exit}
+        changed = True
+        while changed:
+            changed = False
+            for node in all_nodes:
+                if node == self.exit:
+                    continue
+                successors = self.successors[node]
+                new_value = set.intersection(*[result[successor] for successor in successors]) if successors \
+                    else set()
+                new_value.add(node)
+                if new_value != result[node]:
+                    result[node] = new_value
+                    changed = True
+        return result
+
+    def control_dependencies(self) -> Dict[int, List[int]]:
+        """Computes the recorded branches that every line is directly control dependent on. A node Y is control
+        dependent on a branch X if Y post-dominates a successor of X but does not strictly post-dominate X.
+        Dependences on branches which are not recorded at runtime (try, with) are replaced by the dependences of
+        those branches. The header line of a branch is also mapped to the jumps (break, continue, return, raise)
+        that it guards, because removing them from a slice would change which lines of the slice execute. The
+        lines of the `else` clause of a loop also depend on the loop header.
+
+        Returns
+        -------
+        Dict[int, List[int]]
+            A dictionary which maps line numbers to the line numbers that have to be kept when the line is kept
+        """
+        post_dominators = self.post_dominators()
+        node_dependencies: Dict[int, Set[int]] = {node: set() for node in self.successors}
+        for branch, successors in self.successors.items():
+            if len(successors) < 2:
+                continue
+            for successor in successors:
+                for node in post_dominators[successor]:
+                    if node != branch and node not in post_dominators[branch]:
+                        node_dependencies[node].add(branch)
+        for node, header in self.else_headers.items():
+            node_dependencies[node].add(header)
+
+        resolved: Dict[int, Set[int]] = dict()
+
+        def resolve(node: int, visiting: Set[int]) -> Set[int]:
+            if node in resolved:
+                return resolved[node]
+            visiting.add(node)
+            lines: Set[int] = set()
+            for branch in node_dependencies[node]:
+                if branch in self.branch_lines:
+                    lines.add(self.branch_lines[branch])
+                elif branch not in visiting:
+                    lines |= resolve(branch, visiting)
+            visiting.discard(node)
+            resolved[node] = lines
+            return lines
+
+        result: Dict[int, Set[int]] = dict()
+        for node, lines in self.node_lines.items():
+            dependencies = resolve(node, set())
+            for line in lines:
+                result.setdefault(line, set()).update(dependencies)
+            if node in self.jump_nodes:
+                for branch_line in dependencies:
+                    result.setdefault(branch_line, set()).add(lines[0])
+        return {line: sorted(dependencies - {line}) for line, dependencies in result.items()}
+
+
+class FunctionFinder(cst.CSTVisitor):
+    """
+    This class finds the function definition which starts at a specific line
+    """
+    METADATA_DEPENDENCIES = (
+        PositionProvider,
+    )
+
+    def __init__(self, start_line: int):
+        """
+        Parameters
+        ----------
+        start_line: int
+            The line number of the `def` keyword of the function
+        """
+        self.start_line = start_line
+        self.function = None
+
+    def visit_FunctionDef(self, node: cst.FunctionDef) -> Optional[bool]:
+        """ We visit every function definition and keep the one that starts at start_line
+
+        Parameters
+        ----------
+        node: cst.FunctionDef
+            The node in AST that is a function definition
+
+        Returns
+        ----------
+        Optional[bool]
+            False when the function is found, so that its children are not visited
+        """
+        if self.function is None and self.get_metadata(PositionProvider, node).start.line == self.start_line:
+            self.function = node
+            return False
+        return None
+
+
+def compute_control_dependencies(module: cst.Module, function_line: int) -> Dict[int, List[int]]:
+    """ This method computes the static control dependences of every line of the function that starts at
+    function_line. It is called once per function, the runtime only looks the lines up.
+
+    Parameters
+    ----------
+    module: cst.Module
+        The syntax tree of the code file
+
+    function_line: int
+        The line number of the `def` keyword of the function
+
+    Returns
+    ----------
+    Dict[int, List[int]]
+        A dictionary which maps line numbers to the header line numbers of the if, for and while statements they
+        are control dependent on, and header line numbers also to the jumps they guard. Empty if no function
+        starts at function_line
+    """
+    wrapper = cst.metadata.MetadataWrapper(module)
+    finder = FunctionFinder(function_line)
+    wrapper.visit(finder)
+    if finder.function is None:
+        return dict()
+    positions = wrapper.resolve(PositionProvider)
+    return ControlFlowGraph(finder.function, positions).control_dependencies()
@@ -0,0 +1,419 @@
+from collections import namedtuple
+from typing import Dict, List, Optional, Set, Tuple
+import libcst as cst
+from libcst.metadata import PositionProvider, QualifiedNameProvider, QualifiedNameSource
+from dynamicslicing.control_dependence import FunctionFinder
+
+DefUseEvent = namedtuple("DefUseEvent", ["kind", "line", "span", "arguments"])
+
+
+def subscript_index(node: cst.SubscriptElement) -> str:
+    """We extract subscript of an Index-access
+
+    Parameters
+    ----------
+    node: cst.SubscriptElement
+        The element of the subscript
+
+    Returns
+    -------
+    str
+        The accessed index, if applicable, otherwise None
+    """
+    if not isinstance(node.slice, cst.Index):
+        return None
+
+    if isinstance(node.slice.value, cst.Integer):
+        return str(node.slice.value.value)
+    elif isinstance(node.slice.value, cst.Name):
+        return node.slice.value.value
+    elif isinstance(node.slice.value, cst.SimpleString):
+        # The key of a string literal, like the key of an element read at runtime
+        return str(node.slice.value.evaluated_value)
+    elif isinstance(node.slice.value, cst.UnaryOperation) and \
+        isinstance(node.slice.value.operator, cst.Minus) and \
+            isinstance(node.slice.value.expression, cst.Integer) \
+        and node.slice.value.expression.value == '1':
+        return '-1'
+
+
+def assignment_target(node: cst.CSTNode) -> Tuple[str, str, str]:
+    """We extract a tuple of 3 strings, which corresponds to variable name, attribute name and index of the
+    left-hand side of an assignment, respectively
+
+    Parameters
+    ----------
+    node: cst.CSTNode
+        The assignment node
+
+    Returns
+    -------
+    (str, str, str)
+        A tuple of 3 strings: variable name, attribute name and index, respectively. Values could be None if not the case.
+        A target whose base is not a name, e.g. m[k][j] or a.b.c, is not recorded, like by the bytecode table
+    """
+    if (not isinstance(node, cst.Assign)) and (not isinstance(node, cst.AugAssign)):
+        return None, None, None
+    elif isinstance(node, cst.AugAssign):
+        if isinstance(node.target, cst.Name):
+            return node.target.value, None, None
+        elif isinstance(node.target, cst.Subscript) and isinstance(node.target.value, cst.Name):
+            return node.target.value.value, None, subscript_index(node.target.slice[0])
+        elif isinstance(node.target, cst.Attribute):
+            if isinstance(node.target.value, cst.Name) and (node.target.attr, cst.Name):
+                return node.target.value.value, node.target.attr.value, None
+    elif not isinstance(node.targets[0], cst.AssignTarget):
+        return None, None, None
+    elif isinstance(node.targets[0].target, cst.Name):
+        return node.targets[0].target.value, None, None
+    elif isinstance(node.targets[0].target, cst.Attribute):
+        if (isinstance(node.targets[0].target.value, cst.Name) and
+                node.targets[0].target.value.value == 'self'):
+            return None, None, None
+        elif (isinstance(node.targets[0].target.value, cst.Name) and
+              isinstance(node.targets[0].target.attr, cst.Name)):
+            return node.targets[0].target.value.value, node.targets[0].target.attr.value, None
+    elif isinstance(node.targets[0].target, cst.Subscript) and isinstance(node.targets[0].target.value, cst.Name):
+        return node.targets[0].target.value.value, None, subscript_index(node.targets[0].target.slice[0])
+    return None, None, None
+
+
+def assignment_reference(node: cst.CSTNode) -> Tuple[str, str]:
+    """We check whether an assignment assigns a variable to another variable, e.g. `a = b`
+
+    Parameters
+    ----------
+    node: cst.CSTNode
+        The assignment node
+
+    Returns
+    -------
+    (str, str)
+        The left-hand and right-hand variable names if it is the case, otherwise None, None
+    """
+    if isinstance(node, cst.Assign):
+        if isinstance(node.targets[0], cst.AssignTarget):
+            if isinstance(node.targets[0].target, cst.Name) and \
+                    isinstance(node.value, cst.Name):
+                return node.targets[0].target.value, node.value.value
+    return None, None
+
+
+class DefUseTable():
+    """
+    This class precomputes the def-use events of the statements of one function from its libcst tree, in the order
+    in which the instrumented code reports them at runtime: reads of variables, attributes and elements, writes and
+    augmented assignments. Like the instrumentation, only names which are defined in the code file are read, and
+    the targets of assignments are not. Replaying the events of the executed statements rebuilds the same meta-data
+    as the hooks of Slice, without looking up a syntax tree node per event.
+
+    Attributes
+    ----------
+    statements : Dict[cst.CSTNode, List[DefUseEvent]]
+        A dictionary which maps every small statement, and every if, while, for and with statement, to the events
+        of one execution of it (of its header for compound statements)
+
+    positions : Mapping[cst.CSTNode, CodeRange]
+        The resolved PositionProvider metadata of the module that contains the function
+
+    local_names : Set[cst.Name]
+        The name nodes of the function whose value is defined in the code file, i.e. not a builtin or an import
+
+    index_expressions : Dict[Tuple[int, int, int, int], cst.BaseExpression]
+        A dictionary which maps the span of every element read to the expression of its (first) index, None for
+        slices. A tracing backend evaluates it to get the key of the read
+    -------
+    """
+    statements: Dict[cst.CSTNode, List[DefUseEvent]]
+    index_expressions: Dict[Tuple[int, int, int, int], cst.BaseExpression]
+
+    def __init__(self, function: cst.FunctionDef, positions, local_names: Set[cst.Name]) -> None:
+        """
+        Parameters
+        ----------
+        function: cst.FunctionDef
+            The function node whose statements should be analyzed
+
+        positions: Mapping[cst.CSTNode, CodeRange]
+            The resolved PositionProvider metadata of the module that contains the function
+
+        local_names: Set[cst.Name]
+            The name nodes whose value is defined in the code file
+        """
+        self.positions = positions
+        self.local_names = local_names
+        self.statements = dict()
+        self.index_expressions = dict()
+        self.events: List[DefUseEvent] = []
+        self.add_suite(function.body)
+
+    def key(self, node: cst.CSTNode) -> Tuple[int, int, int, int]:
+        """Returns the span of a node, which matches the location of its iid. Nested nodes may start at the same
+        line and column, e.g. m[k] and m[k]["y"], so the end is part of the key
+
+        Parameters
+        ----------
+        node : cst.CSTNode
+            The syntax tree node
+
+        Returns
+        -------
+        (int, int, int, int)
+            The start line, start column, end line and end column of the node
+        """
+        position = self.positions[node]
+        return position.start.line, position.start.column, position.end.line, position.end.column
+
+    def add_event(self, kind: str, node: cst.CSTNode, arguments: tuple) -> None:
+        """Appends an event of node to the events of the current statement
+
+        Parameters
+        ----------
+        kind : str
+            The kind of the event: read, write, augmented_assignment, attribute_read or subscript_read
+
+        node : cst.CSTNode
+            The syntax tree node that reports the event
+
+        arguments : tuple
+            The arguments of the matching record method of Slice, without the line number and the values that
+            are only known at runtime
+
+        Returns
+        -------
+        None
+        """
+        span = self.key(node)
+        self.events.append(DefUseEvent(kind, span[0], span, arguments))
+
+    def add_suite(self, suite: cst.BaseSuite) -> None:
+        """Adds the events of an indented block or of a one-line suite
+
+        Parameters
+        ----------
+        suite : cst.BaseSuite
+            The block of statements
+
+        Returns
+        -------
+        None
+        """
+        if isinstance(suite, cst.SimpleStatementSuite):
+            for small_statement in suite.body:
+                self.add_small_statement(small_statement)
+            return
+        for statement in suite.body:
+            self.add_statement(statement)
+
+    def add_header(self, statement: cst.BaseCompoundStatement, expressions: List[cst.BaseExpression]) -> None:
+        """Adds the events of the header of a compound statement
+
+        Parameters
+        ----------
+        statement : cst.BaseCompoundStatement
+            The compound statement
+
+        expressions : List[cst.BaseExpression]
+            The expressions which are evaluated by its header
+
+        Returns
+        -------
+        None
+        """
+        self.events = []
+        for expression in expressions:
+            self.add_expression(expression)
+        self.statements[statement] = self.events
+
+    def add_statement(self, statement: cst.BaseStatement) -> None:
+        """Adds the events of a statement and of the statements inside it
+
+        Parameters
+        ----------
+        statement : cst.BaseStatement
+            The statement
+
+        Returns
+        -------
+        None
+        """
+        if isinstance(statement, cst.SimpleStatementLine):
+            for small_statement in statement.body:
+                self.add_small_statement(small_statement)
+        elif isinstance(statement, cst.If):
+            self.add_header(statement, [statement.test])
+            self.add_suite(statement.body)
+            if isinstance(statement.orelse, cst.If):
+                self.add_statement(statement.orelse)
+            elif statement.orelse is not None:
+                self.add_suite(statement.orelse.body)
+        elif isinstance(statement, (cst.While, cst.For)):
+            self.add_header(statement, [statement.test if isinstance(statement, cst.While) else statement.iter])
+            self.add_suite(statement.body)
+            if statement.orelse is not None:
+                self.add_suite(statement.orelse.body)
+        elif isinstance(statement, cst.With):
+            self.add_header(statement, [item.item for item in statement.items])
+            self.add_suite(statement.body)
+        elif isinstance(statement, cst.Try):
+            self.add_suite(statement.body)
+            for handler in statement.handlers:
+                self.add_suite(handler.body)
+            if statement.orelse is not None:
+                self.add_suite(statement.orelse.body)
+            if statement.finalbody is not None:
+                self.add_suite(statement.finalbody.body)
+
+    def add_small_statement(self, node: cst.BaseSmallStatement) -> None:
+        """Adds the events of a small statement. The targets of assignments are not read, except the attributes
+        and elements which are updated by an augmented assignment
+
+        Parameters
+        ----------
+        node : cst.BaseSmallStatement
+            The small statement
+
+        Returns
+        -------
+        None
+        """
+        self.events = []
+        if isinstance(node, cst.Assign):
+            self.add_expression(node.value)
+            self.add_write(node)
+        elif isinstance(node, cst.AugAssign):
+            self.add_expression(node.value)
+            if not isinstance(node.target, cst.Name):
+                self.add_expression(node.target)
+            self.add_write(node)
+            variable_name, property_name, index = assignment_target(node)
+            if variable_name is not None:
+                self.add_event("augmented_assignment", node, (variable_name, property_name, index))
+        elif isinstance(node, (cst.AnnAssign, cst.Expr, cst.Return)):
+            if node.value is not None:
+                self.add_expression(node.value)
+        elif isinstance(node, cst.Raise):
+            if node.exc is not None:
+                self.add_expression(node.exc)
+        elif isinstance(node, cst.Assert):
+            self.add_expression(node.test)
+            if node.msg is not None:
+                self.add_expression(node.msg)
+        self.statements[node] = self.events
+
+    def add_write(self, node: cst.CSTNode) -> None:
+        """Adds the write event of an assignment, if its target is a variable, an attribute or an element
+
+        Parameters
+        ----------
+        node : cst.CSTNode
+            The assignment node
+
+        Returns
+        -------
+        None
+        """
+        variable_name, property_name, index = assignment_target(node)
+        if variable_name is not None:
+            self.add_event("write", node, (variable_name, property_name, index, assignment_reference(node)))
+
+    def add_expression(self, node: cst.CSTNode, parent: cst.CSTNode = None) -> None:
+        """Adds the events of an expression in the order of its evaluation, i.e. every node after its children.
+        The body of a lambda is added where the lambda is defined
+
+        Parameters
+        ----------
+        node : cst.CSTNode
+            The expression
+
+        parent : cst.CSTNode
+            The attribute or subscript whose base is node, if it is the case
+
+        Returns
+        -------
+        None
+        """
+        if isinstance(node, cst.Name):
+            if node not in self.local_names:
+                return
+            attribute_name = None
+            if isinstance(parent, cst.Attribute) and isinstance(parent.attr, cst.Name):
+                attribute_name = parent.attr.value
+            self.add_event("read", node, ([node.value], attribute_name))
+        elif isinstance(node, cst.Attribute):
+            self.add_expression(node.value, node)
+            self.add_event("read", node, ([], None))
+            if isinstance(node.value, cst.Name):
+                self.add_event("attribute_read", node, (node.value.value, node.attr.value))
+        elif isinstance(node, cst.Subscript):
+            self.add_expression(node.value, node)
+            for element in node.slice:
+                self.add_expression(element.slice)
+            self.add_event("read", node, ([], None))
+            if isinstance(node.value, cst.Name):
+                self.add_event("subscript_read", node, (node.value.value, ))
+                index = node.slice[0].slice
+                self.index_expressions[self.key(node)] = index.value if isinstance(index, cst.Index) else None
+        elif isinstance(node, cst.Arg):
+            self.add_expression(node.value)
+        elif isinstance(node, cst.Lambda):
+            self.add_expression(node.body)
+        elif isinstance(node, cst.CompFor):
+            self.add_expression(node.iter)
+            for condition in node.ifs:
+                self.add_expression(condition)
+            if node.inner_for_in is not None:
+                self.add_expression(node.inner_for_in)
+        else:
+            for child in node.children:
+                self.add_expression(child)
+
+
+class LocalNameFinder(cst.CSTVisitor):
+    """
+    This class finds the name nodes whose value is defined in the code file, which are the names that the
+    instrumentation reports reads of
+
+    Attributes
+    ----------
+    local_names : Set[cst.Name]
+        The name nodes whose qualified name has a local source
+    -------
+    """
+    METADATA_DEPENDENCIES = (QualifiedNameProvider,)
+
+    def __init__(self):
+        self.local_names = set()
+
+    def visit_Name(self, node: cst.Name) -> Optional[bool]:
+        names = self.get_metadata(QualifiedNameProvider, node, set())
+        if len(names) > 0 and list(names)[0].source == QualifiedNameSource.LOCAL:
+            self.local_names.add(node)
+
+
+def build_def_use_table(module: cst.Module, function_line: int) -> Tuple[Optional[cst.FunctionDef], DefUseTable]:
+    """ This method builds the def-use table of the function that starts at function_line
+
+    Parameters
+    ----------
+    module: cst.Module
+        The syntax tree of the code file
+
+    function_line: int
+        The line number of the `def` keyword of the function
+
+    Returns
+    ----------
+    (cst.FunctionDef, DefUseTable)
+        The function node, whose statements are the keys of the table, and the table. None, None if no function
+        starts at function_line
+    """
+    wrapper = cst.metadata.MetadataWrapper(module)
+    finder = FunctionFinder(function_line)
+    wrapper.visit(finder)
+    if finder.function is None:
+        return None, None
+    positions = wrapper.resolve(PositionProvider)
+    name_finder = LocalNameFinder()
+    wrapper.visit(name_finder)
+    return finder.function, DefUseTable(finder.function, positions, name_finder.local_names)
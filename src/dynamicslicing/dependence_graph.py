@@ -0,0 +1,629 @@
+from typing import Dict, Iterable, List, Mapping, Set
+from dynamicslicing.utils import LineMetaData
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+MATRIX_MIN_LINES = 1000
+MATRIX_MIN_DENSITY = 0.02
+
+
+def dependence_edges(lines_info: Mapping[int, LineMetaData]) -> Dict[int, List[int]]:
+    """Takes the edges of the dependence graph from the lines_info meta-data. A dependency on a variable which was
+    not defined before is recorded as previous_definition, -1, which is no node and is left out
+
+    Parameters
+    ----------
+    lines_info: Mapping[int, LineMetaData]
+        A mapping which holds the LineMetaData of every line number in code
+
+    Returns
+    -------
+    Dict[int, List[int]]
+        A mapping from every line number to the line numbers that it depends on
+    """
+    return {line: [dependency for dependency in info.dependencies if dependency >= 0]
+            for line, info in lines_info.items()}
+
+
+class ReachabilityIndex():
+    """
+    This class precomputes, for every line of a dependence graph, the set of lines that it transitively depends on.
+    The graph is condensed into its strongly connected components, and every component stores a bitset (a Python int)
+    of the components reachable from it. After the index is built, a slice is a bitset lookup (or a union of lookups).
+
+    Attributes
+    ----------
+    component_of: Dict[int, int]
+        A dictionary which maps every line number to the id of its strongly connected component
+
+    component_lines: List[List[int]]
+        A list which holds the line numbers of every component, indexed by component id
+
+    reachable: List[int]
+        A list of bitsets, indexed by component id. Bit i is set if component i is reachable from the component
+    -------
+    """
+    component_of: Dict[int, int]
+    component_lines: List[List[int]]
+    reachable: List[int]
+
+    def __init__(self, edges: Mapping[int, Iterable[int]]) -> None:
+        """
+        Parameters
+        ----------
+        edges: Mapping[int, Iterable[int]]
+            A mapping from every line number to the line numbers that it depends on
+        """
+        self.component_of = dict()
+        self.component_lines = list()
+        self.reachable = list()
+        self._slices: Dict[int, List[int]] = dict()
+        self._build(edges)
+
+    @classmethod
+    def from_lines_info(cls, lines_info: Mapping[int, LineMetaData]) -> "ReachabilityIndex":
+        """Builds the index from the lines_info meta-data which is recorded during the execution
+
+        Parameters
+        ----------
+        lines_info: Mapping[int, LineMetaData]
+            A mapping which holds the LineMetaData of every line number in code
+
+        Returns
+        -------
+        ReachabilityIndex
+            The index over the dependence graph of lines_info
+        """
+        return cls(dependence_edges(lines_info))
+
+    def _build(self, edges: Mapping[int, Iterable[int]]) -> None:
+        """Runs an iterative version of Tarjan's algorithm. Components are emitted in reverse topological order, so
+        the bitset of every successor component is already final when a component is emitted.
+
+        Parameters
+        ----------
+        edges: Mapping[int, Iterable[int]]
+            A mapping from every line number to the line numbers that it depends on
+
+        Returns
+        -------
+        None
+        """
+        successors: Dict[int, List[int]] = {line: list(set(dependencies)) for line, dependencies in edges.items()}
+        for dependencies in list(successors.values()):
+            for dependency in dependencies:
+                if dependency not in successors:
+                    successors[dependency] = []
+
+        index_of: Dict[int, int] = dict()
+        low_link: Dict[int, int] = dict()
+        on_stack: Dict[int, bool] = dict()
+        stack: List[int] = list()
+        counter = 0
+        for root in successors:
+            if root in index_of:
+                continue
+            work = [(root, 0)]
+            while work:
+                line, position = work.pop()
+                if position == 0:
+                    index_of[line] = counter
+                    low_link[line] = counter
+                    counter += 1
+                    stack.append(line)
+                    on_stack[line] = True
+                children = successors[line]
+                while position < len(children):
+                    child = children[position]
+                    position += 1
+                    if child not in index_of:
+                        work.append((line, position))
+                        work.append((child, 0))
+                        break
+                    elif on_stack.get(child, False):
+                        low_link[line] = min(low_link[line], index_of[child])
+                else:
+                    if low_link[line] == index_of[line]:
+                        self._emit_component(line, stack, on_stack, successors)
+                    if work:
+                        parent = work[-1][0]
+                        low_link[parent] = min(low_link[parent], low_link[line])
+
+    def _emit_component(self, root: int, stack: List[int], on_stack: Dict[int, bool],
+                        successors: Dict[int, List[int]]) -> None:
+        """Pops one strongly connected component from the Tarjan stack and computes its reachability bitset
+
+        Parameters
+        ----------
+        root: int
+            The line number which is the root of the component
+
+        stack: List[int]
+            The Tarjan stack
+
+        on_stack: Dict[int, bool]
+            A dictionary that indicates whether a line number is on the Tarjan stack
+
+        successors: Dict[int, List[int]]
+            A mapping from every line number to the line numbers that it depends on
+
+        Returns
+        -------
+        None
+        """
+        component = len(self.component_lines)
+        lines: List[int] = list()
+        while True:
+            line = stack.pop()
+            on_stack[line] = False
+            self.component_of[line] = component
+            lines.append(line)
+            if line == root:
+                break
+        bits = 1 << component
+        for line in lines:
+            for dependency in successors[line]:
+                if self.component_of[dependency] != component:
+                    bits |= self.reachable[self.component_of[dependency]]
+        self.component_lines.append(sorted(lines))
+        self.reachable.append(bits)
+
+    def bitset(self, line_number: int) -> int:
+        """Returns the bitset of components that a line transitively depends on, including its own component
+
+        Parameters
+        ----------
+        line_number : int
+            The line number of the slicing criterion
+
+        Returns
+        -------
+        int
+            A bitset of component ids, or 0 if the line is not part of the dependence graph
+        """
+        component = self.component_of.get(line_number)
+        if component is None:
+            return 0
+        return self.reachable[component]
+
+    def lines_of(self, bits: int) -> List[int]:
+        """Converts a bitset of component ids to the sorted list of their line numbers
+
+        Parameters
+        ----------
+        bits : int
+            A bitset of component ids
+
+        Returns
+        -------
+        List[int]
+            A sorted list of line numbers
+        """
+        result: List[int] = list()
+        while bits:
+            lowest = bits & -bits
+            result += self.component_lines[lowest.bit_length() - 1]
+            bits ^= lowest
+        return sorted(result)
+
+    def slice(self, line_number: int) -> List[int]:
+        """Computes the backward slice of one line. The result of every component is cached after the first query.
+
+        Parameters
+        ----------
+        line_number : int
+            The line number of the slicing criterion
+
+        Returns
+        -------
+        List[int]
+            A sorted list of line numbers that should be kept
+        """
+        component = self.component_of.get(line_number)
+        if component is None:
+            return [line_number]
+        if component not in self._slices:
+            self._slices[component] = self.lines_of(self.reachable[component])
+        return list(self._slices[component])
+
+    def slice_many(self, line_numbers: Iterable[int]) -> List[int]:
+        """Computes the union of the backward slices of several lines
+
+        Parameters
+        ----------
+        line_numbers : Iterable[int]
+            The line numbers of the slicing criteria
+
+        Returns
+        -------
+        List[int]
+            A sorted list of line numbers that should be kept
+        """
+        bits = 0
+        missing: List[int] = list()
+        for line_number in line_numbers:
+            component = self.component_of.get(line_number)
+            if component is None:
+                missing.append(line_number)
+            else:
+                bits |= self.reachable[component]
+        return sorted(set(self.lines_of(bits) + missing))
+
+
+class DependenceGraph():
+    """
+    This class holds the dependence graph of lines_info together with its reverse edges, which are built once.
+    Besides backward slices it answers forward slices (every line affected by a line) and chops (every line on a
+    path from a source line to a sink line).
+
+    Attributes
+    ----------
+    dependencies: Dict[int, List[int]]
+        A dictionary which maps every line number to the line numbers that it depends on
+
+    dependents: Dict[int, List[int]]
+        A dictionary which maps every line number to the line numbers that depend on it
+    -------
+    """
+    dependencies: Dict[int, List[int]]
+    dependents: Dict[int, List[int]]
+
+    def __init__(self, edges: Mapping[int, Iterable[int]]) -> None:
+        """
+        Parameters
+        ----------
+        edges: Mapping[int, Iterable[int]]
+            A mapping from every line number to the line numbers that it depends on
+        """
+        self.dependencies = {line: list(set(dependencies)) for line, dependencies in edges.items()}
+        self.dependents = dict()
+        for line, dependencies in self.dependencies.items():
+            for dependency in dependencies:
+                self.dependents.setdefault(dependency, []).append(line)
+
+    @classmethod
+    def from_lines_info(cls, lines_info: Mapping[int, LineMetaData]) -> "DependenceGraph":
+        """Builds the graph from the lines_info meta-data which is recorded during the execution
+
+        Parameters
+        ----------
+        lines_info: Mapping[int, LineMetaData]
+            A mapping which holds the LineMetaData of every line number in code
+
+        Returns
+        -------
+        DependenceGraph
+            The dependence graph of lines_info
+        """
+        return cls(dependence_edges(lines_info))
+
+    def _traverse(self, line_number: int, edges: Dict[int, List[int]], within: Set[int] = None) -> Set[int]:
+        """Collects every line that is reachable from a line over the given edges
+
+        Parameters
+        ----------
+        line_number : int
+            The line number where the traversal starts
+
+        edges: Dict[int, List[int]]
+            Either the dependencies or the dependents of every line
+
+        within: Set[int]
+            If provided, the traversal never leaves this set of line numbers
+
+        Returns
+        -------
+        Set[int]
+            The set of reached line numbers, including line_number
+        """
+        reached = {line_number}
+        work = [line_number]
+        while work:
+            line = work.pop()
+            for neighbour in edges.get(line, ()):
+                if neighbour not in reached and (within is None or neighbour in within):
+                    reached.add(neighbour)
+                    work.append(neighbour)
+        return reached
+
+    def backward_slice(self, line_number: int) -> List[int]:
+        """Computes every line that the given line transitively depends on
+
+        Parameters
+        ----------
+        line_number : int
+            The line number of the slicing criterion
+
+        Returns
+        -------
+        List[int]
+            A sorted list of line numbers, including line_number
+        """
+        return sorted(self._traverse(line_number, self.dependencies))
+
+    def forward_slice(self, line_number: int) -> List[int]:
+        """Computes every line that transitively depends on the given line
+
+        Parameters
+        ----------
+        line_number : int
+            The line number of the slicing criterion
+
+        Returns
+        -------
+        List[int]
+            A sorted list of line numbers, including line_number
+        """
+        return sorted(self._traverse(line_number, self.dependents))
+
+    def chop(self, source_line: int, sink_line: int) -> List[int]:
+        """Computes every line on a dependence path from source_line to sink_line. The backward traversal from the
+        sink bounds the forward traversal from the source, so the second traversal only visits lines of the chop.
+
+        Parameters
+        ----------
+        source_line : int
+            The line number where the paths start
+
+        sink_line : int
+            The line number where the paths end
+
+        Returns
+        -------
+        List[int]
+            A sorted list of line numbers, empty if sink_line does not depend on source_line
+        """
+        backward = self._traverse(sink_line, self.dependencies)
+        if source_line not in backward:
+            return []
+        return sorted(self._traverse(source_line, self.dependents, backward))
+
+
+class MatrixClosureEngine():
+    """
+    This class packs a dependence graph into a NumPy adjacency matrix with one bit per cell and computes the slices
+    of many criteria together, with a batched frontier traversal: one step of a traversal is a vectorized OR of the
+    packed rows of its frontier. It pays off for large and dense graphs, where traversing the dependencies line by
+    line in Python is slow.
+
+    Attributes
+    ----------
+    lines: List[int]
+        A list of all line numbers of the graph, the position of a line is its row and column in the matrix
+
+    position_of: Dict[int, int]
+        A dictionary which maps every line number to its position
+
+    adjacency: np.ndarray
+        A uint8 matrix of the rows packed with np.packbits, bit j of row i is set if line i depends on line j
+    -------
+    """
+    lines: List[int]
+    position_of: Dict[int, int]
+    adjacency: "np.ndarray"
+
+    def __init__(self, edges: Mapping[int, Iterable[int]]) -> None:
+        """
+        Parameters
+        ----------
+        edges: Mapping[int, Iterable[int]]
+            A mapping from every line number to the line numbers that it depends on
+        """
+        if np is None:
+            raise ImportError("MatrixClosureEngine requires numpy")
+        nodes = set(edges.keys())
+        for dependencies in edges.values():
+            nodes.update(dependencies)
+        self.lines = sorted(nodes)
+        self.position_of = {line: position for position, line in enumerate(self.lines)}
+        self.adjacency = np.zeros((len(self.lines), (len(self.lines) + 7) // 8), dtype=np.uint8)
+        row = np.zeros(len(self.lines), dtype=bool)
+        for line, dependencies in edges.items():
+            positions = [self.position_of[dependency] for dependency in dependencies]
+            if len(positions) == 0:
+                continue
+            row[positions] = True
+            self.adjacency[self.position_of[line]] = np.packbits(row)
+            row[positions] = False
+
+    @classmethod
+    def from_lines_info(cls, lines_info: Mapping[int, LineMetaData]) -> "MatrixClosureEngine":
+        """Builds the engine from the lines_info meta-data which is recorded during the execution
+
+        Parameters
+        ----------
+        lines_info: Mapping[int, LineMetaData]
+            A mapping which holds the LineMetaData of every line number in code
+
+        Returns
+        -------
+        MatrixClosureEngine
+            The engine over the dependence graph of lines_info
+        """
+        return cls(dependence_edges(lines_info))
+
+    def slices(self, line_numbers: Iterable[int]) -> Dict[int, List[int]]:
+        """Computes the backward slices of all given lines together. Every row of the frontier matrix belongs to one
+        criterion, and one step of its traversal ORs the packed adjacency rows of its frontier. A line enters the
+        frontier of a criterion at most once, so every row of the adjacency matrix is read at most once per criterion.
+
+        Parameters
+        ----------
+        line_numbers : Iterable[int]
+            The line numbers of the slicing criteria
+
+        Returns
+        -------
+        Dict[int, List[int]]
+            A dictionary which maps every criterion to the sorted list of line numbers that should be kept
+        """
+        criteria = list(dict.fromkeys(line_numbers))
+        result: Dict[int, List[int]] = {line: [line] for line in criteria if line not in self.position_of}
+        known = [line for line in criteria if line in self.position_of]
+        if len(known) == 0:
+            return result
+        reached = np.zeros((len(known), len(self.lines)), dtype=bool)
+        reached[np.arange(len(known)), [self.position_of[line] for line in known]] = True
+        frontier = reached.copy()
+        while True:
+            packed = np.zeros((len(known), self.adjacency.shape[1]), dtype=np.uint8)
+            for row in range(len(known)):
+                positions = np.flatnonzero(frontier[row])
+                if len(positions) > 0:
+                    packed[row] = np.bitwise_or.reduce(self.adjacency[positions], axis=0)
+            step = np.unpackbits(packed, axis=1, count=len(self.lines)).astype(bool)
+            step &= ~reached
+            if not step.any():
+                break
+            reached |= step
+            frontier = step
+        lines = np.array(self.lines)
+        for row, line in enumerate(known):
+            result[line] = lines[reached[row]].tolist()
+        return result
+
+
+def select_closure_engine(line_count: int, edge_count: int) -> str:
+    """Picks the engine for computing slices. The NumPy engine is used for large and dense graphs when NumPy is
+    installed, otherwise the slices are computed in Python with the reachability index.
+
+    Parameters
+    ----------
+    line_count : int
+        The number of lines (nodes) of the dependence graph
+
+    edge_count : int
+        The number of dependencies (edges) of the dependence graph
+
+    Returns
+    -------
+    str
+        "numpy" or "python"
+    """
+    if np is None or line_count < MATRIX_MIN_LINES:
+        return "python"
+    if edge_count / (line_count * line_count) < MATRIX_MIN_DENSITY:
+        return "python"
+    return "numpy"
+
+
+class DependenceQueries():
+    """
+    This class is the mixin of the analyses which answer slicing queries over the dependence graph which they
+    record in lines_info, after the execution. The indexes are built on the first query and kept until the analysis
+    is reset.
+
+    Attributes
+    ----------
+    lines_info : Mapping[int, LineMetaData]
+        The dependencies of every line, recorded by the analysis
+
+    reachability_index : ReachabilityIndex
+        The index which answers backward slices, None before the first query
+
+    dependence_graph : DependenceGraph
+        The reverse edges which answer forward slices and chops, None before the first query
+    -------
+    """
+    lines_info: Mapping[int, LineMetaData]
+    reachability_index: ReachabilityIndex
+    dependence_graph: DependenceGraph
+
+    def build_reachability_index(self) -> ReachabilityIndex:
+        """This method builds the reachability index over lines_info. After that, compute_slice and query_slice
+        answer any line with a bitset lookup instead of a traversal of the dependencies.
+
+        Returns
+        -------
+        ReachabilityIndex
+            The index over the dependence graph
+        """
+        self.reachability_index = ReachabilityIndex.from_lines_info(self.lines_info)
+        return self.reachability_index
+
+    def query_slice(self, line_numbers: Iterable[int]) -> List[int]:
+        """This method computes the union of the slices of the given lines. It can be called any number of times
+        after the execution, the reachability index is built on the first call.
+
+        Parameters
+        ----------
+        line_numbers : Iterable[int]
+            The line numbers of the slicing criteria
+
+        Returns
+        -------
+        List[int]
+            A sorted list of line numbers that should be kept
+        """
+        if self.reachability_index is None:
+            self.build_reachability_index()
+        return self.reachability_index.slice_many(line_numbers)
+
+    def query_slices(self, line_numbers: Iterable[int]) -> Dict[int, List[int]]:
+        """This method computes the slice of every given line separately. For large and dense graphs the slices of
+        all lines are computed together with the NumPy engine, if NumPy is installed, otherwise the reachability
+        index is built and queried.
+
+        Parameters
+        ----------
+        line_numbers : Iterable[int]
+            The line numbers of the slicing criteria
+
+        Returns
+        -------
+        Dict[int, List[int]]
+            A dictionary which maps every line number to the sorted list of line numbers that should be kept
+        """
+        line_numbers = list(line_numbers)
+        if self.reachability_index is None:
+            edges = dependence_edges(self.lines_info)
+            lines = set(edges.keys())
+            edge_count = 0
+            for dependencies in edges.values():
+                lines.update(dependencies)
+                edge_count += len(dependencies)
+            if select_closure_engine(len(lines), edge_count) == "numpy":
+                return MatrixClosureEngine(edges).slices(line_numbers)
+            self.build_reachability_index()
+        return {line: self.reachability_index.slice(line) for line in line_numbers}
+
+    def forward_slice(self, line_number: int) -> List[int]:
+        """This method computes every line that is affected by the given line, i.e. that transitively depends on it.
+        The reverse edges of lines_info are built on the first query.
+
+        Parameters
+        ----------
+        line_number : int
+            The line number of the slicing criterion
+
+        Returns
+        -------
+        List[int]
+            A sorted list of line numbers, including line_number
+        """
+        if self.dependence_graph is None:
+            self.dependence_graph = DependenceGraph.from_lines_info(self.lines_info)
+        return self.dependence_graph.forward_slice(line_number)
+
+    def chop(self, source_line: int, sink_line: int) -> List[int]:
+        """This method computes every line on a dependence path from source_line to sink_line
+
+        Parameters
+        ----------
+        source_line : int
+            The line number where the paths start
+
+        sink_line : int
+            The line number where the paths end
+
+        Returns
+        -------
+        List[int]
+            A sorted list of line numbers, empty if sink_line does not depend on source_line
+        """
+        if self.dependence_graph is None:
+            self.dependence_graph = DependenceGraph.from_lines_info(self.lines_info)
+        return self.dependence_graph.chop(source_line, sink_line)
@@ -0,0 +1,332 @@
+import runpy
+import sys
+from contextlib import redirect_stdout
+from importlib.abc import InspectLoader, MetaPathFinder
+from importlib.machinery import ModuleSpec, PathFinder
+from os import path
+from types import CodeType, ModuleType
+from typing import Any, Dict, List, MutableMapping, Optional, Sequence, TextIO
+from dynapyt.analyses.BaseAnalysis import BaseAnalysis
+from dynapyt.utils.hooks import get_hooks_from_analysis
+from dynamicslicing.program_cache import InstrumentedProgram, ProgramCache, instrument_program, program_hash
+from dynamicslicing.utils import LRUCache
+
+# The number of instrumented programs which a finder keeps in memory by default
+PROGRAM_CAPACITY = 32
+
+
+class InstrumentingFinder(MetaPathFinder):
+    """
+    This class is a meta path finder which instruments selected code files in memory when they are imported,
+    instead of rewriting them in place like instrument_file. Neither the .orig copy nor the IID file is created:
+    the syntax tree and the IIDs of every instrumented file are handed to the analyses through their `asts`.
+    The most recently used instrumented programs are cached by the hash of their path, source and hooks, so
+    importing the same program again, e.g. to slice it with another criterion, skips the instrumentation. With a
+    ProgramCache, the cache also outlives the process.
+
+    Attributes
+    ----------
+    programs : MutableMapping[str, InstrumentedProgram]
+        The instrumented programs, by their hash. An LRUCache of PROGRAM_CAPACITY programs unless the finder is
+        given another mapping, e.g. one which is shared with other finders
+
+    source_paths : Set[str]
+        The absolute paths of the code files to be instrumented
+
+    analyses : List[BaseAnalysis]
+        The analyses which receive the syntax trees and IIDs of the instrumented files
+
+    selected_hooks : Dict[str, Any]
+        The hooks of the analyses, as computed by get_hooks_from_analysis
+
+    cache : ProgramCache
+        The persistent cache of instrumented programs, None to keep them in memory only
+    -------
+    """
+    programs: MutableMapping[str, InstrumentedProgram]
+
+    def __init__(self, source_paths: Sequence[str], analyses: List[BaseAnalysis], cache: ProgramCache = None,
+                 selected_hooks: Dict[str, Any] = None,
+                 programs: MutableMapping[str, InstrumentedProgram] = None) -> None:
+        """
+        Parameters
+        ----------
+        source_paths: Sequence[str]
+            The paths of the code files to be instrumented
+
+        analyses: List[BaseAnalysis]
+            The analyses to run
+
+        cache: ProgramCache
+            The persistent cache of instrumented programs, None to keep them in memory only
+
+        selected_hooks: Dict[str, Any]
+            The hooks of the analyses if they are known already, otherwise they are computed
+
+        programs: MutableMapping[str, InstrumentedProgram]
+            The mapping to keep the instrumented programs in, a new LRUCache of PROGRAM_CAPACITY programs if None
+        """
+        self.source_paths = {path.abspath(source_path) for source_path in source_paths}
+        self.analyses = analyses
+        self.selected_hooks = selected_hooks if selected_hooks is not None else get_hooks_from_analysis(analyses)
+        self.cache = cache
+        self.programs = programs if programs is not None else LRUCache(PROGRAM_CAPACITY)
+
+    def find_spec(self, fullname: str, search_path: Optional[Sequence[str]],
+                  target: Optional[ModuleType] = None) -> Optional[ModuleSpec]:
+        """This method finds the module like the path finder does, and takes over the loading if its code file is
+        one of source_paths
+
+        Parameters
+        ----------
+        fullname: str
+            The full name of the module
+
+        search_path: Sequence[str]
+            The __path__ of the parent package, None for a top-level module
+
+        target: ModuleType
+            The module which is reloaded, if it is the case
+
+        Returns
+        -------
+        ModuleSpec
+            The spec with an InstrumentingLoader, None if the module is not instrumented
+        """
+        spec = PathFinder.find_spec(fullname, search_path, target)
+        if spec is None or spec.origin is None or path.abspath(spec.origin) not in self.source_paths:
+            return None
+        spec.loader = InstrumentingLoader(self, path.abspath(spec.origin))
+        return spec
+
+    def instrument(self, source_path: str) -> InstrumentedProgram:
+        """This method instruments a code file, or takes it from the cache if it was instrumented before
+
+        Parameters
+        ----------
+        source_path: str
+            The absolute path to the code file
+
+        Returns
+        -------
+        InstrumentedProgram
+            The instrumented program
+        """
+        with open(source_path, "r") as file:
+            source = file.read()
+        key = program_hash(source_path, source, self.selected_hooks)
+        program = self.programs.get(key)
+        if program is None:
+            program = None if self.cache is None else self.cache.load(key)
+            if program is None:
+                program = instrument_program(source_path, source, self.selected_hooks)
+                if self.cache is not None:
+                    self.cache.store(key, program)
+            self.programs[key] = program
+        return program
+
+    def register(self, source_path: str, program: InstrumentedProgram) -> None:
+        """This method hands the syntax tree, the IIDs and the BytecodeTable of an instrumented file to the analyses,
+        under the path which the instrumented code reports (`<source_path>.orig`)
+
+        Parameters
+        ----------
+        source_path: str
+            The absolute path to the code file
+
+        program: InstrumentedProgram
+            The instrumented program
+
+        Returns
+        -------
+        None
+        """
+        for analysis in self.analyses:
+            analysis.asts[source_path + ".orig"] = (program.module, program.iids)
+            if program.table is not None and hasattr(analysis, "bytecode_tables"):
+                analysis.bytecode_tables[source_path + ".orig"] = program.table
+
+    def install(self) -> None:
+        """Puts the finder at the front of sys.meta_path
+
+        Returns
+        -------
+        None
+        """
+        if self not in sys.meta_path:
+            sys.meta_path.insert(0, self)
+
+    def uninstall(self) -> None:
+        """Removes the finder from sys.meta_path
+
+        Returns
+        -------
+        None
+        """
+        if self in sys.meta_path:
+            sys.meta_path.remove(self)
+
+
+class InstrumentingLoader(InspectLoader):
+    """
+    This class loads a module from the code which InstrumentingFinder instrumented in memory
+
+    Attributes
+    ----------
+    finder : InstrumentingFinder
+        The finder which found the module
+
+    source_path : str
+        The absolute path to the code file of the module
+    -------
+    """
+
+    def __init__(self, finder: InstrumentingFinder, source_path: str) -> None:
+        """
+        Parameters
+        ----------
+        finder: InstrumentingFinder
+            The finder which found the module
+
+        source_path: str
+            The absolute path to the code file of the module
+        """
+        self.finder = finder
+        self.source_path = source_path
+
+    def get_code(self, fullname: str) -> CodeType:
+        """This method returns the instrumented code object of the module, and hands its syntax tree and IIDs to the
+        analyses. runpy runs modules through this method
+
+        Parameters
+        ----------
+        fullname: str
+            The full name of the module
+
+        Returns
+        -------
+        CodeType
+            The instrumented code object
+        """
+        program = self.finder.instrument(self.source_path)
+        self.finder.register(self.source_path, program)
+        return program.code
+
+    def get_source(self, fullname: str) -> str:
+        """This method returns the original source of the module
+
+        Parameters
+        ----------
+        fullname: str
+            The full name of the module
+
+        Returns
+        -------
+        str
+            The source before the instrumentation
+        """
+        return self.finder.instrument(self.source_path).source
+
+    def exec_module(self, module: ModuleType) -> None:
+        """This method executes the instrumented code in the namespace of the module
+
+        Parameters
+        ----------
+        module: ModuleType
+            The module
+
+        Returns
+        -------
+        None
+        """
+        exec(self.get_code(module.__name__), module.__dict__)
+
+
+def run_program(source_path: str, analyses: List[BaseAnalysis], module_name: str = None,
+                cache: ProgramCache = None) -> List[BaseAnalysis]:
+    """ This method runs a code file under the analyses with in-memory instrumentation, like run_analysis of dynapyt
+    does with an instrumented file. Nothing is written next to the code file except the outputs of the analyses
+
+    Parameters
+    ----------
+    source_path: str
+        The path to the code file
+
+    analyses: List[BaseAnalysis]
+        The analyses to run
+
+    module_name: str
+        The name to import the code file by, the file name by default. Its directory is put on sys.path
+
+    cache: ProgramCache
+        The persistent cache of instrumented programs, None to keep them in memory only
+
+    Returns
+    ----------
+    List[BaseAnalysis]
+        The analyses, after end_execution
+    """
+    import dynapyt.runtime as _rt
+    from importlib import import_module
+    source_path = path.abspath(source_path)
+    if module_name is None:
+        module_name = path.splitext(path.basename(source_path))[0]
+    finder = InstrumentingFinder([source_path], analyses, cache)
+    _rt.analyses = None
+    _rt.end_execution_called = False
+    _rt.set_analysis(analyses)
+    for analysis in analyses:
+        if hasattr(analysis, "begin_execution"):
+            analysis.begin_execution()
+    finder.install()
+    sys.path.insert(0, path.dirname(source_path))
+    sys.modules.pop(module_name, None)
+    try:
+        import_module(module_name)
+    finally:
+        sys.path.remove(path.dirname(source_path))
+        sys.modules.pop(module_name, None)
+        finder.uninstall()
+    _rt.end_execution()
+    return analyses
+
+
+def run_entry(program_path: str, entry_path: str, finder: InstrumentingFinder, output: TextIO = None) -> None:
+    """ This method runs the entry as __main__ with the finder installed. If the entry is the program itself, it is
+    run as a module so that the finder instruments it
+
+    Parameters
+    ----------
+    program_path: str
+        The absolute path to the code file to be sliced
+
+    entry_path: str
+        The absolute path to the code file to run as __main__
+
+    finder: InstrumentingFinder
+        The finder of the program
+
+    output: TextIO
+        Receives what the program prints, None to leave stdout alone
+
+    Returns
+    ----------
+    None
+    """
+    module_name = path.splitext(path.basename(program_path))[0]
+    directories = [path.dirname(entry_path), path.dirname(program_path)]
+    sys.path[0:0] = directories
+    # The code files to be instrumented are imported again, a previous run may have left them in sys.modules
+    for source_path in finder.source_paths | {program_path}:
+        sys.modules.pop(path.splitext(path.basename(source_path))[0], None)
+    finder.install()
+    try:
+        with redirect_stdout(output if output is not None else sys.stdout):
+            if entry_path == program_path:
+                runpy.run_module(module_name, run_name="__main__", alter_sys=True)
+            else:
+                runpy.run_path(entry_path, run_name="__main__")
+    finally:
+        finder.uninstall()
+        for directory in directories:
+            sys.path.remove(directory)
@@ -0,0 +1,390 @@
+import runpy
+import sys
+from ast import literal_eval
+from inspect import getattr_static, isfunction
+from os import path
+from types import CodeType, FrameType
+from typing import Any, Dict, List, Optional, Set, Tuple
+import libcst as cst
+from dynamicslicing.def_use import DefUseEvent, DefUseTable, build_def_use_table
+from dynamicslicing.slice import Slice
+
+MONITORING_AVAILABLE = sys.version_info >= (3, 12)
+MISSING = object()
+
+
+class MonitoringBackend():
+    """
+    This class drives the dependence engine of Slice from `sys.monitoring` events (Python 3.12+) instead of
+    instrumented code, so the code file is neither rewritten nor copied. Only the code object of
+    sliced_function_name gets LINE events. On every executed line, the events of the statements which start on it
+    are taken from the def-use table and passed to the record methods of Slice. The values that the instrumented
+    hooks receive (keys of element reads, methods, the types of `a = b` assignments) are looked up in the frame
+    before the line runs.
+
+    Attributes
+    ----------
+    source_path : str
+        The path to the code file to be sliced
+
+    analysis : Slice
+        The analysis whose meta-data is built
+
+    tool_id : int
+        The sys.monitoring tool id which is used during the execution
+
+    function_code : CodeType
+        The code object of sliced_function_name, None before its first invocation
+
+    table : DefUseTable
+        The def-use table of sliced_function_name
+
+    line_events : Dict[int, List[DefUseEvent]]
+        A dictionary which maps every line number to the events of the statements (and headers) that start on it
+
+    branch_keys : Dict[int, Tuple[int, int, int, int]]
+        A dictionary which maps the header line number of every if, while and for statement to its span, which is
+        its key in taken_branches
+
+    loop_bodies : Dict[int, Set[int]]
+        A dictionary which maps the header line number of every for loop to the line numbers of its body. The
+        iterable is only read when the loop is entered, not when an iteration ends
+
+    last_lines : Dict[FrameType, int]
+        The last line number whose events were replayed, per active frame of sliced_function_name
+
+    invocation_depth : int
+        The number of active (nested) invocations of sliced_function_name
+    -------
+    """
+    tool_id: int
+    function_code: CodeType
+    table: DefUseTable
+    line_events: Dict[int, List[DefUseEvent]]
+    branch_keys: Dict[int, Tuple[int, int, int, int]]
+    loop_bodies: Dict[int, Set[int]]
+    last_lines: Dict[FrameType, int]
+    invocation_depth: int
+
+    def __init__(self, source_path: str, analysis: Slice = None) -> None:
+        """
+        Parameters
+        ----------
+        source_path: str
+            The path to the code file to be sliced
+
+        analysis: Slice
+            The analysis whose meta-data should be built, a new Slice if None
+        """
+        if MONITORING_AVAILABLE == False:
+            raise RuntimeError("sys.monitoring requires Python 3.12 or newer")
+        self.source_path = path.abspath(source_path)
+        self.analysis = analysis if analysis is not None else Slice(self.source_path)
+        self.analysis.source_path = self.source_path
+        with open(self.source_path, "r") as file:
+            self.analysis.source = file.read()
+        # _get_ast would create an IID file next to the code file, so the parsed module is cached beforehand
+        self.analysis.asts[self.source_path] = (cst.parse_module(self.analysis.source), None)
+        self.tool_id = sys.monitoring.PROFILER_ID
+        self.function_code = None
+        self.table = None
+        self.line_events = dict()
+        self.branch_keys = dict()
+        self.loop_bodies = dict()
+        self.last_lines = dict()
+        self.invocation_depth = 0
+
+    def run(self) -> Slice:
+        """This method runs the code file as __main__ under sys.monitoring, then computes the slice and creates
+        the sliced.py file
+
+        Returns
+        -------
+        Slice
+            The analysis with the meta-data of the execution
+        """
+        monitoring = sys.monitoring
+        monitoring.use_tool_id(self.tool_id, "dynamicslicing")
+        try:
+            monitoring.register_callback(self.tool_id, monitoring.events.PY_START, self.function_enter)
+            monitoring.register_callback(self.tool_id, monitoring.events.PY_RETURN, self.function_exit)
+            monitoring.register_callback(self.tool_id, monitoring.events.PY_UNWIND, self.function_unwind)
+            monitoring.register_callback(self.tool_id, monitoring.events.LINE, self.line)
+            monitoring.set_events(self.tool_id, monitoring.events.PY_START | monitoring.events.PY_UNWIND)
+            sys.path.insert(0, path.dirname(self.source_path))
+            try:
+                runpy.run_path(self.source_path, run_name="__main__")
+            finally:
+                sys.path.remove(path.dirname(self.source_path))
+        finally:
+            monitoring.set_events(self.tool_id, 0)
+            monitoring.restart_events()
+            if self.function_code is not None:
+                monitoring.set_local_events(self.tool_id, self.function_code, 0)
+            monitoring.free_tool_id(self.tool_id)
+        self.analysis.end_execution()
+        return self.analysis
+
+    def function_enter(self, code: CodeType, instruction_offset: int) -> Any:
+        """Callback for PY_START. The first invocation of sliced_function_name prepares the def-use table and
+        enables the local events of its code object. Other code objects are disabled for good.
+
+        Parameters
+        ----------
+        code: CodeType
+            The code object of the started function
+
+        instruction_offset: int
+            The offset of the first instruction
+
+        Returns
+        -------
+        Any
+            sys.monitoring.DISABLE for every other function
+        """
+        if code is not self.function_code:
+            if code.co_name != self.analysis.sliced_function_name or code.co_filename != self.source_path:
+                return sys.monitoring.DISABLE
+            self.prepare_function(code)
+        self.invocation_depth += 1
+        if self.invocation_depth == 1:
+            self.analysis.taken_branches = set()
+
+    def function_exit(self, code: CodeType, instruction_offset: int, retval: Any) -> None:
+        """Callback for PY_RETURN of sliced_function_name
+
+        Parameters
+        ----------
+        code: CodeType
+            The code object of the function
+
+        instruction_offset: int
+            The offset of the return instruction
+
+        retval: Any
+            The returned value
+
+        Returns
+        -------
+        None
+        """
+        self.invocation_depth -= 1
+        self.last_lines.pop(sys._getframe(1), None)
+
+    def function_unwind(self, code: CodeType, instruction_offset: int, exception: BaseException) -> None:
+        """Callback for PY_UNWIND, i.e. an exception leaves a function
+
+        Parameters
+        ----------
+        code: CodeType
+            The code object of the function
+
+        instruction_offset: int
+            The offset of the instruction which raised
+
+        exception: BaseException
+            The exception
+
+        Returns
+        -------
+        None
+        """
+        if code is self.function_code:
+            self.function_exit(code, instruction_offset, None)
+
+    def prepare_function(self, code: CodeType) -> None:
+        """This method prepares the analysis and the per-line tables for the code object of sliced_function_name
+
+        Parameters
+        ----------
+        code: CodeType
+            The code object of sliced_function_name
+
+        Returns
+        -------
+        None
+        """
+        module = self.analysis._get_ast(self.source_path)[0]
+        function, self.table = build_def_use_table(module, code.co_firstlineno)
+        self.analysis.slice_start_line = code.co_firstlineno + 1
+        self.analysis.slice_end_line = self.table.positions[function].end.line
+        self.analysis.control_dependencies = self.analysis.get_control_dependencies(
+            self.source_path, code.co_firstlineno)
+        for node, events in self.table.statements.items():
+            span = self.table.key(node)
+            line_number = span[0]
+            self.line_events.setdefault(line_number, []).extend(events)
+            if isinstance(node, (cst.If, cst.While, cst.For)):
+                self.branch_keys[line_number] = span
+            if isinstance(node, cst.For):
+                body = self.table.positions[node.body]
+                self.loop_bodies[line_number] = set(range(body.start.line, body.end.line + 1))
+        self.function_code = code
+        sys.monitoring.set_local_events(self.tool_id, code, sys.monitoring.events.LINE |
+                                        sys.monitoring.events.PY_RETURN)
+
+    def line(self, code: CodeType, line_number: int) -> None:
+        """Callback for LINE of sliced_function_name. The events of a statement are replayed once per execution:
+        LINE is also reported again for the first line of a statement which spans several lines
+
+        Parameters
+        ----------
+        code: CodeType
+            The code object of the function
+
+        line_number: int
+            The line number which is about to be executed
+
+        Returns
+        -------
+        None
+        """
+        if line_number not in self.line_events:
+            return
+        frame = sys._getframe(1)
+        previous_line = self.last_lines.get(frame)
+        if previous_line == line_number:
+            return
+        self.last_lines[frame] = line_number
+        if line_number in self.branch_keys and self.branch_keys[line_number] not in self.analysis.taken_branches:
+            self.analysis.record_branch(self.branch_keys[line_number], line_number)
+        if line_number in self.loop_bodies and previous_line in self.loop_bodies[line_number]:
+            return
+        self.replay_events(frame, self.line_events[line_number])
+
+    def replay_events(self, frame: FrameType, events: List[DefUseEvent]) -> None:
+        """This method passes the events of a line to the analysis, with the values looked up in the frame
+
+        Parameters
+        ----------
+        frame: FrameType
+            The frame which executes the line
+
+        events: List[DefUseEvent]
+            The events of the line
+
+        Returns
+        -------
+        None
+        """
+        analysis = self.analysis
+        for event in events:
+            if event.kind == "read":
+                analysis.record_read(event.line, *event.arguments)
+            elif event.kind == "write":
+                variable_name, property_name, index, reference = event.arguments
+                type_name = None
+                if reference[1] is not None:
+                    type_name = type(lookup(frame, reference[1])).__name__
+                analysis.record_write(event.line, variable_name, property_name, index, type_name, reference)
+            elif event.kind == "augmented_assignment":
+                analysis.record_augmented_assignment(event.line, *event.arguments)
+            elif event.kind == "attribute_read":
+                variable_name, attribute_name = event.arguments
+                analysis.record_attribute_read(event.line, variable_name, attribute_name,
+                                               is_method(lookup(frame, variable_name), attribute_name))
+            elif event.kind == "subscript_read":
+                key = index_key(frame, self.table.index_expressions.get(event.span))
+                analysis.record_subscript_read(event.line, *event.arguments, key)
+
+
+def lookup(frame: FrameType, name: str) -> Any:
+    """ This method looks a variable up in a frame, like the execution of the frame would
+
+    Parameters
+    ----------
+    frame: FrameType
+        The frame
+
+    name: str
+        The name of the variable
+
+    Returns
+    ----------
+    Any
+        The value of the variable, MISSING if it is not defined
+    """
+    local_variables = frame.f_locals
+    if name in local_variables:
+        return local_variables[name]
+    if name in frame.f_globals:
+        return frame.f_globals[name]
+    return frame.f_builtins.get(name, MISSING)
+
+
+def is_method(value: Any, attribute_name: str) -> bool:
+    """ This method checks, without running a property, whether reading an attribute returns a bound method
+
+    Parameters
+    ----------
+    value: Any
+        The object whose attribute is read
+
+    attribute_name: str
+        The name of the attribute
+
+    Returns
+    ----------
+    bool
+        True if the attribute is a function of the class of an instance, or a classmethod
+    """
+    attribute = getattr_static(value, attribute_name, None)
+    if isinstance(attribute, classmethod):
+        return True
+    if isinstance(value, type) or attribute_name in getattr(value, "__dict__", {}):
+        return False
+    return isfunction(attribute)
+
+
+def index_key(frame: FrameType, expression: Optional[cst.BaseExpression]) -> Optional[str]:
+    """ This method computes the key of an element read before it runs, if the index is a variable or a literal
+
+    Parameters
+    ----------
+    frame: FrameType
+        The frame which executes the read
+
+    expression: cst.BaseExpression
+        The index expression
+
+    Returns
+    ----------
+    str
+        The key like the read_subscript hook reports it, None if the index is an other expression
+    """
+    if isinstance(expression, cst.Name):
+        value = lookup(frame, expression.value)
+        return None if value is MISSING else str(value)
+    if isinstance(expression, (cst.BaseNumber, cst.BaseString, cst.UnaryOperation)):
+        try:
+            return str(literal_eval(cst.Module(body=[]).code_for_node(expression)))
+        except (ValueError, SyntaxError):
+            return None
+    return None
+
+
+def slice_program(source_path: str) -> Slice:
+    """ This method slices a code file with the best backend of the interpreter: sys.monitoring on Python 3.12+,
+    otherwise the instrumentation of dynapyt, which rewrites the code file in place
+
+    Parameters
+    ----------
+    source_path: str
+        The path to the code file to be sliced
+
+    Returns
+    ----------
+    Slice
+        The analysis with the meta-data of the execution
+    """
+    if MONITORING_AVAILABLE:
+        return MonitoringBackend(source_path).run()
+    import dynapyt.runtime as _rt
+    from dynapyt.run_analysis import run_analysis
+    from dynapyt.utils.hooks import get_hooks_from_analysis
+    from dynamicslicing.program_cache import ProgramCache
+    source_path = path.abspath(source_path)
+    analysis = f"dynamicslicing.slice.Slice:{source_path}.orig"
+    ProgramCache().instrument_file(source_path, get_hooks_from_analysis([analysis]))
+    run_analysis(source_path, [analysis])
+    return _rt.analyses[0]
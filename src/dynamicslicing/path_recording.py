@@ -0,0 +1,676 @@
+import json
+from collections import deque
+from os import path
+from typing import Any, Deque, Dict, Iterable, List, Optional, Set, Tuple, Union
+import libcst as cst
+from dynapyt.analyses.BaseAnalysis import BaseAnalysis
+from dynapyt.instrument.IIDs import IIDs
+from dynamicslicing.def_use import DefUseEvent, DefUseTable, build_def_use_table
+from dynamicslicing.slice import Slice
+
+BREAK = "break"
+CONTINUE = "continue"
+RETURN = "return"
+
+
+class PathRecorder(BaseAnalysis):
+    """
+    This class is the first phase of the path-recording mode. During the execution it only records the control-flow
+    path of sliced_function_name, i.e. the outcomes of its branches (which also encode the trip counts of its
+    loops), together with the values which cannot be recomputed from the code: the keys of element reads, whether
+    an attribute read returns a method, and the types of the values assigned by `a = b`. Every hook is a lookup
+    and an append by iid, no location or syntax tree node is resolved during the execution. At the end of the
+    execution the path is written to a JSON file next to the code file, and replay_path rebuilds the slice offline.
+
+    Attributes
+    ----------
+    sliced_function_name : str
+        A fixed function name that slicing occuurs inside that
+
+    source_path: str
+        The path to the code file to be sliced
+
+    function_line : int
+        The line number of the `def` keyword of sliced_function_name, -1 before its first invocation
+
+    function_iids : Set[int]
+        The iids of the nodes inside sliced_function_name, computed on its first invocation
+
+    invocations : int
+        The number of recorded (outermost) invocations of sliced_function_name
+
+    invocation_depth : int
+        The number of active (nested) invocations of sliced_function_name
+
+    recording : bool
+        Boolean variable which indicates that the events of the current invocation are recorded. Nested invocations
+        are not recorded
+
+    branches : Dict[int, List[bool]]
+        A dictionary which maps the iid of every if, while and for statement to its outcomes, in order
+
+    subscript_keys : Dict[int, List[str]]
+        A dictionary which maps the iid of every element read to its keys, in order
+
+    methods : Dict[int, List[bool]]
+        A dictionary which maps the iid of every attribute read to whether it returned a method, in order
+
+    types : Dict[int, List[str]]
+        A dictionary which maps the iid of every assignment to the type names of the assigned values, in order
+    -------
+    """
+    sliced_function_name = "slice_me"
+    source_path: str = ""
+    function_line: int = -1
+    function_iids: Set[int] = set()
+    invocations: int = 0
+    invocation_depth: int = 0
+    recording = False
+    branches: Dict[int, List[bool]] = dict()
+    subscript_keys: Dict[int, List[str]] = dict()
+    methods: Dict[int, List[bool]] = dict()
+    types: Dict[int, List[str]] = dict()
+
+    def __init__(self, source_path: str = ""):
+        """
+        Parameters
+        ----------
+        source_path: str
+            The path to the code file to be sliced
+        """
+        super(PathRecorder, self).__init__()
+        self.source_path = source_path
+        self.function_line = -1
+        self.function_iids = set()
+        self.invocations = 0
+        self.invocation_depth = 0
+        self.recording = False
+        self.branches = dict()
+        self.subscript_keys = dict()
+        self.methods = dict()
+        self.types = dict()
+
+    def function_enter(self, dyn_ast: str, iid: int, args: List[Any], name: str, is_lambda: bool) -> None:
+        """Hook for when an instrumented function is entered. On the first invocation of sliced_function_name we
+        collect the iids of its nodes, and we start recording until it returns.
+
+        Parameters
+        ----------
+        dyn_ast : str
+            The path to the original code. Can be used to extract the syntax tree.
+
+        iid : int
+            Unique ID of the syntax tree node.
+
+        args : List[Any]
+            The arguments passed to the function.
+
+        name: str
+            The name of the function.
+
+        is_lambda : bool
+            Whether the function is a lambda function.
+        """
+        if name != self.sliced_function_name:
+            return
+        self.invocation_depth += 1
+        if self.invocation_depth > 1:
+            self.recording = False
+            return
+        if self.function_line == -1:
+            iid_to_location = IIDs(dyn_ast).iid_to_location
+            location = iid_to_location[iid]
+            self.source_path = dyn_ast
+            self.function_line = location.start_line
+            self.function_iids = {key for key, value in iid_to_location.items()
+                                  if location.start_line <= value.start_line <= location.end_line}
+        self.invocations += 1
+        self.recording = True
+
+    def function_exit(self, dyn_ast: str, function_iid: int, name: str, result: Any) -> Any:
+        """Hook for exiting an instrumented function. Recording stops when the outermost invocation of
+        sliced_function_name returns, and continues when a nested one returns.
+
+        Parameters
+        ----------
+        dyn_ast : str
+            The path to the original code. Can be used to extract the syntax tree.
+
+        function_iid : int
+            Unique ID of the function's syntax tree node.
+
+        name : str
+            The name of the function.
+
+        result : Any
+            The result of the function.
+
+        Returns
+        -------
+        Any
+            If provided, overwrites the returned value.
+        """
+        if (name != self.sliced_function_name) or self.invocation_depth == 0:
+            return
+        self.invocation_depth -= 1
+        self.recording = self.invocation_depth == 1
+
+    def enter_if(self, dyn_ast: str, iid: int, cond_value: bool) -> Optional[bool]:
+        """Hook called when entering if. Here we record the outcome of the condition
+
+        Parameters
+        ----------
+        dyn_ast : str
+            The path to the original code. Can be used to extract the syntax tree.
+
+        iid : int
+            Unique ID of the syntax tree node.
+
+        cond_value : bool
+            The value of the if condition.
+
+        Returns
+        -------
+        Optional[bool]
+            If provided, overwrites the value of the condition.
+        """
+        if self.recording == False or iid not in self.function_iids:
+            return
+        self.branches.setdefault(iid, []).append(bool(cond_value))
+
+    def enter_while(self, dyn_ast: str, iid: int, cond_value: bool) -> Optional[bool]:
+        """Hook for entering the next iteration of a while loop. Here we record the outcome of the condition
+
+        Parameters
+        ----------
+        dyn_ast : str
+            The path to the original code. Can be used to extract the syntax tree.
+
+        iid : int
+            Unique ID of the syntax tree node.
+
+        cond_value : bool
+            The value of the condition.
+
+        Returns
+        -------
+        Optional[bool]
+            If provided, overwrites the value of the condition.
+        """
+        if self.recording == False or iid not in self.function_iids:
+            return
+        self.branches.setdefault(iid, []).append(bool(cond_value))
+
+    def enter_for(self, dyn_ast: str, iid: int, next_value: Any, iterable: Iterable) -> Optional[Any]:
+        """Hook for entering the next iteration of a for loop. Here we record whether a next iteration starts
+
+        Parameters
+        ----------
+        dyn_ast : str
+            The path to the original code. Can be used to extract the syntax tree.
+
+        iid : int
+            Unique ID of the syntax tree node.
+
+        next_value : Any
+            The next value of the iterator, a StopIteration when the loop ends.
+
+        iterable : Iterable
+            The iterable that is being iterated over.
+
+        Returns
+        -------
+        Optional[Any]
+            If provided, overwrites the next value.
+        """
+        if self.recording == False or iid not in self.function_iids:
+            return
+        self.branches.setdefault(iid, []).append(not isinstance(next_value, StopIteration))
+
+    def read_subscript(self, dyn_ast: str, iid: int, base: Any, sl: List[Union[int, Tuple]], val: Any) -> Any:
+        """Hook for reading a subscript, also known as a slice. Here we record the key
+
+        Parameters
+        ----------
+        dyn_ast : str
+            The path to the original code. Can be used to extract the syntax tree.
+
+        iid : int
+            Unique ID of the syntax tree node.
+
+        base : Any
+            The object to which the subscript is attached.
+
+        sl : List[Union[int, Tuple]]
+            List of subscripts.
+
+        val : Any
+            The resulting value.
+
+        Returns
+        -------
+        Any
+            If provided, overwrites the returned value.
+        """
+        if self.recording == False or iid not in self.function_iids:
+            return
+        self.subscript_keys.setdefault(iid, []).append(str(sl[0]))
+
+    def read_attribute(self, dyn_ast: str, iid: int, base: Any, name: str, val: Any) -> Any:
+        """Hook for reading an object attribute. Here we record whether the value is a method
+
+        Parameters
+        ----------
+        dyn_ast : str
+            The path to the original code. Can be used to extract the syntax tree.
+
+        iid : int
+            Unique ID of the syntax tree node.
+
+        base : Any
+            The object to which the attribute is attached.
+
+        name : str
+            The name of the attribute.
+
+        val : Any
+            The resulting value.
+
+        Returns
+        -------
+        Any
+            If provided, overwrites the returned value.
+        """
+        if self.recording == False or iid not in self.function_iids:
+            return
+        self.methods.setdefault(iid, []).append(type(val).__name__ == "method")
+
+    def write(self, dyn_ast: str, iid: int, old_vals: List[Any], new_val: Any) -> Any:
+        """Hook for writes. Here we record the type of the new value
+
+        Parameters
+        ----------
+        dyn_ast : str
+            The path to the original code. Can be used to extract the syntax tree.
+
+        iid : int
+            Unique ID of the syntax tree node.
+
+        old_vals : Any
+            A list of old values before the write takes effect.
+
+        new_val : Any
+            The value after the write takes effect.
+
+        Returns
+        -------
+        Any
+            If provided, overwrites the returned value.
+        """
+        if self.recording == False or iid not in self.function_iids:
+            return
+        self.types.setdefault(iid, []).append(type(new_val).__name__)
+
+    def end_execution(self) -> None:
+        """Hook for the end of execution. Here we write the recorded path to the path file
+        """
+        if self.function_line == -1:
+            return
+        iid_to_location = IIDs(self.source_path).iid_to_location
+        recorded_path = {
+            "source_path": self.source_path,
+            "function_name": self.sliced_function_name,
+            "function_line": self.function_line,
+            "invocations": self.invocations,
+        }
+        for name, values in [("branches", self.branches), ("subscript_keys", self.subscript_keys),
+                             ("methods", self.methods), ("types", self.types)]:
+            recorded_path[name] = {":".join(str(number) for number in iid_to_location[iid][1:]):
+                                   run_length_encode(sequence) for iid, sequence in values.items()}
+        with open(path_file_name(self.source_path), "w") as file:
+            json.dump(recorded_path, file)
+
+
+class PathReplay():
+    """
+    This class is the second phase of the path-recording mode. It walks the statements of the sliced function
+    along a recorded path and replays the events of the def-use table of every executed statement into a Slice,
+    which rebuilds lines_info as if the full hooks had run. Exceptions are not part of the path, so an invocation
+    which ends with an exception is replayed until the first missing branch outcome.
+
+    Attributes
+    ----------
+    analysis : Slice
+        The analysis whose meta-data is rebuilt
+
+    table : DefUseTable
+        The def-use table of the sliced function
+
+    branches : Dict[Tuple[int, int, int, int], Deque[bool]]
+        The remaining outcomes of every branch, by the span of the statement
+
+    values : Dict[str, Dict[Tuple[int, int, int, int], Deque[Any]]]
+        The remaining recorded values of every kind (subscript_keys, methods, types), by the span of the node
+    -------
+    """
+    analysis: Slice
+    table: DefUseTable
+    branches: Dict[Tuple[int, int, int, int], Deque[bool]]
+    values: Dict[str, Dict[Tuple[int, int, int, int], Deque[Any]]]
+
+    def __init__(self, analysis: Slice, table: DefUseTable, recorded_path: Dict[str, Any]) -> None:
+        """
+        Parameters
+        ----------
+        analysis: Slice
+            The analysis whose meta-data should be rebuilt
+
+        table: DefUseTable
+            The def-use table of the sliced function
+
+        recorded_path: Dict[str, Any]
+            The content of the path file
+        """
+        self.analysis = analysis
+        self.table = table
+        self.branches = expand(recorded_path["branches"])
+        self.values = {name: expand(recorded_path[name]) for name in ["subscript_keys", "methods", "types"]}
+
+    def next_value(self, kind: str, event_key: Tuple[int, int, int, int], default: Any = None) -> Any:
+        """This method pops the next recorded value of a node
+
+        Parameters
+        ----------
+        kind: str
+            The kind of the value: subscript_keys, methods or types
+
+        event_key: Tuple[int, int, int, int]
+            The span of the node
+
+        default: Any
+            The value which is returned if no value is left
+
+        Returns
+        -------
+        Any
+            The next value of the node
+        """
+        queue = self.values[kind].get(event_key)
+        if not queue:
+            return default
+        return queue.popleft()
+
+    def replay_events(self, events: List[DefUseEvent]) -> None:
+        """This method passes the events of one execution of a statement to the analysis, with the recorded values
+
+        Parameters
+        ----------
+        events: List[DefUseEvent]
+            The events of the statement
+
+        Returns
+        -------
+        None
+        """
+        for event in events:
+            event_key = event.span
+            if event.kind == "read":
+                self.analysis.record_read(event.line, *event.arguments)
+            elif event.kind == "write":
+                variable_name, property_name, index, reference = event.arguments
+                type_name = self.next_value("types", event_key)
+                self.analysis.record_write(event.line, variable_name, property_name, index, type_name, reference)
+            elif event.kind == "augmented_assignment":
+                self.analysis.record_augmented_assignment(event.line, *event.arguments)
+            elif event.kind == "attribute_read":
+                is_method = self.next_value("methods", event_key, False)
+                self.analysis.record_attribute_read(event.line, *event.arguments, is_method)
+            elif event.kind == "subscript_read":
+                key = self.next_value("subscript_keys", event_key)
+                self.analysis.record_subscript_read(event.line, *event.arguments, key)
+
+    def take_branch(self, node: cst.CSTNode) -> Optional[bool]:
+        """This method pops the next outcome of a branch and records the branch in the analysis
+
+        Parameters
+        ----------
+        node: cst.CSTNode
+            The if, while or for statement
+
+        Returns
+        -------
+        Optional[bool]
+            The outcome of the branch, None if the path ends here
+        """
+        branch_key = self.table.key(node)
+        queue = self.branches.get(branch_key)
+        if not queue:
+            return None
+        if branch_key not in self.analysis.taken_branches:
+            self.analysis.record_branch(branch_key, branch_key[0])
+        return queue.popleft()
+
+    def run_invocation(self, function: cst.FunctionDef) -> None:
+        """This method replays one invocation of the sliced function
+
+        Parameters
+        ----------
+        function: cst.FunctionDef
+            The sliced function
+
+        Returns
+        -------
+        None
+        """
+        self.analysis.taken_branches = set()
+        self.run_suite(function.body)
+
+    def run_suite(self, suite: cst.BaseSuite) -> Optional[str]:
+        """This method replays a block of statements
+
+        Parameters
+        ----------
+        suite: cst.BaseSuite
+            The block of statements
+
+        Returns
+        -------
+        Optional[str]
+            BREAK, CONTINUE or RETURN if a statement of the block jumps out of it, otherwise None
+        """
+        if isinstance(suite, cst.SimpleStatementSuite):
+            return self.run_small_statements(suite.body)
+        for statement in suite.body:
+            signal = self.run_statement(statement)
+            if signal is not None:
+                return signal
+        return None
+
+    def run_small_statements(self, small_statements: Iterable[cst.BaseSmallStatement]) -> Optional[str]:
+        """This method replays the small statements of a line
+
+        Parameters
+        ----------
+        small_statements: Iterable[cst.BaseSmallStatement]
+            The small statements
+
+        Returns
+        -------
+        Optional[str]
+            BREAK, CONTINUE or RETURN if one of the statements jumps, otherwise None
+        """
+        for small_statement in small_statements:
+            self.replay_events(self.table.statements.get(small_statement, []))
+            if isinstance(small_statement, cst.Break):
+                return BREAK
+            elif isinstance(small_statement, cst.Continue):
+                return CONTINUE
+            elif isinstance(small_statement, (cst.Return, cst.Raise)):
+                return RETURN
+        return None
+
+    def run_statement(self, statement: cst.BaseStatement) -> Optional[str]:
+        """This method replays a statement along the recorded path
+
+        Parameters
+        ----------
+        statement: cst.BaseStatement
+            The statement
+
+        Returns
+        -------
+        Optional[str]
+            BREAK, CONTINUE or RETURN if the statement jumps, otherwise None
+        """
+        if isinstance(statement, cst.SimpleStatementLine):
+            return self.run_small_statements(statement.body)
+        elif isinstance(statement, cst.If):
+            self.replay_events(self.table.statements[statement])
+            outcome = self.take_branch(statement)
+            if outcome is None:
+                return RETURN
+            elif outcome == True:
+                return self.run_suite(statement.body)
+            elif isinstance(statement.orelse, cst.If):
+                return self.run_statement(statement.orelse)
+            elif statement.orelse is not None:
+                return self.run_suite(statement.orelse.body)
+        elif isinstance(statement, (cst.While, cst.For)):
+            return self.run_loop(statement)
+        elif isinstance(statement, cst.With):
+            self.replay_events(self.table.statements[statement])
+            return self.run_suite(statement.body)
+        elif isinstance(statement, cst.Try):
+            signal = self.run_suite(statement.body)
+            if signal is None and statement.orelse is not None:
+                signal = self.run_suite(statement.orelse.body)
+            if statement.finalbody is not None:
+                final_signal = self.run_suite(statement.finalbody.body)
+                if final_signal is not None:
+                    return final_signal
+            return signal
+        return None
+
+    def run_loop(self, statement: Union[cst.While, cst.For]) -> Optional[str]:
+        """This method replays a while or for loop, one iteration per recorded outcome
+
+        Parameters
+        ----------
+        statement: Union[cst.While, cst.For]
+            The loop
+
+        Returns
+        -------
+        Optional[str]
+            RETURN if the loop body returns, otherwise None
+        """
+        if isinstance(statement, cst.For):
+            self.replay_events(self.table.statements[statement])
+        while True:
+            if isinstance(statement, cst.While):
+                self.replay_events(self.table.statements[statement])
+            outcome = self.take_branch(statement)
+            if outcome is None:
+                return RETURN
+            elif outcome == False:
+                if statement.orelse is not None:
+                    return self.run_suite(statement.orelse.body)
+                return None
+            signal = self.run_suite(statement.body)
+            if signal == BREAK:
+                return None
+            elif signal == RETURN:
+                return RETURN
+
+
+def run_length_encode(sequence: List[Any]) -> List[List[Any]]:
+    """ This method compresses a sequence into a list of [value, count] pairs
+
+    Parameters
+    ----------
+    sequence: List[Any]
+        The recorded values
+
+    Returns
+    ----------
+    List[List[Any]]
+        The runs of equal values
+    """
+    runs: List[List[Any]] = []
+    for value in sequence:
+        if len(runs) > 0 and runs[-1][0] == value:
+            runs[-1][1] += 1
+        else:
+            runs.append([value, 1])
+    return runs
+
+
+def expand(recorded: Dict[str, List[List[Any]]]) -> Dict[Tuple[int, int, int, int], Deque[Any]]:
+    """ This method expands the run-length encoded values of a path file into queues, by span
+
+    Parameters
+    ----------
+    recorded: Dict[str, List[List[Any]]]
+        The runs of every node, by "start_line:start_column:end_line:end_column"
+
+    Returns
+    ----------
+    Dict[Tuple[int, int, int, int], Deque[Any]]
+        The values of every node, by (start_line, start_column, end_line, end_column)
+    """
+    queues: Dict[Tuple[int, int, int, int], Deque[Any]] = dict()
+    for node_key, runs in recorded.items():
+        queue: Deque[Any] = deque()
+        for value, count in runs:
+            queue.extend([value] * count)
+        queues[tuple(int(number) for number in node_key.split(":"))] = queue
+    return queues
+
+
+def path_file_name(source_path: str) -> str:
+    """ This method returns the path of the path file of a code file, e.g. program-path.json for program.py
+
+    Parameters
+    ----------
+    source_path: str
+        The path to the code file, or to its .orig copy
+
+    Returns
+    ----------
+    str
+        The path to the path file
+    """
+    if source_path.endswith(".orig"):
+        source_path = source_path[:-5]
+    return path.splitext(source_path)[0] + "-path.json"
+
+
+def replay_path(path_file: str) -> Slice:
+    """ This method runs the second phase of the path-recording mode: it rebuilds lines_info of a Slice from the
+    path file, computes the slice and creates the sliced.py file
+
+    Parameters
+    ----------
+    path_file: str
+        The path to the path file written by PathRecorder
+
+    Returns
+    ----------
+    Slice
+        The analysis with the rebuilt meta-data
+    """
+    with open(path_file, "r") as file:
+        recorded_path = json.load(file)
+    analysis = Slice(recorded_path["source_path"])
+    analysis.sliced_function_name = recorded_path["function_name"]
+    source_path = analysis.source_path
+    function_line = recorded_path["function_line"]
+    function, table = build_def_use_table(analysis._get_ast(source_path)[0], function_line)
+    analysis.slice_start_line = function_line + 1
+    analysis.slice_end_line = table.positions[function].end.line
+    analysis.control_dependencies = analysis.get_control_dependencies(source_path, function_line)
+    replay = PathReplay(analysis, table, recorded_path)
+    for _ in range(recorded_path["invocations"]):
+        replay.run_invocation(function)
+    analysis.end_execution()
+    return analysis
@@ -0,0 +1,367 @@
+import json
+import multiprocessing.connection
+import multiprocessing.pool
+import multiprocessing.process
+import multiprocessing.queues
+import multiprocessing.util
+import os
+import shutil
+import tempfile
+import weakref
+from concurrent.futures import Executor, Future
+from functools import partial
+from os import path
+from typing import Any, Dict, List, Optional, Set
+from dynamicslicing.slice import Slice
+from dynamicslicing.utils import LineMetaData, node_id, node_location
+
+# The methods whose call receives what a child process sent back, e.g. queue.get(), worker.join() or future.result()
+RECEIVING_METHODS = {"get", "get_nowait", "recv", "join", "result", "wait", "map", "imap", "imap_unordered",
+                     "starmap", "apply"}
+
+# The objects of multiprocessing and concurrent.futures whose RECEIVING_METHODS receive from a child process
+RECEIVING_TYPES = (multiprocessing.queues.Queue, multiprocessing.queues.SimpleQueue,
+                   multiprocessing.connection.Connection, multiprocessing.process.BaseProcess, Future,
+                   multiprocessing.pool.ApplyResult, multiprocessing.pool.Pool, Executor)
+
+
+def forked_in_parent(analysis_reference: "weakref.ref[ProcessAwareSlice]") -> None:
+    """ This method is called by os.fork in the parent after a child was forked. The analysis is referenced weakly,
+    since the handlers of os.register_at_fork are never removed
+
+    Parameters
+    ----------
+    analysis_reference: weakref.ref[ProcessAwareSlice]
+        The analysis
+
+    Returns
+    ----------
+    None
+    """
+    analysis = analysis_reference()
+    if analysis is not None:
+        analysis.child_forked()
+
+
+class ProcessAwareSlice(Slice):
+    """
+    This class is Slice for programs which fan work out to child processes with multiprocessing or
+    concurrent.futures.ProcessPoolExecutor, with the fork start method (the default on Linux). A forked child
+    inherits the analysis together with the dependencies recorded so far, so it keeps analyzing the code it runs,
+    e.g. invocations of sliced_function_name or functions nested in it. The child writes the dependencies which it
+    added as a fragment, a JSON file in fragments_directory, whenever its outermost invocation returns and when it
+    exits, and the parent merges all fragments into lines_info after the execution, before the slice is computed.
+
+    Every fragment is keyed to the call site of the child: the line which the parent analyzed last before the fork,
+    e.g. `worker.start()` or `executor.submit(...)`. The values which the child sends back are not traced, so the
+    call site depends on the lines of the child which no other line of the child depends on, the lines whose values
+    may leave the child. The lines of the parent which receive them after the fork, e.g. `queue.get()`,
+    `worker.join()` or `future.result()` (see RECEIVING_METHODS and RECEIVING_TYPES), depend on the call site. The
+    nodes of a fragment are written with the code files of the child and mapped to the file ids of the parent when
+    it is merged.
+
+    Attributes
+    ----------
+    parent_pid : int
+        The process id of the analyzed program
+
+    fragments_directory : str
+        The directory which the children write their fragments to
+
+    call_site : Optional[int]
+        The call site of the current process, None in the parent
+
+    inherited : Dict[int, Set[int]]
+        The dependencies which the current process inherited from its parent, by line
+
+    forked_call_sites : Set[int]
+        The call sites of the children which the current process forked so far
+
+    receivers : Dict[int, Set[int]]
+        The lines which called one of RECEIVING_METHODS on one of RECEIVING_TYPES after a child was forked, by the
+        call site of the child
+    -------
+    """
+    parent_pid: int
+    fragments_directory: str
+    call_site: Optional[int] = None
+    inherited: Dict[int, Set[int]]
+    forked_call_sites: Set[int]
+    receivers: Dict[int, Set[int]]
+
+    def __init__(self, source_path: str = "", **options: Any) -> None:
+        """
+        Parameters
+        ----------
+        source_path: str
+            The path to the code file to be sliced
+
+        options: Any
+            The other arguments of Slice, e.g. sampling_rate
+        """
+        super(ProcessAwareSlice, self).__init__(source_path, **options)
+        multiprocessing.util.register_after_fork(self, ProcessAwareSlice.child_started)
+        os.register_at_fork(after_in_parent=partial(forked_in_parent, weakref.ref(self)))
+
+    def reset(self, source_path: str = "") -> None:
+        """This method forgets the previous run, including the fragments which were not merged
+
+        Parameters
+        ----------
+        source_path: str
+            The path to the code file to be sliced in the next run
+
+        Returns
+        -------
+        None
+        """
+        super(ProcessAwareSlice, self).reset(source_path)
+        self.parent_pid = os.getpid()
+        self.fragments_directory = path.join(tempfile.gettempdir(),
+                                             f"dynamicslicing-fragments-{self.parent_pid}-{id(self)}")
+        shutil.rmtree(self.fragments_directory, ignore_errors=True)
+        self.call_site = None
+        self.inherited = dict()
+        self.forked_call_sites = set()
+        self.receivers = dict()
+
+    def child_started(self) -> None:
+        """This method is called by multiprocessing in a forked child before it runs its target. The dependencies
+        inherited from the parent are remembered, so that only the new ones are written, and the fragment is written
+        once more when the child exits
+
+        Returns
+        -------
+        None
+        """
+        self.call_site = self.current_node
+        self.inherited = {line_number: set(line.dependencies) for line_number, line in self.lines_info.items()}
+        multiprocessing.util.Finalize(self, self.write_fragment, exitpriority=100)
+
+    def child_forked(self) -> None:
+        """This method is called in the parent after it forked a child, whose call site is current_node
+
+        Returns
+        -------
+        None
+        """
+        if self.current_node is not None:
+            self.forked_call_sites.add(self.current_node)
+
+    def is_child(self) -> bool:
+        """This method checks whether the current process is a child of the analyzed program
+
+        Returns
+        -------
+        bool
+            True in a child process
+        """
+        return os.getpid() != self.parent_pid
+
+    def read_attribute(self, dyn_ast: str, iid: int, base: Any, name: str, val: Any) -> Any:
+        """Hook for reading an object attribute. The line is remembered as a receiver of the children forked so far
+        if it calls one of RECEIVING_METHODS on one of RECEIVING_TYPES, e.g. `queue.get`
+
+        Parameters
+        ----------
+        dyn_ast : str
+            The path to the original code. Can be used to extract the syntax tree.
+
+        iid : int
+            Unique ID of the syntax tree node.
+
+        base : Any
+            The object to which the attribute is attached.
+
+        name : str
+            The name of the attribute.
+
+        val : Any
+            The resulting value.
+
+        Returns
+        -------
+        Any
+            If provided, overwrites the returned value.
+        """
+        super(ProcessAwareSlice, self).read_attribute(dyn_ast, iid, base, name, val)
+        if name not in RECEIVING_METHODS or isinstance(base, RECEIVING_TYPES) == False:
+            return
+        if self.start_analysis == False or self.can_run_analysis(dyn_ast, iid) == False:
+            return
+        line_number = self.node(dyn_ast, self.iid_to_location(dyn_ast, iid).start_line)
+        for call_site in self.forked_call_sites:
+            if call_site != line_number:
+                self.receivers.setdefault(call_site, set()).add(line_number)
+
+    def function_exit(self, dyn_ast: str, function_iid: int, name: str, result: Any) -> Any:
+        """Hook for exiting an instrumented function. In a child, the fragment is written when the outermost
+        invocation of sliced_function_name returns, since pool workers may be terminated without exiting
+
+        Parameters
+        ----------
+        dyn_ast : str
+            The path to the original code. Can be used to extract the syntax tree.
+
+        function_iid : int
+            Unique ID of the function.
+
+        name : str
+            Name of the function called.
+
+        result : Any
+            The result of the function.
+
+        Returns
+        -------
+        Any
+            If provided, overwrites the returned value.
+        """
+        super(ProcessAwareSlice, self).function_exit(dyn_ast, function_iid, name, result)
+        if name == self.sliced_function_name and self.invocation_depth == 0 and self.is_child():
+            self.write_fragment()
+
+    def end_execution(self) -> None:
+        """Hook for the end of execution. A child only writes its fragment, the parent computes the slice
+        """
+        if self.is_child():
+            self.write_fragment()
+            return
+        super(ProcessAwareSlice, self).end_execution()
+
+    def prepare_file_attributes(self):
+        """This method merges the fragments of the children, then prepares source_path and source after the
+        execution
+
+        Returns
+        -------
+        None
+        """
+        if self.is_child() == False:
+            self.merge_fragments()
+        super(ProcessAwareSlice, self).prepare_file_attributes()
+
+    def write_fragment(self) -> None:
+        """This method writes the dependencies which the current process added to the ones it inherited. The file
+        is replaced atomically, so the parent never reads a partial fragment
+
+        Returns
+        -------
+        None
+        """
+        lines: Dict[str, List[int]] = dict()
+        for line_number, line in self.lines_info.items():
+            dependencies = set(line.dependencies) - self.inherited.get(line_number, set())
+            if line_number not in self.inherited or len(dependencies) > 0:
+                lines[str(line_number)] = sorted(dependencies)
+        source_path = self.source_path if self.source_path != "" else next(iter(self.files), "")
+        fragment = {"call_site": self.call_site, "source_path": source_path,
+                    "slice_start_line": self.slice_start_line, "slice_end_line": self.slice_end_line,
+                    "files": self.files, "slice_ranges": self.slice_ranges,
+                    "callee_ranges": {file_path: sorted(callee_ranges)
+                                      for file_path, callee_ranges in self.callee_ranges.items()},
+                    "lines": lines}
+        os.makedirs(self.fragments_directory, exist_ok=True)
+        file_name = path.join(self.fragments_directory, f"{os.getpid()}.json")
+        with open(file_name + ".tmp", "w") as file:
+            json.dump(fragment, file)
+        os.replace(file_name + ".tmp", file_name)
+
+    def merge_fragments(self) -> None:
+        """This method merges the fragments of all children into lines_info and removes them
+
+        Returns
+        -------
+        None
+        """
+        if path.isdir(self.fragments_directory) == False:
+            return
+        for file_name in sorted(os.listdir(self.fragments_directory)):
+            if file_name.endswith(".json") == False:
+                continue
+            with open(path.join(self.fragments_directory, file_name), "r") as file:
+                fragment = json.load(file)
+            self.merge_fragment(fragment)
+        shutil.rmtree(self.fragments_directory, ignore_errors=True)
+        self.reachability_index = None
+        self.dependence_graph = None
+
+    def merge_fragment(self, fragment: Dict[str, Any]) -> None:
+        """This method merges the fragment of a child into lines_info. Its call site depends on the lines of the
+        child which no other line of the child depends on, and the lines of the parent which received the results
+        of the child depend on the call site
+
+        Parameters
+        ----------
+        fragment: Dict[str, Any]
+            The fragment, as written by write_fragment
+
+        Returns
+        -------
+        None
+        """
+        remap = partial(self.parent_node, fragment["files"])
+        lines = {remap(int(line_number)): [remap(dependency) for dependency in dependencies]
+                 for line_number, dependencies in fragment["lines"].items()}
+        for line_number, dependencies in lines.items():
+            self.add_dependencies(line_number, dependencies)
+        for file_path, slice_range in fragment["slice_ranges"].items():
+            self.slice_ranges.setdefault(file_path, tuple(slice_range))
+        for file_path, callee_ranges in fragment["callee_ranges"].items():
+            self.callee_ranges.setdefault(file_path, set()).update(tuple(callee_range) for callee_range in callee_ranges)
+        if fragment["call_site"] is not None:
+            call_site = remap(fragment["call_site"])
+            # A line which depends on itself, e.g. queue.put(...) on the queue, may still send its value back
+            used = {dependency for line_number, dependencies in lines.items() for dependency in dependencies
+                    if dependency != line_number}
+            self.add_dependencies(call_site, [line_number for line_number in lines
+                                              if line_number not in used and line_number != call_site])
+            for receiver in self.receivers.get(call_site, set()):
+                self.add_dependencies(receiver, [call_site])
+        if self.slice_start_line == -1:
+            self.slice_start_line = fragment["slice_start_line"]
+            self.slice_end_line = fragment["slice_end_line"]
+        if self.source_path == "":
+            self.source_path = fragment["source_path"]
+
+    def parent_node(self, files: List[str], node: int) -> int:
+        """This method maps a node of a fragment to the file ids of the parent
+
+        Parameters
+        ----------
+        files: List[str]
+            The code files of the child, by file id
+
+        node: int
+            The node in the child
+
+        Returns
+        -------
+        int
+            The node in the parent
+        """
+        file_id, line_number = node_location(node)
+        if file_id >= len(files):
+            return node
+        return node_id(self.file_id(files[file_id]), line_number)
+
+    def add_dependencies(self, line_number: int, dependencies: List[int]) -> None:
+        """This method adds dependencies to a line
+
+        Parameters
+        ----------
+        line_number: int
+            The line
+
+        dependencies: List[int]
+            The lines which it depends on
+
+        Returns
+        -------
+        None
+        """
+        if line_number in self.lines_info:
+            self.lines_info[line_number].dependencies = list(
+                set(self.lines_info[line_number].dependencies + dependencies))
+        else:
+            self.lines_info[line_number] = LineMetaData(list(dependencies))
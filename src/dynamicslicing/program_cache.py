@@ -0,0 +1,311 @@
+import json
+import marshal
+import pickle
+from collections import namedtuple
+from hashlib import sha256
+from importlib.util import MAGIC_NUMBER
+from os import getpid, makedirs, path, remove, replace, stat
+from stat import S_IWGRP, S_IWOTH
+from re import sub
+from shutil import copyfile
+from typing import Any, Dict, Optional
+import libcst as cst
+from dynapyt.instrument.IIDs import IIDs
+from dynapyt.instrument.instrument import instrument_code
+from dynamicslicing.bytecode import BYTECODE_POSITIONS_AVAILABLE, BytecodeTable
+
+try:
+    from importlib.metadata import PackageNotFoundError, version
+except ImportError:
+    # importlib.metadata is new in Python 3.8, the importlib_metadata backport is installed with Python 3.7
+    from importlib_metadata import PackageNotFoundError, version
+
+try:
+    from os import getuid
+except ImportError:
+    # There are no user ids on Windows
+    getuid = None
+
+CACHE_VERSION = 1
+DEFAULT_CACHE_DIRECTORY = path.join(path.expanduser("~"), ".cache", "dynamicslicing")
+
+InstrumentedProgram = namedtuple("InstrumentedProgram",
+                                 ["code", "source", "instrumented_source", "module", "iids", "table"])
+
+
+class MemoryIIDs(IIDs):
+    """
+    This class is the IIDs table of dynapyt without the JSON file: it is filled by the instrumentation and only
+    kept in memory, until store is called explicitly
+    -------
+    """
+
+    def __init__(self, file_path: str) -> None:
+        """
+        Parameters
+        ----------
+        file_path: str
+            The path to the code file, which the instrumented code refers to
+        """
+        self.next_iid = 0
+        self.iid_to_location = dict()
+        self.location_to_iid = dict()
+        self.file_path = file_path[:-3] + "-dynapyt.json"
+
+    def store(self) -> None:
+        """Nothing is written to disk, ProgramCache.instrument_file calls IIDs.store when the file is needed
+
+        Returns
+        -------
+        None
+        """
+        return
+
+
+class ProgramCache():
+    """
+    This class is a persistent cache of instrumented programs. An entry holds the instrumented source and its
+    compiled code, the IIDs, the syntax tree of the original source and its BytecodeTable, i.e. everything which an
+    analysis run derives from the code file before the execution. Entries are files named by the hash of the path,
+    the source and the hooks (program_hash), and are only used if they were written by the same cache version,
+    interpreter, dynapyt and libcst.
+
+    The directory is trusted like a __pycache__ directory: an entry is unpickled, and its code is executed as the
+    program, so whoever can write an entry can run code in the analysis. Entries are therefore only read from a
+    directory which is owned by the current user and which neither the group nor others can write, and the
+    directory is created that way. Do not point the cache to a directory which other users can write.
+
+    Attributes
+    ----------
+    directory : str
+        The directory of the entries
+
+    toolchain : tuple
+        The versions which an entry must have been written with
+    -------
+    """
+    directory: str
+    toolchain: tuple
+
+    def __init__(self, directory: str = None) -> None:
+        """
+        Parameters
+        ----------
+        directory: str
+            The directory of the entries, DEFAULT_CACHE_DIRECTORY if None
+        """
+        self.directory = directory if directory is not None else DEFAULT_CACHE_DIRECTORY
+        self.toolchain = (CACHE_VERSION, MAGIC_NUMBER, package_version("dynapyt"), package_version("libcst"))
+
+    def entry_path(self, key: str) -> str:
+        """This method returns the path of the entry of a program
+
+        Parameters
+        ----------
+        key: str
+            The hash of the program
+
+        Returns
+        -------
+        str
+            The path to the entry file
+        """
+        return path.join(self.directory, key + ".pickle")
+
+    def trusted(self) -> bool:
+        """This method checks that only the current user can write the directory, see the trust boundary above.
+        The owner is not checked where there are no user ids
+
+        Returns
+        -------
+        bool
+            True if the entries of the directory may be loaded
+        """
+        try:
+            status = stat(self.directory)
+        except OSError:
+            return False
+        if getuid is not None and status.st_uid != getuid():
+            return False
+        return status.st_mode & (S_IWGRP | S_IWOTH) == 0
+
+    def load(self, key: str) -> Optional[InstrumentedProgram]:
+        """This method loads and validates the entry of a program, if the directory is trusted
+
+        Parameters
+        ----------
+        key: str
+            The hash of the program
+
+        Returns
+        -------
+        InstrumentedProgram
+            The program, None if there is no valid entry
+        """
+        if self.trusted() == False:
+            return None
+        try:
+            with open(self.entry_path(key), "rb") as file:
+                entry = pickle.load(file)
+            if entry["toolchain"] != self.toolchain or entry["key"] != key:
+                return None
+            return InstrumentedProgram(marshal.loads(entry["code"]), entry["source"], entry["instrumented_source"],
+                                       entry["module"], entry["iids"], entry["table"])
+        except FileNotFoundError:
+            return None
+        except (OSError, EOFError, ValueError, TypeError, KeyError, AttributeError, ImportError,
+                pickle.UnpicklingError):
+            # A damaged or foreign entry is treated like a missing one, and overwritten by the next store
+            return None
+
+    def store(self, key: str, program: InstrumentedProgram) -> None:
+        """This method writes the entry of a program. The file is written under a temporary name and then renamed,
+        so concurrent runs never read a partial entry
+
+        Parameters
+        ----------
+        key: str
+            The hash of the program
+
+        program: InstrumentedProgram
+            The program
+
+        Returns
+        -------
+        None
+        """
+        entry = {"toolchain": self.toolchain, "key": key, "code": marshal.dumps(program.code),
+                 "source": program.source, "instrumented_source": program.instrumented_source,
+                 "module": program.module, "iids": program.iids, "table": program.table}
+        makedirs(self.directory, mode=0o700, exist_ok=True)
+        temporary_path = f"{self.entry_path(key)}.{getpid()}.tmp"
+        try:
+            with open(temporary_path, "wb") as file:
+                pickle.dump(entry, file, protocol=pickle.HIGHEST_PROTOCOL)
+            replace(temporary_path, self.entry_path(key))
+        except (OSError, pickle.PicklingError, RecursionError):
+            if path.exists(temporary_path):
+                remove(temporary_path)
+
+    def get(self, source_path: str, selected_hooks: Dict[str, Any]) -> InstrumentedProgram:
+        """This method returns the instrumented program of a code file, from its entry if it is valid, otherwise it
+        instruments the code file and stores the entry
+
+        Parameters
+        ----------
+        source_path: str
+            The absolute path to the code file
+
+        selected_hooks: Dict[str, Any]
+            The hooks of the analyses
+
+        Returns
+        -------
+        InstrumentedProgram
+            The instrumented program
+        """
+        with open(source_path, "r") as file:
+            source = file.read()
+        key = program_hash(source_path, source, selected_hooks)
+        program = self.load(key)
+        if program is None:
+            program = instrument_program(source_path, source, selected_hooks)
+            self.store(key, program)
+        return program
+
+    def instrument_file(self, file_path: str, selected_hooks: Dict[str, Any]) -> None:
+        """This method does what instrument_file of dynapyt does, i.e. it rewrites the code file in place and
+        creates the .orig copy and the IID file, but takes the instrumented source from the cache
+
+        Parameters
+        ----------
+        file_path: str
+            The path to the code file
+
+        selected_hooks: Dict[str, Any]
+            The hooks of the analyses
+
+        Returns
+        -------
+        None
+        """
+        file_path = path.abspath(file_path)
+        program = self.get(file_path, selected_hooks)
+        copyfile(file_path, sub(r"\.py$", ".py.orig", file_path))
+        with open(file_path, "w") as file:
+            file.write(program.instrumented_source)
+        IIDs.store(program.iids)
+
+
+def package_version(name: str) -> Optional[str]:
+    """ This method returns the installed version of a package
+
+    Parameters
+    ----------
+    name: str
+        The name of the package
+
+    Returns
+    ----------
+    str
+        The version, None if the package is not installed
+    """
+    try:
+        return version(name)
+    except PackageNotFoundError:
+        return None
+
+
+def program_hash(source_path: str, source: str, selected_hooks: Dict[str, Any]) -> str:
+    """ This method computes the cache key of an instrumented program. The path is part of it because the
+    instrumented code and the IIDs refer to it
+
+    Parameters
+    ----------
+    source_path: str
+        The absolute path to the code file
+
+    source: str
+        The source of the code file
+
+    selected_hooks: Dict[str, Any]
+        The hooks of the analyses
+
+    Returns
+    ----------
+    str
+        The hexadecimal SHA-256 hash
+    """
+    content = json.dumps([source_path, source, selected_hooks], sort_keys=True, default=str)
+    return sha256(content.encode("utf-8")).hexdigest()
+
+
+def instrument_program(source_path: str, source: str, selected_hooks: Dict[str, Any]) -> InstrumentedProgram:
+    """ This method instruments a source in memory and precomputes what the analyses need about it
+
+    Parameters
+    ----------
+    source_path: str
+        The absolute path to the code file
+
+    source: str
+        The source of the code file
+
+    selected_hooks: Dict[str, Any]
+        The hooks of the analyses
+
+    Returns
+    ----------
+    InstrumentedProgram
+        The compiled instrumented code, the original and the instrumented source, the syntax tree, the IIDs and the
+        BytecodeTable (None before Python 3.11)
+    """
+    iids = MemoryIIDs(source_path)
+    instrumented_source = instrument_code(source, source_path, iids, selected_hooks)
+    if instrumented_source is None:
+        raise ImportError(f"{source_path} could not be instrumented", path=source_path)
+    table = None
+    if BYTECODE_POSITIONS_AVAILABLE:
+        table = BytecodeTable.from_source(source, source_path + ".orig")
+    return InstrumentedProgram(compile(instrumented_source, source_path, "exec"), source, instrumented_source,
+                               cst.parse_module(source), iids, table)
@@ -0,0 +1,230 @@
+import argparse
+import json
+import os
+import signal
+import socket
+import sys
+from os import path
+from tempfile import gettempdir
+from typing import Any, Dict, Set
+from dynamicslicing.program_cache import ProgramCache
+from dynamicslicing.session import AnalysisSession
+from dynamicslicing.utils import LRUCache
+
+DEFAULT_SOCKET_PATH = path.join(gettempdir(), "dynamicslicing.sock")
+
+
+class SlicingServer():
+    """
+    This class is a long-lived slicing daemon which listens on a Unix socket. libcst, dynapyt and the analysis are
+    imported once, and the instrumented programs (code, syntax tree, IIDs and BytecodeTable) are kept in an LRU
+    cache, so a job only pays for the execution and the slice. Every job runs in a forked worker, so the state that
+    a program and the analysis leave behind (modules, globals, the dynapyt runtime) never reaches the next job.
+
+    A request is one line of JSON: {"program": <path>, "entry": <path>, "criteria": [<line>, ...]}. The program is
+    the code file which is instrumented and sliced, the entry is the file which is run as __main__ (the program if
+    omitted) and the criteria are the line numbers to slice for (the line with the slicing comment if omitted).
+    The response of AnalysisSession.run is sent back as one line of JSON.
+    {"command": "shutdown"} stops the server.
+
+    Attributes
+    ----------
+    socket_path : str
+        The path of the Unix socket
+
+    programs : LRUCache
+        The instrumented programs, by their hash
+
+    cache : ProgramCache
+        The persistent cache of instrumented programs, None to keep them in memory only
+
+    session : AnalysisSession
+        The session which instruments the programs, keeping them in programs, and runs the jobs in the workers
+
+    workers : Set[int]
+        The process ids of the running workers
+
+    listener : socket.socket
+        The listening socket, None when the server is not running
+    -------
+    """
+    socket_path: str
+    programs: LRUCache
+    cache: ProgramCache
+    session: AnalysisSession
+    workers: Set[int]
+    listener: socket.socket
+
+    def __init__(self, socket_path: str = DEFAULT_SOCKET_PATH, capacity: int = 64, cache: ProgramCache = None) -> None:
+        """
+        Parameters
+        ----------
+        socket_path: str
+            The path of the Unix socket
+
+        capacity: int
+            The number of instrumented programs which are kept in memory
+
+        cache: ProgramCache
+            The persistent cache of instrumented programs, None to keep them in memory only
+        """
+        self.socket_path = socket_path
+        self.programs = LRUCache(capacity)
+        self.cache = cache
+        self.session = AnalysisSession(cache=cache, programs=self.programs)
+        self.workers = set()
+        self.listener = None
+
+    def serve_forever(self) -> None:
+        """This method accepts and handles requests until a shutdown request, SIGTERM or SIGINT
+
+        Returns
+        -------
+        None
+        """
+        if path.exists(self.socket_path):
+            os.remove(self.socket_path)
+        self.listener = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.listener.bind(self.socket_path)
+        self.listener.listen()
+        self.listener.settimeout(1.0)
+        previous_handler = signal.signal(signal.SIGTERM, lambda signal_number, frame: sys.exit(0))
+        try:
+            running = True
+            while running:
+                self.reap_workers()
+                try:
+                    connection, _ = self.listener.accept()
+                except socket.timeout:
+                    continue
+                connection.settimeout(None)
+                with connection:
+                    running = self.handle(connection)
+        finally:
+            signal.signal(signal.SIGTERM, previous_handler)
+            self.listener.close()
+            self.listener = None
+            if path.exists(self.socket_path):
+                os.remove(self.socket_path)
+            self.reap_workers(block=True)
+
+    def handle(self, connection: socket.socket) -> bool:
+        """This method reads a request, prepares its program and forks a worker for it
+
+        Parameters
+        ----------
+        connection: socket.socket
+            The connection of the client
+
+        Returns
+        -------
+        bool
+            False if the server should stop
+        """
+        try:
+            request = json.loads(connection.makefile("rb").readline())
+            if isinstance(request, dict) == False:
+                raise TypeError(f"the request must be a JSON object, not {type(request).__name__}")
+            if request.get("command") == "shutdown":
+                send(connection, {"status": "ok"})
+                return False
+            program_path = path.abspath(request["program"])
+            entry_path = path.abspath(request.get("entry") or program_path)
+            criteria = [int(line_number) for line_number in request.get("criteria") or []]
+            # Instrumenting before the fork keeps the program in the cache of the server for later jobs
+            self.session.instrument(program_path)
+        except Exception as error:
+            # A malformed request fails alone, the server keeps serving the next ones
+            try:
+                send(connection, {"status": "error", "error": f"{type(error).__name__}: {error}"})
+            except OSError:
+                pass
+            return True
+        worker = os.fork()
+        if worker == 0:
+            # Whatever happens, the worker must not return into the loop of the server
+            try:
+                if self.listener is not None:
+                    self.listener.close()
+                send(connection, self.session.run(program_path, entry_path, criteria))
+            finally:
+                os._exit(0)
+        self.workers.add(worker)
+        return True
+
+    def reap_workers(self, block: bool = False) -> None:
+        """This method collects the exit status of finished workers
+
+        Parameters
+        ----------
+        block: bool
+            Whether to wait until all workers finished
+
+        Returns
+        -------
+        None
+        """
+        for worker in list(self.workers):
+            finished, _ = os.waitpid(worker, 0 if block else os.WNOHANG)
+            if finished != 0:
+                self.workers.discard(worker)
+
+
+def send(connection: socket.socket, message: Dict[str, Any]) -> None:
+    """ This method sends a message as one line of JSON
+
+    Parameters
+    ----------
+    connection: socket.socket
+        The connection
+
+    message: Dict[str, Any]
+        The message
+
+    Returns
+    ----------
+    None
+    """
+    connection.sendall(json.dumps(message).encode("utf-8") + b"\n")
+
+
+def request(message: Dict[str, Any], socket_path: str = DEFAULT_SOCKET_PATH) -> Dict[str, Any]:
+    """ This method sends a request to a running SlicingServer and waits for its response
+
+    Parameters
+    ----------
+    message: Dict[str, Any]
+        The request, e.g. {"program": "program.py", "criteria": [12]}
+
+    socket_path: str
+        The path of the Unix socket of the server
+
+    Returns
+    ----------
+    Dict[str, Any]
+        The response
+    """
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as connection:
+        connection.connect(socket_path)
+        send(connection, message)
+        return json.loads(connection.makefile("rb").readline())
+
+
+def main() -> None:
+    """ This method starts a SlicingServer from the command line
+
+    Returns
+    ----------
+    None
+    """
+    parser = argparse.ArgumentParser(description="Run the slicing daemon")
+    parser.add_argument("--socket", default=DEFAULT_SOCKET_PATH, help="Path of the Unix socket")
+    parser.add_argument("--capacity", type=int, default=64, help="Number of instrumented programs kept in memory")
+    parser.add_argument("--cache", default=None, help="Directory of the persistent program cache")
+    arguments = parser.parse_args()
+    cache = ProgramCache(arguments.cache) if arguments.cache is not None else None
+    SlicingServer(arguments.socket, arguments.capacity, cache).serve_forever()
+
+
+if __name__ == "__main__":
+    main()
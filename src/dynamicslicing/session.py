@@ -0,0 +1,232 @@
+import signal
+from importlib import import_module
+from io import StringIO
+from os import path
+from types import ModuleType
+from typing import Any, Dict, List, MutableMapping, TextIO, Type
+from dynapyt.analyses.BaseAnalysis import BaseAnalysis
+from dynapyt.utils.hooks import get_hooks_from_analysis
+from dynamicslicing.import_hook import InstrumentingFinder, run_entry
+from dynamicslicing.program_cache import InstrumentedProgram, ProgramCache
+from dynamicslicing.slice import Slice
+from dynamicslicing.utils import remove_lines
+
+
+class AnalysisSession():
+    """
+    This class runs many programs under one analysis in the same process while dynapyt stays warm. dynapyt.runtime
+    is imported once and registered once: between two programs its state (the analyses, end_execution_called, the
+    coverage and the current IID file) is reset in place, and so is the state of the analysis instance, instead of
+    deleting dynapyt.runtime from sys.modules and importing it again like the test runner does. The programs are
+    instrumented in memory, and the instrumented code, syntax trees and IIDs of the most recently run ones are kept
+    (see PROGRAM_CAPACITY), so running a program again costs its execution and the analysis only.
+
+    Modules which the programs import and which are not instrumented stay in sys.modules between programs, like
+    in any long running process.
+
+    Attributes
+    ----------
+    analysis : BaseAnalysis
+        The analysis instance, it is reset before every program
+
+    finder : InstrumentingFinder
+        The finder which instruments the programs, it keeps their instrumented code
+
+    runtime : ModuleType
+        The dynapyt.runtime module which the analysis is registered with, None before the first program. If
+        somebody else removes it from sys.modules, the analysis is registered with the new one
+    -------
+    """
+    analysis: BaseAnalysis
+    finder: InstrumentingFinder
+    runtime: ModuleType
+
+    def __init__(self, analysis_class: Type[BaseAnalysis] = Slice, cache: ProgramCache = None,
+                 programs: MutableMapping[str, InstrumentedProgram] = None, analysis: BaseAnalysis = None) -> None:
+        """
+        Parameters
+        ----------
+        analysis_class: Type[BaseAnalysis]
+            The analysis to run, a class with a reset method like Slice or SliceDataflow
+
+        cache: ProgramCache
+            The persistent cache of instrumented programs, None to keep them in memory only
+
+        programs: MutableMapping[str, InstrumentedProgram]
+            The mapping to keep the instrumented programs in, e.g. one which outlives the session, a new LRUCache of
+            PROGRAM_CAPACITY programs if None
+
+        analysis: BaseAnalysis
+            The analysis instance to run, e.g. a Slice with reports, a new analysis_class if None
+        """
+        self.analysis = analysis if analysis is not None else analysis_class()
+        self.finder = InstrumentingFinder([], [self.analysis], cache, get_hooks_from_analysis([self.analysis]),
+                                          programs)
+        self.runtime = None
+
+    def reset(self, program_path: str) -> None:
+        """This method prepares the runtime and the analysis for the next program, without reloading any module
+
+        Parameters
+        ----------
+        program_path: str
+            The absolute path to the code file which is analyzed next
+
+        Returns
+        -------
+        None
+        """
+        self.analysis.reset(program_path + ".orig")
+        runtime = import_module("dynapyt.runtime")
+        if runtime is not self.runtime:
+            # set_analysis installs the signal handlers and the atexit hook, which must happen only once
+            handlers = {number: signal.getsignal(number) for number in (signal.SIGINT, signal.SIGTERM)}
+            runtime.analyses = None
+            runtime.set_analysis([self.analysis])
+            for number, handler in handlers.items():
+                signal.signal(number, handler)
+            self.runtime = runtime
+        runtime.analyses = [self.analysis]
+        runtime.current_file = None
+        if runtime.covered is not None:
+            runtime.covered = dict()
+        runtime.end_execution_called = False
+
+    def run(self, program_path: str, entry_path: str = None, criteria: List[int] = None,
+            module_paths: List[str] = None) -> Dict[str, Any]:
+        """This method runs a program under the analysis and slices it for every criterion
+
+        Parameters
+        ----------
+        program_path: str
+            The path to the code file to be sliced
+
+        entry_path: str
+            The path to the code file to run as __main__, the program if None
+
+        criteria: List[int]
+            The line numbers of the slicing criteria, the line with the slicing comment if None or empty
+
+        module_paths: List[str]
+            The paths to other code files which are instrumented when they are imported, so the slices may reach
+            into them
+
+        Returns
+        -------
+        Dict[str, Any]
+            The response: "status", and "output" (what the program printed), "exit" (the exception which the
+            program raised or exited with, None if it ran to its end) and the result of slice on success or "error".
+            A program which raises or exits is sliced as far as it ran
+        """
+        output = StringIO()
+        program_exit = None
+        try:
+            self.instrument(program_path, module_paths)
+        except (Exception, SystemExit) as error:
+            return {"status": "error", "error": f"{type(error).__name__}: {error}"}
+        try:
+            self.execute(program_path, entry_path, module_paths, output)
+        except (Exception, SystemExit) as error:
+            program_exit = f"{type(error).__name__}: {error}"
+        try:
+            return {"status": "ok", "output": output.getvalue(), "exit": program_exit, **self.slice(criteria)}
+        except Exception as error:
+            return {"status": "error", "error": f"{type(error).__name__}: {error}", "exit": program_exit}
+
+    def instrument(self, program_path: str, module_paths: List[str] = None) -> None:
+        """This method selects the code files to be instrumented and instruments the program, if it is not cached
+
+        Parameters
+        ----------
+        program_path: str
+            The path to the code file to be sliced
+
+        module_paths: List[str]
+            The paths to other code files which are instrumented when they are imported
+
+        Returns
+        -------
+        None
+        """
+        program_path = path.abspath(program_path)
+        self.finder.source_paths = {program_path}
+        self.finder.source_paths.update(path.abspath(module_path) for module_path in module_paths or [])
+        self.finder.instrument(program_path)
+
+    def execute(self, program_path: str, entry_path: str = None, module_paths: List[str] = None,
+                output: TextIO = None) -> None:
+        """This method runs a program under the analysis, without slicing it
+
+        Parameters
+        ----------
+        program_path: str
+            The path to the code file to be sliced
+
+        entry_path: str
+            The path to the code file to run as __main__, the program if None
+
+        module_paths: List[str]
+            The paths to other code files which are instrumented when they are imported
+
+        output: TextIO
+            Receives what the program prints, None to leave stdout alone
+
+        Returns
+        -------
+        None
+        """
+        program_path = path.abspath(program_path)
+        entry_path = path.abspath(entry_path) if entry_path is not None else program_path
+        self.instrument(program_path, module_paths)
+        self.reset(program_path)
+        try:
+            run_entry(program_path, entry_path, self.finder, output)
+        finally:
+            # The slices are computed by slice, the end_execution hook would write sliced.py at exit. The runtime is
+            # left without analyses, so it is not used up for whoever uses dynapyt next
+            self.runtime.analyses = []
+
+    def slice(self, criteria: List[int] = None) -> Dict[str, Any]:
+        """This method slices the program of the last execution for every criterion
+
+        Parameters
+        ----------
+        criteria: List[int]
+            The line numbers of the slicing criteria, the line with the slicing comment if None or empty
+
+        Returns
+        -------
+        Dict[str, Any]
+            "slices": the slice (kept line numbers) of every criterion, "sliced": the sliced code of the program
+            for every criterion and "modules": for every criterion, the path of the sliced file and the sliced code
+            of every other code file which the slice touches (Slice only)
+        """
+        self.analysis.prepare_file_attributes()
+        if criteria is None or len(criteria) == 0:
+            criteria = [self.analysis.get_slicing_criterion_line(self.analysis.source, self.analysis.slicing_comment)]
+        slices = self.analysis.query_slices(criteria)
+        response: Dict[str, Any] = {"slices": dict(), "sliced": dict(), "modules": dict()}
+        for line_number, lines in slices.items():
+            response["slices"][str(line_number)] = lines
+            response["sliced"][str(line_number)] = remove_lines(self.analysis.source, lines,
+                                                                self.analysis.slice_start_line,
+                                                                self.analysis.slice_end_line)
+            response["modules"][str(line_number)] = dict()
+            if isinstance(self.analysis, Slice):
+                for file_id, sliced_code in self.analysis.sliced_files(lines).items():
+                    if file_id != 0:
+                        response["modules"][str(line_number)][self.analysis.sliced_file_path(file_id)] = sliced_code
+        return response
+
+    def end_execution(self) -> None:
+        """This method runs the end_execution hook of the analysis for the last program, e.g. to write its
+        sliced.py, like dynapyt does at exit
+
+        Returns
+        -------
+        None
+        """
+        if self.runtime is not None:
+            self.runtime.analyses = [self.analysis]
+            self.runtime.end_execution_called = False
+            self.runtime.end_execution()
@@ -1,13 +1,29 @@
+import sys
 import libcst as cst
 from collections import namedtuple
+from time import perf_counter
 from os import path
-from typing import Callable, Dict, Iterable, List, Any, Optional, Union, Tuple
+from inspect import CO_ASYNC_GENERATOR, CO_COROUTINE, CO_GENERATOR, CO_ITERABLE_COROUTINE
+from types import FrameType
+from typing import Callable, Dict, Iterable, List, Any, MutableMapping, Optional, Set, Union, Tuple
 from dynapyt.utils.nodeLocator import get_node_by_location
 from dynapyt.analyses.BaseAnalysis import BaseAnalysis
 from dynapyt.instrument.IIDs import IIDs
-from dynamicslicing.utils import AttributeMetaData, ControlFlowMetaData, LineMetaData, VariableMetaData, CommentFinder, ElementMetaData, remove_lines
+from dynamicslicing.utils import AttributeMetaData, LineMetaData, VariableMetaData, CommentFinder, ElementMetaData, SamplingPolicy, remove_lines
+from dynamicslicing.utils import FileCache, node_id, node_location
+from dynamicslicing.bytecode import BYTECODE_POSITIONS_AVAILABLE, BytecodeTable
+from dynamicslicing.control_dependence import compute_control_dependencies
+from dynamicslicing.def_use import assignment_reference, assignment_target, subscript_index
+from dynamicslicing.dependence_graph import DependenceGraph, DependenceQueries, ReachabilityIndex
+from dynamicslicing.spill_store import SpillStore
+from dynamicslicing.stats import HookStatistics, LineProfile, MemoryReport
 
-class Slice(BaseAnalysis):
+# function_enter runs a few frames below the frame of the entered function: the hook of dynapyt, the analysis and
+# the wrappers of HookStatistics and LineProfile. The frame is searched this deep only
+HOOK_FRAMES = 16
+
+
+class Slice(DependenceQueries, BaseAnalysis):
     """
     This class runs slicing algorithm on a Python files, with a specified comment pointing to slicing criterion, 
     and creates another Python file named sliced.py with sliced code. This class covers both data and control flow analysis.
@@ -23,11 +39,19 @@ class Slice(BaseAnalysis):
     collections_modifiers_attributes: list
         A list of attributes that are changes a collection 
 
-    lines_info: Dict[int, LineMetaData]
-        A dictionary which hold the LineMetaData of every line number in code
+    lines_info: MutableMapping[int, LineMetaData]
+        A dictionary which hold the LineMetaData of every node, i.e. line of a code file (see node_id). The lines of
+        the code file of the sliced function are their own nodes. A SpillStore if spill_limit is set
+
+    variables_info: MutableMapping[str, VariableMetaData]
+        A dictionary which hold the VariableMetaData of every variable in code. A SpillStore if spill_limit is set
+
+    spill_limit : int
+        The number of records of lines_info and of variables_info which are kept in memory, the others are spilled
+        to disk. None keeps all of them in plain dictionaries
 
-    variables_info: Dict[str, VariableMetaData]
-        A dictionary which hold the VariableMetaData of every variable in code
+    spill_directory : str
+        The directory of the files of the spilled records, the temporary directory if None
 
     sliced_function_name : str
         A fixed function name that slicing occuurs inside that
@@ -50,17 +74,86 @@ class Slice(BaseAnalysis):
     source_path: str
         The path to the code file to be sliced
 
-    iids: Dict[Location, int]
-        A Dictionary that maps every iid to its Location
+    files : List[str]
+        The paths of the analyzed code files, by file id. The code file of the first analyzed invocation of
+        sliced_function_name has file id 0
+
+    file_ids : Dict[str, int]
+        A dictionary which maps the path of every analyzed code file to its file id
+
+    slice_ranges : Dict[str, Tuple[int, int]]
+        A dictionary which maps every code file in which sliced_function_name was analyzed to its first and last
+        line. Only the events inside these ranges and callee_ranges are analyzed
+
+    callee_ranges : Dict[str, Set[Tuple[int, int]]]
+        A dictionary which maps every code file other than file 0 to the first and last lines of its functions which
+        were called during an analyzed invocation
+
+    call_sites : List[int]
+        The nodes of the calls of the active functions of callee_ranges, the innermost last. A function which
+        leaves with an exception keeps its call site until the invocation is over
+
+    returned_call_site : int
+        The call site of the function of callee_ranges which exits now. dynapyt calls function_exit before _return
+
+    current_node : int
+        The node of the last analyzed event, the call site of a function which is entered now
+
+    file_lines : Dict[str, List[str]]
+        The lines of the source of every code file which was needed to classify a read
+
+    asts : FileCache
+        The syntax trees and IIDs of the code files, loaded lazily. Only ast_cache_size files which are loaded from
+        disk are kept, the files which were instrumented in memory are pinned
+
+    bytecode_tables : Dict[str, BytecodeTable]
+        A dictionary which stores the BytecodeTable of every analyzed code file (Python 3.11+). The hooks classify
+        their node with it, and fall back to the syntax tree for the nodes it does not know
+
+    reachability_index: ReachabilityIndex
+        An index over lines_info which answers slice queries for any line, built once after the execution
 
-    control_flow_stack : list
-        A list of line numbers which stacks the control-flow order
+    dependence_graph: DependenceGraph
+        The dependence graph of lines_info with its reverse edges, which answers forward slice and chop queries
 
-    control_flow_dict : dict
-        A dictionary of line numbers which stores the control-flow order
+    control_dependencies : Dict[int, List[int]]
+        A dictionary which maps every node of the sliced functions to the nodes of the headers of the branches
+        (if, for, while) that it is statically control dependent on
+
+    control_dependence_cache : Dict[Tuple[str, int], Dict[int, List[int]]]
+        A dictionary which stores the control dependences of every analyzed function, by its code file and start line
+
+    taken_branches : Set[Tuple]
+        A set of the keys of the branches that were taken during the current invocation: their code files and iids,
+        or the spans of their nodes when they are monitored or replayed
 
     start_analysis : bool
         Boolean variable which indicates the slicing computation should start or not
+
+    statistics : HookStatistics
+        Counts and times the hooks when a statistics report is requested, None otherwise
+
+    profile : LineProfile
+        Attributes the time of the hooks to the lines of the program when a profile is requested, None otherwise
+
+    memory : MemoryReport
+        Measures the memory of the analysis when a memory report is requested, None otherwise
+
+    sampling_policy : SamplingPolicy
+        Decides which invocations of sliced_function_name are analyzed. Dependencies of all sampled invocations
+        are merged into lines_info
+
+    analysis_finished : bool
+        Boolean variable which indicates that no later invocation will be analyzed, so every hook returns at once
+
+    invocation_depth : int
+        The number of active (nested) invocations of sliced_function_name
+
+    invocation_start : float
+        The time when the current sampled invocation was entered
+
+    invocation_frames : List[FrameType]
+        The frames of the active (nested) invocations of sliced_function_name, the outermost first
     -------
     """
     Location = namedtuple(
@@ -70,8 +163,10 @@ class Slice(BaseAnalysis):
                        "bytes", "tuple", "frozenset"]
     collections_modifiers_attributes = [
         "append", "extend", "insert", "remove", "pop", "clear", "reverse", "sort"]
-    lines_info: Dict[int, LineMetaData] = dict()
-    variables_info: Dict[str, VariableMetaData] = dict()
+    lines_info: MutableMapping[int, LineMetaData] = dict()
+    variables_info: MutableMapping[str, VariableMetaData] = dict()
+    spill_limit: int = None
+    spill_directory: str = None
     sliced_function_name = "slice_me"
     slicing_comment = "slicing criterion"
     static_lines: List[int] = list()
@@ -79,28 +174,139 @@ class Slice(BaseAnalysis):
     slice_end_line: int
     source: str = ""
     source_path: str = ""
-    iids: Dict[Location, int] = None
-    control_flow_stack = list()
-    control_flow_dict = dict()
+    files: List[str] = list()
+    file_ids: Dict[str, int] = dict()
+    slice_ranges: Dict[str, Tuple[int, int]] = dict()
+    callee_ranges: Dict[str, Set[Tuple[int, int]]] = dict()
+    call_sites: List[int] = list()
+    returned_call_site: int = None
+    current_node: int = None
+    file_lines: Dict[str, List[str]] = dict()
+    asts: FileCache
+    bytecode_tables: Dict[str, BytecodeTable] = dict()
+    reachability_index: ReachabilityIndex = None
+    dependence_graph: DependenceGraph = None
+    control_dependencies: Dict[int, List[int]] = dict()
+    control_dependence_cache: Dict[Tuple[str, int], Dict[int, List[int]]] = dict()
+    taken_branches: Set[Tuple] = set()
     start_analysis = False
-
-    def __init__(self, source_path: str = ""):
+    statistics: HookStatistics = None
+    profile: LineProfile = None
+    memory: MemoryReport = None
+    sampling_policy: SamplingPolicy = None
+    analysis_finished = False
+    invocation_depth: int = 0
+    invocation_start: float = 0.0
+    invocation_frames: List[FrameType] = list()
+
+    def __init__(self, source_path: str = "", sampling_rate: int = 1, sampling_time_budget: float = None,
+                 invocation: Union[str, int] = None, statistics_path: str = None,
+                 profile_path: str = None, memory_path: str = None, ast_cache_size: int = 64,
+                 spill_limit: int = None, spill_directory: str = None):
         """
         Parameters
         ----------
         source_path: str
             The path to the code file to be sliced
+
+        sampling_rate: int
+            Only one in every sampling_rate invocations of sliced_function_name is analyzed
+
+        sampling_time_budget: float
+            Seconds of execution that may be analyzed in total, None for no limit
+
+        invocation: Union[str, int]
+            Selects a single invocation of sliced_function_name to analyze: "first", "last" or its number
+            (starting at 1). None analyzes the invocations chosen by the sampling rate and time budget
+
+        statistics_path: str
+            The path of a JSON report with the calls and time of every hook and the size of the dependence graph,
+            written at the end of the execution. None disables the counting
+
+        profile_path: str
+            The path of collapsed stacks which attribute the time and the events of the hooks to the lines and iids
+            of the program, written at the end of the execution with a line-annotated source (suffix .lines). None
+            disables the profile
+
+        memory_path: str
+            The path of a JSON report with the bytes which every structure of the analysis retains and the peak
+            memory of the run, traced with tracemalloc from now on. None disables the report
+
+        ast_cache_size: int
+            The number of code files whose syntax tree and IIDs, loaded from disk, are kept in memory. None keeps all
+
+        spill_limit: int
+            The number of records of lines_info and of variables_info which are kept in memory, the least recently
+            used others are spilled to a SQLite file and read back when they are accessed. None keeps all of them
+
+        spill_directory: str
+            The directory of the files of the spilled records, the temporary directory if None
         """
         super(Slice, self).__init__()
+        self.spill_limit = spill_limit
+        self.spill_directory = spill_directory
+        self.asts = FileCache(ast_cache_size)
+        self.bytecode_tables = dict()
+        self.sampling_policy = SamplingPolicy(sampling_rate, sampling_time_budget, invocation)
+        self.statistics = None
+        if statistics_path is not None:
+            self.statistics = HookStatistics(statistics_path)
+            self.statistics.install(self)
+        self.profile = None
+        if profile_path is not None:
+            self.profile = LineProfile(profile_path)
+            self.profile.install(self)
+        self.memory = None
+        if memory_path is not None:
+            self.memory = MemoryReport(memory_path)
+            self.memory.start()
+        self.reset(source_path)
+
+    def reset(self, source_path: str = "") -> None:
+        """This method forgets everything that was recorded about the previous run, so that the same instance can
+        analyze another run without being created again. The syntax trees, IIDs and BytecodeTables stay cached,
+        they are keyed by the path of their code file
+
+        Parameters
+        ----------
+        source_path: str
+            The path to the code file to be sliced in the next run
+
+        Returns
+        -------
+        None
+        """
         self.source = ""
         self.source_path = source_path
-        self.lines_info = dict()
-        self.variables_info = dict()
+        self.files = list()
+        self.file_ids = dict()
+        self.slice_ranges = dict()
+        self.callee_ranges = dict()
+        self.call_sites = list()
+        self.returned_call_site = None
+        self.current_node = None
+        self.file_lines = dict()
+        self.lines_info = self.create_store()
+        self.variables_info = self.create_store()
         self.slice_start_line = -1
         self.slice_end_line = -1
-        self.control_flow_stack = list()
-        self.control_flow_dict = dict()
+        self.reachability_index = None
+        self.dependence_graph = None
+        self.control_dependencies = dict()
+        self.control_dependence_cache = dict()
+        self.taken_branches = set()
         self.start_analysis = False
+        self.sampling_policy.reset()
+        if self.statistics is not None:
+            self.statistics.clear()
+        if self.profile is not None:
+            self.profile.clear()
+        if self.memory is not None:
+            self.memory.clear()
+        self.analysis_finished = False
+        self.invocation_depth = 0
+        self.invocation_start = 0.0
+        self.invocation_frames = list()
 
     def read(self, dyn_ast: str, iid: int, val: Any) -> Any:
         """Hook for reading an object attribute. Here we update our meta-data which helps us to compute the slice.
@@ -131,34 +337,19 @@ class Slice(BaseAnalysis):
             If provided, overwrites the returned value.
 
         """
-        if self.can_run_analysis(dyn_ast, iid) == False:
+        if self.start_analysis == False or self.can_run_analysis(dyn_ast, iid) == False:
             return
         location = self.iid_to_location(dyn_ast, iid)
-        read_variables = self.extract_variables(dyn_ast, iid)
-        _, attribute_name = self.read_is_via_attribute(dyn_ast, iid)
+        table = self.get_bytecode_table(dyn_ast)
+        span = tuple(location[1:])
+        if table is not None and span in table.spans:
+            name_load = table.name_load(span)
+            read_variables, attribute_name = ([], None) if name_load is None else ([name_load[0]], name_load[1])
+        else:
+            read_variables = self.extract_variables(dyn_ast, iid)
+            _, attribute_name = self.read_is_via_attribute(dyn_ast, iid)
         if (read_variables is not None):
-            dependencies: List[int] = []
-            for cf in self.control_flow_stack:
-                dependencies.append(cf.start_line)
-            for variable in read_variables:
-                for key, value in self.variables_info.items():
-                    if key == variable:
-                        dependencies.append(value.active_definition)
-                        if attribute_name is None:
-                            if (len(value.elements) > 0):
-                                for _, line in value.elements.items():
-                                    dependencies.append(line.active_definition)
-                            if (len(value.attributes) > 0):
-                                for _, line in value.attributes.items():
-                                    dependencies.append(line.active_definition)
-            if location.start_line in self.lines_info:
-                self.lines_info.get(
-                    location.start_line).dependencies += list(set(dependencies))
-                self.lines_info.get(location.start_line).dependencies = list(
-                    set(self.lines_info.get(location.start_line).dependencies))
-            else:
-                self.lines_info[location.start_line] = LineMetaData(
-                    list(set(dependencies)))
+            self.record_read(self.node(dyn_ast, location.start_line), read_variables, attribute_name)
 
     def write(self, dyn_ast: str, iid: int, old_vals: List[Callable], new_val: Any) -> Any:
         """Hook for writes. Here we update our meta-data which helps us to compute the slice.
@@ -186,79 +377,27 @@ class Slice(BaseAnalysis):
         Any
             If provided, overwrites the returned value.
         """
-        if self.can_run_analysis(dyn_ast, iid) == False:
+        if self.start_analysis == False or self.can_run_analysis(dyn_ast, iid) == False:
             return
         location = self.iid_to_location(dyn_ast, iid)
+        table = self.get_bytecode_table(dyn_ast)
+        span = tuple(location[1:])
+        if table is not None:
+            for variable_name, property_name, index in self.bytecode_stores(table, span):
+                reference = (None, None)
+                if (property_name is None) and (index is None):
+                    reference = table.reference_of(span)
+                self.record_write(self.node(dyn_ast, location.start_line), variable_name, property_name, index,
+                                  type(new_val).__name__, reference)
+            return
 
         variable_name, property_name, index = self.extract_lhs(dyn_ast, iid)
         if (variable_name is not None):
-            if (property_name is not None):
-                if (variable_name not in self.variables_info):
-                    raise "ERROR"
-                for ref in self.variables_info[variable_name].references:
-                    if ref in self.variables_info:
-                        self.variables_info[ref].attributes.update(
-                            {property_name: AttributeMetaData(location.start_line)})
-                self.variables_info[variable_name].attributes.update(
-                    {property_name: AttributeMetaData(location.start_line)})
-                dependencies: List[int] = []
-                for cf in self.control_flow_stack:
-                    dependencies.append(cf.start_line)
-                dependencies.append(
-                    self.variables_info[variable_name].active_definition)
-                if location.start_line in self.lines_info:
-                    self.lines_info.get(
-                        location.start_line).dependencies += dependencies
-                else:
-                    self.lines_info[location.start_line] = LineMetaData(
-                        dependencies)
-            elif (index is not None):
-                if (variable_name not in self.variables_info):
-                    raise "ERROR"
-                self.variables_info[variable_name].elements.update(
-                    {index: ElementMetaData(location.start_line)})
-                dependencies: List[int] = []
-                for cf in self.control_flow_stack:
-                    dependencies.append(cf.start_line)
-                dependencies.append(
-                    self.variables_info[variable_name].active_definition)
-                self.variables_info[variable_name].previous_definition = self.variables_info[variable_name].active_definition
-                self.variables_info[variable_name].active_definition = location.start_line
-                if (index in self.variables_info):
-                    dependencies.append(
-                        self.variables_info[index].active_definition)
-                if location.start_line in self.lines_info:
-                    self.lines_info.get(
-                        location.start_line).dependencies += list(set(dependencies))
-                    self.lines_info.get(location.start_line).dependencies = list(
-                        set(self.lines_info.get(location.start_line).dependencies))
-                else:
-                    self.lines_info[location.start_line] = LineMetaData(
-                        list(set(dependencies)))
-            else:
-                if (variable_name in self.variables_info):
-                    self.variables_info[variable_name].previous_definition = \
-                        self.variables_info[variable_name].active_definition
-                    self.variables_info[variable_name].active_definition = \
-                        location.start_line
-                    self.variables_info[variable_name].elements.clear()
-                    self.variables_info[variable_name].attributes.clear()
-                    self.variables_info[variable_name].references.clear()
-                else:
-                    self.variables_info[variable_name] = VariableMetaData(
-                        location.start_line, type(new_val).__name__)
-
-                lhs_variable, rhs_variable = self.reference_variable(
-                    dyn_ast, iid)
-
-                if lhs_variable is not None and rhs_variable is not None and type(new_val).__name__ not in self.immutable_types:
-                    self.variables_info[rhs_variable].references.append(
-                        lhs_variable)
-                    if lhs_variable not in self.variables_info:
-                        self.variables_info[lhs_variable] = VariableMetaData(
-                            location.start_line, type(new_val).__name__)
-                    self.variables_info[lhs_variable].references.append(
-                        rhs_variable)
+            reference = (None, None)
+            if (property_name is None) and (index is None):
+                reference = self.reference_variable(dyn_ast, iid)
+            self.record_write(self.node(dyn_ast, location.start_line), variable_name, property_name, index,
+                              type(new_val).__name__, reference)
 
     def augmented_assignment(self, dyn_ast: str, iid: int, left: Any, op: str, right: Any) -> Any:
         """Hook for any augmented assignment. Here we update our meta-data which helps us to compute the slice.
@@ -291,77 +430,18 @@ class Slice(BaseAnalysis):
         Any
             If provided, overwrites the result.
         """
-        if self.can_run_analysis(dyn_ast, iid) == False:
+        if self.start_analysis == False or self.can_run_analysis(dyn_ast, iid) == False:
             return
         location = self.iid_to_location(dyn_ast, iid)
+        table = self.get_bytecode_table(dyn_ast)
+        span = tuple(location[1:])
+        if table is not None:
+            for variable_name, property_name, index in self.bytecode_stores(table, span):
+                self.record_augmented_assignment(self.node(dyn_ast, location.start_line), variable_name, property_name, index)
+            return
         variable_name, property_name, index = self.extract_lhs(dyn_ast, iid)
         if (variable_name is not None):
-            if (property_name is not None):
-                if (variable_name not in self.variables_info):
-                    raise "ERROR"
-                self.variables_info[variable_name].attributes.update(
-                    {property_name: AttributeMetaData(location.start_line)})
-                dependencies: List[int] = []
-                for cf in self.control_flow_stack:
-                    dependencies.append(cf.start_line)
-                dependencies.append(
-                    self.variables_info[variable_name].active_definition)
-                if (f"{variable_name}.{property_name}" in self.variables_info):
-                    dependencies.append(
-                        self.variables_info[f"{variable_name}.{property_name}"].active_definition)
-                if location.start_line in self.lines_info:
-                    self.lines_info.get(
-                        location.start_line).dependencies += list(set(dependencies))
-                    self.lines_info.get(location.start_line).dependencies = list(
-                        set(self.lines_info.get(location.start_line).dependencies))
-                else:
-                    self.lines_info[location.start_line] = LineMetaData(
-                        list(set(dependencies)))
-            elif (index is not None):
-                if (variable_name not in self.variables_info):
-                    raise "ERROR"
-                self.variables_info[variable_name].elements.update(
-                    {index: ElementMetaData(location.start_line)})
-                dependencies: List[int] = []
-                for cf in self.control_flow_stack:
-                    dependencies.append(cf.start_line)
-                dependencies.append(
-                    self.variables_info[variable_name].active_definition)
-                if (index in self.variables_info):
-                    dependencies.append(
-                        self.variables_info[index].active_definition)
-                if location.start_line in self.lines_info:
-                    self.lines_info.get(
-                        location.start_line).dependencies += list(set(dependencies))
-                    self.lines_info.get(location.start_line).dependencies = list(
-                        set(self.lines_info.get(location.start_line).dependencies))
-                else:
-                    self.lines_info[location.start_line] = LineMetaData(
-                        list(set(dependencies)))
-            else:
-                dependencies: List[int] = []
-                for cf in self.control_flow_stack:
-                    dependencies.append(cf.start_line)
-                if (variable_name in self.variables_info):
-                    dependencies.append(
-                        self.variables_info[variable_name].previous_definition)
-                    self.variables_info[variable_name].previous_definition = \
-                        self.variables_info[variable_name].active_definition
-                    self.variables_info[variable_name].active_definition = \
-                        location.start_line
-                else:
-                    self.variables_info[variable_name] = VariableMetaData(
-                        location.start_line, None)
-                    dependencies.append(location.start_line)
-
-                if location.start_line in self.lines_info:
-                    self.lines_info.get(
-                        location.start_line).dependencies += list(set(dependencies))
-                    self.lines_info.get(location.start_line).dependencies = list(
-                        set(self.lines_info.get(location.start_line).dependencies))
-                else:
-                    self.lines_info[location.start_line] = LineMetaData(
-                        list(set(dependencies)))
+            self.record_augmented_assignment(self.node(dyn_ast, location.start_line), variable_name, property_name, index)
 
     def read_attribute(self, dyn_ast: str, iid: int, base: Any, name: str, val: Any) -> Any:
         """Hook for reading an object attribute. Here we update our meta-data which helps us to compute the slice.
@@ -391,42 +471,21 @@ class Slice(BaseAnalysis):
         Any
             If provided, overwrites the returned value.
         """
-        if self.can_run_analysis(dyn_ast, iid) == False:
+        if self.start_analysis == False or self.can_run_analysis(dyn_ast, iid) == False:
             return
         location = self.iid_to_location(dyn_ast, iid)
+        table = self.get_bytecode_table(dyn_ast)
+        span = tuple(location[1:])
+        if table is not None and span in table.attribute_loads:
+            variable_name, attribute_name = table.attribute_loads[span]
+            if variable_name is not None and '.' not in variable_name:
+                self.record_attribute_read(self.node(dyn_ast, location.start_line), variable_name, attribute_name,
+                                           type(val).__name__ == "method")
+            return
         node = get_node_by_location(self._get_ast(dyn_ast)[0], location)
         if isinstance(node, cst.Attribute) and isinstance(node.value, cst.Name) and isinstance(node.attr, cst.Name):
-            variable_name = node.value.value
-            attribute_name = node.attr.value
-            if (attribute_name in self.collections_modifiers_attributes) or (type(val).__name__ == "method"):
-                previous_definition = self.variables_info[variable_name].active_definition
-                self.variables_info[variable_name].previous_definition = previous_definition
-                self.variables_info[variable_name].active_definition = location.start_line
-                for reference in self.variables_info[variable_name].references:
-                    previous_definition = self.variables_info[reference].active_definition
-                    self.variables_info[reference].previous_definition = previous_definition
-                    self.variables_info[reference].active_definition = location.start_line
-            dependencies: List[int] = []
-            for cf in self.control_flow_stack:
-                dependencies.append(cf.start_line)
-
-            dependencies.append(
-                self.variables_info[variable_name].active_definition)
-            if (attribute_name in self.variables_info[variable_name].attributes):
-                dependencies.append(
-                    self.variables_info[variable_name].attributes[attribute_name].active_definition)
-            for reference in self.variables_info[variable_name].references:
-                dependencies.append(
-                    self.variables_info[reference].previous_definition)
-
-            if location.start_line in self.lines_info:
-                self.lines_info.get(
-                    location.start_line).dependencies += list(set(dependencies))
-                self.lines_info.get(location.start_line).dependencies = list(
-                    set(self.lines_info.get(location.start_line).dependencies))
-            else:
-                self.lines_info[location.start_line] = LineMetaData(
-                    list(set(dependencies)))
+            self.record_attribute_read(self.node(dyn_ast, location.start_line), node.value.value, node.attr.value,
+                                       type(val).__name__ == "method")
 
     def read_subscript(self, dyn_ast: str, iid: int, base: Any, sl: List[Union[int, Tuple]], val: Any) -> Any:
         """Hook for reading a subscript, also known as a slice. Here we update our meta-data which helps us to compute the slice.
@@ -456,37 +515,26 @@ class Slice(BaseAnalysis):
         Any
             If provided, overwrites the returned value.
         """
-        if self.can_run_analysis(dyn_ast, iid) == False:
+        if self.start_analysis == False or self.can_run_analysis(dyn_ast, iid) == False:
             return
         location = self.iid_to_location(dyn_ast, iid)
+        table = self.get_bytecode_table(dyn_ast)
+        span = tuple(location[1:])
+        if table is not None and span in table.subscript_loads:
+            variable_name, _ = table.subscript_loads[span]
+            if variable_name is not None and '.' not in variable_name:
+                self.record_subscript_read(self.node(dyn_ast, location.start_line), variable_name, str(sl[0]))
+            return
         node = get_node_by_location(self._get_ast(dyn_ast)[0], location)
         if isinstance(node, cst.Subscript) and isinstance(node.value, cst.Name):
-            variable_name = node.value.value
-            if (variable_name not in self.variables_info):
-                raise "ERROR"
-            dependencies: List[int] = []
-            for cf in self.control_flow_stack:
-                dependencies.append(cf.start_line)
-            if (self.variables_info[variable_name].elements.get(str(sl[0])) is not None):
-                dependencies.append(
-                    self.variables_info[variable_name].elements[str(sl[0])].active_definition)
-            else:
-                dependencies.append(
-                    self.variables_info[variable_name].active_definition)
-
-            if location.start_line in self.lines_info:
-                self.lines_info.get(
-                    location.start_line).dependencies += list(set(dependencies))
-                self.lines_info.get(location.start_line).dependencies = list(
-                    set(self.lines_info.get(location.start_line).dependencies))
-            else:
-                self.lines_info[location.start_line] = LineMetaData(
-                    list(set(dependencies)))
+            self.record_subscript_read(self.node(dyn_ast, location.start_line), node.value.value, str(sl[0]))
 
     def function_enter(self, dyn_ast: str, iid: int, args: List[Any], name: str, is_lambda: bool) -> None:
         """Hook for when an instrumented function is entered. Here we update our meta-data which helps us to compute the slice.
         This hook is called before enring a function. We check that if thee function name is matched with sliced_function_name, 
-        then we set slice_start_line, slice_end_line and trigger the start_analysis 
+        then we set slice_start_line, slice_end_line and trigger the start_analysis if the sampling policy selects the invocation.
+        An invocation which left with an exception is finished here, see drop_finished_invocations. A function of another
+        code file which is entered during an analyzed invocation is analyzed too, see enter_callee
 
         Parameters
         ----------
@@ -505,39 +553,147 @@ class Slice(BaseAnalysis):
         is_lambda : bool
             Whether the function is a lambda function.
         """
+        if self.analysis_finished:
+            return
+        self.enter_call(dyn_ast, iid, name)
+        if name != self.sliced_function_name:
+            return
+        if self.invocation_depth > 0:
+            self.drop_finished_invocations()
+            if self.analysis_finished:
+                return
+        self.invocation_frames.append(self.invocation_frame())
+        self.invocation_depth += 1
+        if self.invocation_depth > 1:
+            if self.start_analysis == True:
+                self.enter_function(dyn_ast, iid)
+            return
+        self.start_analysis = self.sampling_policy.sample()
+        if self.start_analysis == False:
+            return
+        if self.sampling_policy.keeps_previous() == False:
+            self.lines_info = self.create_store()
+            self.variables_info = self.create_store()
+        self.enter_function(dyn_ast, iid)
+        self.taken_branches = set()
+        self.invocation_start = perf_counter()
+
+    def enter_function(self, dyn_ast: str, iid: int) -> None:
+        """This method starts the analysis of the lines of an invocation of sliced_function_name in its code file. An
+        invocation in another module, e.g. nested in the sliced function, adds the lines and the control dependences
+        of that module
+
+        Parameters
+        ----------
+        dyn_ast : str
+            The path to the original code. Can be used to extract the syntax tree.
+
+        iid : int
+            Unique ID of the function.
+
+        Returns
+        -------
+        None
+        """
         location = self.iid_to_location(dyn_ast, iid)
-        if (name == self.sliced_function_name):
-            self.slice_start_line = location.start_line + 1
-            self.slice_end_line = location.end_line
-            self.start_analysis = True
+        slice_range = (location.start_line + 1, location.end_line)
+        if self.file_id(dyn_ast) == 0:
+            self.slice_start_line, self.slice_end_line = slice_range
+        if self.slice_ranges.get(dyn_ast) == slice_range:
+            return
+        self.slice_ranges[dyn_ast] = slice_range
+        control_dependencies = self.get_control_dependencies(dyn_ast, location.start_line)
+        if len(self.slice_ranges) == 1:
+            self.control_dependencies = control_dependencies
+        else:
+            self.control_dependencies = {**self.control_dependencies, **control_dependencies}
 
-    def end_execution(self) -> None:
-        """Hook for the end of execution. Here we reached end of exuction, so we have to compute slice and create slice.py file
+    def enter_call(self, dyn_ast: str, iid: int, name: str) -> None:
+        """This method remembers the call site of a function of another code file which is entered during an
+        analyzed invocation, and analyzes the function if it is not sliced_function_name
+
+        Parameters
+        ----------
+        dyn_ast : str
+            The path to the original code. Can be used to extract the syntax tree.
+
+        iid : int
+            Unique ID of the function.
+
+        name : str
+            Name of the function called.
+
+        Returns
+        -------
+        None
         """
-        for key, value in self.variables_info.items():
-            print(
-                f"Variables: {key} -- {value.active_definition} -- {value.elements} -- {value.typeOf}")
-        for key, value in self.lines_info.items():
-            print(f"Lines: {key} -- {value.dependencies}")
+        if self.is_callee(dyn_ast) == False:
+            return
+        self.call_sites.append(self.current_node)
+        if name != self.sliced_function_name:
+            self.enter_callee(dyn_ast, iid)
 
-        self.prepare_file_attributes()
+    def exit_call(self, dyn_ast: str) -> None:
+        """This method hands the call site of a function of another code file which exits now to the _return hook
+        which follows
 
-        slice_line_number = self.get_slicing_criterion_line(
-            self.source, self.slicing_comment)
+        Parameters
+        ----------
+        dyn_ast : str
+            The path to the original code.
 
-        lines_to_keep = self.compute_slice(slice_line_number)
+        Returns
+        -------
+        None
+        """
+        self.returned_call_site = None
+        if self.is_callee(dyn_ast) and len(self.call_sites) > 0:
+            self.returned_call_site = self.call_sites.pop()
+
+    def enter_callee(self, dyn_ast: str, iid: int) -> None:
+        """This method starts the analysis of the lines of a function of another code file, which is called during
+        an analyzed invocation, e.g. a helper of another module. Its lines and its control dependences are added once
+
+        Parameters
+        ----------
+        dyn_ast : str
+            The path to the original code. Can be used to extract the syntax tree.
 
-        print(f"Number To Keep = {lines_to_keep}")
-        print(
-            f"Slice Min, Max = {self.slice_start_line}-{self.slice_end_line}")
+        iid : int
+            Unique ID of the function.
 
-        sliced_code = remove_lines(
-            self.source, lines_to_keep, self.slice_start_line, self.slice_end_line)
+        Returns
+        -------
+        None
+        """
+        location = self.iid_to_location(dyn_ast, iid)
+        callee_range = (location.start_line + 1, location.end_line)
+        callee_ranges = self.callee_ranges.setdefault(dyn_ast, set())
+        if callee_range in callee_ranges:
+            return
+        callee_ranges.add(callee_range)
+        self.control_dependencies = {**self.control_dependencies,
+                                     **self.get_control_dependencies(dyn_ast, location.start_line)}
 
-        self.create_sliced_file(sliced_code)
+    def is_callee(self, dyn_ast: str) -> bool:
+        """This method checks whether a function of a code file which is entered or exited now is called by an
+        analyzed invocation from another code file than file 0, so that the call site depends on its return
 
-    def enter_if(self, dyn_ast: str, iid: int, cond_value: bool) -> Optional[bool]:
-        """Hook called when entering if. Here we entred a control flow, so we add its iid to our control_flow_stack
+        Parameters
+        ----------
+        dyn_ast : str
+            The path to the original code.
+
+        Returns
+        -------
+        bool
+            True if an invocation is analyzed and the code file is not file 0
+        """
+        return self.start_analysis == True and len(self.files) > 0 and dyn_ast != self.files[0]
+
+    def _return(self, dyn_ast: str, iid: int, function_iid: int, function_name: str, return_val: Any) -> Any:
+        """Hook for a return statement, which is called after function_exit. The call site of a function of another
+        code file depends on the line of its return statement, which depends on the returned variables
 
         Parameters
         ----------
@@ -547,39 +703,159 @@ class Slice(BaseAnalysis):
         iid : int
             Unique ID of the syntax tree node.
 
-        cond_value : bool
-            Whether the condition is true or false.
+        function_iid : int
+            Unique ID of the function.
+
+        function_name : str
+            Name of the function.
+
+        return_val : Any
+            The returned value.
 
         Returns
         -------
-        Optional[bool]
-            If provided, overwrites the condition (which may change the branch outcome).
+        Any
+            If provided, overwrites the returned value.
         """
+        if self.start_analysis == False or self.returned_call_site is None:
+            return
+        call_site, self.returned_call_site = self.returned_call_site, None
         if self.can_run_analysis(dyn_ast, iid) == False:
             return
-        location = self.iid_to_location(dyn_ast, iid)
-        if iid not in self.control_flow_dict:
-            self.control_flow_stack.append(
-                ControlFlowMetaData(location.start_line, iid))
-            self.control_flow_dict[iid] = location.start_line
+        self.record_return(call_site, self.node(dyn_ast, self.iid_to_location(dyn_ast, iid).start_line))
 
-    def exit_if(self, dyn_ast, iid):
-        """Hook for exiting if. Here we remove the iid of the control flow from the stack, and all control flows iids that have been inside this flow
+    def function_exit(self, dyn_ast: str, function_iid: int, name: str, result: Any) -> Any:
+        """Hook for exiting an instrumented function. When the outermost invocation of sliced_function_name returns,
+        we stop the analysis until the next sampled invocation and add its duration to the sampling time budget.
+        Once no later invocation can be selected, the analysis is turned off for the rest of the execution. A function
+        of another code file hands its call site to the _return hook which follows
 
         Parameters
         ----------
         dyn_ast : str
             The path to the original code. Can be used to extract the syntax tree.
 
-        iid : int
-            Unique ID of the syntax tree node.
+        function_iid : int
+            Unique ID of the function.
+
+        name : str
+            Name of the function called.
+
+        result : Any
+            The result of the function.
+
+        Returns
+        -------
+        Any
+            If provided, overwrites the returned value.
         """
-        if self.can_run_analysis(dyn_ast, iid) == False:
+        if self.analysis_finished:
             return
-        self.remove_last_control_flow(iid)
+        self.exit_call(dyn_ast)
+        if (name != self.sliced_function_name) or self.invocation_depth == 0:
+            return
+        if self.invocation_depth > 1:
+            self.drop_finished_invocations()
+        if len(self.invocation_frames) > 0:
+            self.invocation_frames.pop()
+        if self.invocation_depth > 1:
+            self.invocation_depth -= 1
+            return
+        self.finish_invocation()
 
-    def enter_for(self, dyn_ast: str, iid: int, next_value: Any, iterable: Iterable) -> Optional[Any]:
-        """Hook for exiting a for loop. Here we entred a control flow, so we add its iid to our control_flow_stack
+    def finish_invocation(self) -> None:
+        """This method is called when the outermost invocation of sliced_function_name is over, while invocation_depth
+        is still 1. It stops the analysis until the next sampled invocation, adds the duration of the invocation to
+        the sampling time budget, and turns the analysis off for the rest of the execution once no later invocation
+        can be selected
+
+        Returns
+        -------
+        None
+        """
+        if self.start_analysis == True:
+            self.start_analysis = False
+            self.sampling_policy.record(perf_counter() - self.invocation_start)
+        self.invocation_depth = 0
+        self.invocation_frames = list()
+        self.call_sites = list()
+        self.returned_call_site = None
+        self.analysis_finished = self.sampling_policy.finished()
+
+    def invocation_frame(self) -> Optional[FrameType]:
+        """This method finds the frame of the invocation of sliced_function_name which runs the current hook
+
+        Returns
+        -------
+        FrameType
+            The innermost frame of sliced_function_name in the HOOK_FRAMES frames below the hook, None if there is none
+        """
+        frame = sys._getframe(1)
+        for _ in range(HOOK_FRAMES):
+            if frame is None or frame.f_code.co_name == self.sliced_function_name:
+                return frame
+            frame = frame.f_back
+        return None
+
+    def drop_finished_invocations(self) -> None:
+        """dynapyt calls no exit hook when an invocation of sliced_function_name leaves with an exception, so
+        invocation_depth may count invocations which are over. This method drops them when the depth matters: when
+        sliced_function_name is entered while an invocation is active, or exited while more than one is. The frame
+        of a function which is not on the stack anymore is over, the frame of a generator or a coroutine may be
+        suspended, so it is kept. If no invocation is left, the outermost one is finished now, and its duration is
+        counted until now
+
+        Returns
+        -------
+        None
+        """
+        stack = set()
+        frame = sys._getframe(1)
+        while frame is not None:
+            stack.add(frame)
+            frame = frame.f_back
+        suspendable = CO_GENERATOR | CO_COROUTINE | CO_ASYNC_GENERATOR | CO_ITERABLE_COROUTINE
+        active = [frame for frame in self.invocation_frames
+                  if frame is None or frame in stack or frame.f_code.co_flags & suspendable]
+        if len(active) == len(self.invocation_frames) or len(active) >= self.invocation_depth:
+            return
+        self.invocation_frames = active
+        self.invocation_depth = max(len(active), 1)
+        if len(active) == 0:
+            self.finish_invocation()
+
+    def end_execution(self) -> None:
+        """Hook for the end of execution. Here we reached end of exuction, so we have to compute slice and create slice.py file.
+        Every other module in which sliced_function_name was analyzed may have its own slicing criterion, and every module
+        which the slices touch gets its sliced file
+        """
+        self.prepare_file_attributes()
+
+        slice_line_number = self.get_slicing_criterion_line(
+            self.source, self.slicing_comment)
+        criteria = [slice_line_number]
+        for file_path in self.slice_ranges:
+            file_id = self.file_id(file_path)
+            if file_id != 0:
+                line_number = self.get_slicing_criterion_line(self.file_source(file_path), self.slicing_comment)
+                if line_number != -1:
+                    criteria.append(node_id(file_id, line_number))
+
+        slices = self.query_slices(criteria)
+        lines_to_keep = sorted(set(node for lines in slices.values() for node in lines))
+
+        for file_id, sliced_code in self.sliced_files(lines_to_keep).items():
+            self.create_sliced_file(sliced_code, file_id)
+
+        if self.statistics is not None:
+            self.statistics.write(self, slices)
+        if self.profile is not None:
+            self.profile.write(self)
+        if self.memory is not None:
+            self.memory.write(self)
+
+    def enter_if(self, dyn_ast: str, iid: int, cond_value: bool) -> Optional[bool]:
+        """Hook called when entering if. Here we record that the branch was taken
 
         Parameters
         ----------
@@ -588,17 +864,23 @@ class Slice(BaseAnalysis):
 
         iid : int
             Unique ID of the syntax tree node.
+
+        cond_value : bool
+            Whether the condition is true or false.
+
+        Returns
+        -------
+        Optional[bool]
+            If provided, overwrites the condition (which may change the branch outcome).
         """
-        if self.can_run_analysis(dyn_ast, iid) == False:
+        if self.start_analysis == False or self.can_run_analysis(dyn_ast, iid) == False:
             return
-        location = self.iid_to_location(dyn_ast, iid)
-        if iid not in self.control_flow_dict:
-            self.control_flow_stack.append(
-                ControlFlowMetaData(location.start_line, iid))
-            self.control_flow_dict[iid] = location.start_line
+        key = (dyn_ast, iid)
+        if key not in self.taken_branches:
+            self.record_branch(key, self.node(dyn_ast, self.iid_to_location(dyn_ast, iid).start_line))
 
-    def exit_for(self, dyn_ast, iid):
-        """Hook for exiting a for loop. Here we remove the iid of the control flow from the stack, and all control flows iids that have been inside this flow
+    def enter_for(self, dyn_ast: str, iid: int, next_value: Any, iterable: Iterable) -> Optional[Any]:
+        """Hook for entering the next iteration of a for loop. Here we record that the branch was taken
 
         Parameters
         ----------
@@ -608,12 +890,14 @@ class Slice(BaseAnalysis):
         iid : int
             Unique ID of the syntax tree node.
         """
-        if self.can_run_analysis(dyn_ast, iid) == False:
+        if self.start_analysis == False or self.can_run_analysis(dyn_ast, iid) == False:
             return
-        self.remove_last_control_flow(iid)
+        key = (dyn_ast, iid)
+        if key not in self.taken_branches:
+            self.record_branch(key, self.node(dyn_ast, self.iid_to_location(dyn_ast, iid).start_line))
 
     def enter_while(self, dyn_ast: str, iid: int, cond_value: bool) -> Optional[bool]:
-        """Hook for entering the next iteration of a while loop. Here we entred a control flow, so we add its iid to our control_flow_stack
+        """Hook for entering the next iteration of a while loop. Here we record that the branch was taken
 
         Parameters
         ----------
@@ -631,28 +915,406 @@ class Slice(BaseAnalysis):
         bool
             If provided, overwrites the condition.
         """
-        if self.can_run_analysis(dyn_ast, iid) == False:
+        if self.start_analysis == False or self.can_run_analysis(dyn_ast, iid) == False:
             return
-        location = self.iid_to_location(dyn_ast, iid)
-        if iid not in self.control_flow_dict:
-            self.control_flow_stack.append(
-                ControlFlowMetaData(location.start_line, iid))
-            self.control_flow_dict[iid] = location.start_line
+        key = (dyn_ast, iid)
+        if key not in self.taken_branches:
+            self.record_branch(key, self.node(dyn_ast, self.iid_to_location(dyn_ast, iid).start_line))
 
-    def exit_while(self, dyn_ast, iid):
-        """Hook for exiting a while loop. Here we remove the iid of the control flow from the stack, and all control flows iids that have been inside this flow
+    def record_read(self, line_number: int, read_variables: List[str], attribute_name: str) -> None:
+        """This method updates the meta-data for a read of variables. The line depends on the active definitions
+        of the variables, and on the definitions of all their elements and attributes if the whole variable is read
 
         Parameters
         ----------
-        dyn_ast : str
-            The path to the original code. Can be used to extract the syntax tree.
+        line_number: int
+            The line number where the read occurs
 
-        iid : int
-            Unique ID of the syntax tree node.
+        read_variables: List[str]
+            The names of the read variables
+
+        attribute_name: str
+            The name of the attribute if the read is an access to an object's attribute, otherwise None
+
+        Returns
+        -------
+        None
         """
-        if self.can_run_analysis(dyn_ast, iid) == False:
+        dependencies: List[int] = list(
+            self.control_dependencies.get(line_number, []))
+        for variable in read_variables:
+            value = self.variables_info.get(variable)
+            if value is not None:
+                dependencies.append(value.active_definition)
+                if attribute_name is None:
+                    if (len(value.elements) > 0):
+                        for _, line in value.elements.items():
+                            dependencies.append(line.active_definition)
+                    if (len(value.attributes) > 0):
+                        for _, line in value.attributes.items():
+                            dependencies.append(line.active_definition)
+        if line_number in self.lines_info:
+            self.lines_info.get(
+                line_number).dependencies += list(set(dependencies))
+            self.lines_info.get(line_number).dependencies = list(
+                set(self.lines_info.get(line_number).dependencies))
+        else:
+            self.lines_info[line_number] = LineMetaData(
+                list(set(dependencies)))
+
+    def record_write(self, line_number: int, variable_name: str, property_name: str, index: str, type_name: str,
+                     reference: Tuple[str, str]) -> None:
+        """This method updates the meta-data for a write to a variable, to one of its attributes or to one of its elements.
+        A write to an attribute or an element of a variable which was never defined in the analyzed code, e.g. of a
+        module, is skipped
+
+        Parameters
+        ----------
+        line_number: int
+            The line number where the write occurs
+
+        variable_name: str
+            The name of the written variable
+
+        property_name: str
+            The name of the written attribute, None if the write is not to an attribute
+
+        index: str
+            The written index, None if the write is not to an element
+
+        type_name: str
+            The type name of the new value
+
+        reference: Tuple[str, str]
+            The left-hand and right-hand variable names if a variable is assigned to another one, otherwise None, None
+
+        Returns
+        -------
+        None
+        """
+        if (property_name is not None):
+            if (variable_name not in self.variables_info):
+                return
+            for ref in self.variables_info[variable_name].references:
+                if ref in self.variables_info:
+                    self.variables_info[ref].attributes.update(
+                        {property_name: AttributeMetaData(line_number)})
+            self.variables_info[variable_name].attributes.update(
+                {property_name: AttributeMetaData(line_number)})
+            dependencies: List[int] = list(
+                self.control_dependencies.get(line_number, []))
+            dependencies.append(
+                self.variables_info[variable_name].active_definition)
+            if line_number in self.lines_info:
+                self.lines_info.get(
+                    line_number).dependencies += dependencies
+            else:
+                self.lines_info[line_number] = LineMetaData(
+                    dependencies)
+        elif (index is not None):
+            if (variable_name not in self.variables_info):
+                return
+            self.variables_info[variable_name].elements.update(
+                {index: ElementMetaData(line_number)})
+            dependencies: List[int] = list(
+                self.control_dependencies.get(line_number, []))
+            dependencies.append(
+                self.variables_info[variable_name].active_definition)
+            self.variables_info[variable_name].previous_definition = self.variables_info[variable_name].active_definition
+            self.variables_info[variable_name].active_definition = line_number
+            if (index in self.variables_info):
+                dependencies.append(
+                    self.variables_info[index].active_definition)
+            if line_number in self.lines_info:
+                self.lines_info.get(
+                    line_number).dependencies += list(set(dependencies))
+                self.lines_info.get(line_number).dependencies = list(
+                    set(self.lines_info.get(line_number).dependencies))
+            else:
+                self.lines_info[line_number] = LineMetaData(
+                    list(set(dependencies)))
+        else:
+            if (variable_name in self.variables_info):
+                self.variables_info[variable_name].previous_definition = \
+                    self.variables_info[variable_name].active_definition
+                self.variables_info[variable_name].active_definition = \
+                    line_number
+                self.variables_info[variable_name].elements.clear()
+                self.variables_info[variable_name].attributes.clear()
+                self.variables_info[variable_name].references.clear()
+            else:
+                self.variables_info[variable_name] = VariableMetaData(
+                    line_number, type_name)
+            dependencies: List[int] = self.control_dependencies.get(line_number, [])
+            if line_number in self.lines_info:
+                self.lines_info.get(line_number).dependencies = list(
+                    set(self.lines_info.get(line_number).dependencies + dependencies))
+            elif len(dependencies) > 0:
+                self.lines_info[line_number] = LineMetaData(list(dependencies))
+
+            lhs_variable, rhs_variable = reference
+
+            if lhs_variable is not None and rhs_variable in self.variables_info and type_name not in self.immutable_types:
+                self.variables_info[rhs_variable].references.append(
+                    lhs_variable)
+                if lhs_variable not in self.variables_info:
+                    self.variables_info[lhs_variable] = VariableMetaData(
+                        line_number, type_name)
+                self.variables_info[lhs_variable].references.append(
+                    rhs_variable)
+
+    def record_augmented_assignment(self, line_number: int, variable_name: str, property_name: str, index: str) -> None:
+        """This method updates the meta-data for an augmented assignment to a variable, to one of its attributes or
+        to one of its elements. An assignment to an attribute or an element of an unknown variable is skipped
+
+        Parameters
+        ----------
+        line_number: int
+            The line number where the assignment occurs
+
+        variable_name: str
+            The name of the assigned variable
+
+        property_name: str
+            The name of the assigned attribute, None if the assignment is not to an attribute
+
+        index: str
+            The assigned index, None if the assignment is not to an element
+
+        Returns
+        -------
+        None
+        """
+        if (property_name is not None):
+            if (variable_name not in self.variables_info):
+                return
+            self.variables_info[variable_name].attributes.update(
+                {property_name: AttributeMetaData(line_number)})
+            dependencies: List[int] = list(
+                self.control_dependencies.get(line_number, []))
+            dependencies.append(
+                self.variables_info[variable_name].active_definition)
+            if (f"{variable_name}.{property_name}" in self.variables_info):
+                dependencies.append(
+                    self.variables_info[f"{variable_name}.{property_name}"].active_definition)
+            if line_number in self.lines_info:
+                self.lines_info.get(
+                    line_number).dependencies += list(set(dependencies))
+                self.lines_info.get(line_number).dependencies = list(
+                    set(self.lines_info.get(line_number).dependencies))
+            else:
+                self.lines_info[line_number] = LineMetaData(
+                    list(set(dependencies)))
+        elif (index is not None):
+            if (variable_name not in self.variables_info):
+                return
+            self.variables_info[variable_name].elements.update(
+                {index: ElementMetaData(line_number)})
+            dependencies: List[int] = list(
+                self.control_dependencies.get(line_number, []))
+            dependencies.append(
+                self.variables_info[variable_name].active_definition)
+            if (index in self.variables_info):
+                dependencies.append(
+                    self.variables_info[index].active_definition)
+            if line_number in self.lines_info:
+                self.lines_info.get(
+                    line_number).dependencies += list(set(dependencies))
+                self.lines_info.get(line_number).dependencies = list(
+                    set(self.lines_info.get(line_number).dependencies))
+            else:
+                self.lines_info[line_number] = LineMetaData(
+                    list(set(dependencies)))
+        else:
+            dependencies: List[int] = list(
+                self.control_dependencies.get(line_number, []))
+            if (variable_name in self.variables_info):
+                dependencies.append(
+                    self.variables_info[variable_name].previous_definition)
+                self.variables_info[variable_name].previous_definition = \
+                    self.variables_info[variable_name].active_definition
+                self.variables_info[variable_name].active_definition = \
+                    line_number
+            else:
+                self.variables_info[variable_name] = VariableMetaData(
+                    line_number, None)
+                dependencies.append(line_number)
+
+            if line_number in self.lines_info:
+                self.lines_info.get(
+                    line_number).dependencies += list(set(dependencies))
+                self.lines_info.get(line_number).dependencies = list(
+                    set(self.lines_info.get(line_number).dependencies))
+            else:
+                self.lines_info[line_number] = LineMetaData(
+                    list(set(dependencies)))
+
+    def record_attribute_read(self, line_number: int, variable_name: str, attribute_name: str, is_method: bool) -> None:
+        """This method updates the meta-data for a read of an object's attribute. Reading a method (or a modifier
+        of a collection) counts as a new definition of the object and of its references. A read of an unknown
+        variable, e.g. of a module or of a global, is skipped
+
+        Parameters
+        ----------
+        line_number: int
+            The line number where the read occurs
+
+        variable_name: str
+            The name of the object
+
+        attribute_name: str
+            The name of the attribute
+
+        is_method: bool
+            Whether the read value is a method
+
+        Returns
+        -------
+        None
+        """
+        if (variable_name not in self.variables_info):
+            return
+        if (attribute_name in self.collections_modifiers_attributes) or is_method:
+            previous_definition = self.variables_info[variable_name].active_definition
+            self.variables_info[variable_name].previous_definition = previous_definition
+            self.variables_info[variable_name].active_definition = line_number
+            for reference in self.variables_info[variable_name].references:
+                previous_definition = self.variables_info[reference].active_definition
+                self.variables_info[reference].previous_definition = previous_definition
+                self.variables_info[reference].active_definition = line_number
+        dependencies: List[int] = list(
+            self.control_dependencies.get(line_number, []))
+
+        dependencies.append(
+            self.variables_info[variable_name].active_definition)
+        if (attribute_name in self.variables_info[variable_name].attributes):
+            dependencies.append(
+                self.variables_info[variable_name].attributes[attribute_name].active_definition)
+        for reference in self.variables_info[variable_name].references:
+            dependencies.append(
+                self.variables_info[reference].previous_definition)
+
+        if line_number in self.lines_info:
+            self.lines_info.get(
+                line_number).dependencies += list(set(dependencies))
+            self.lines_info.get(line_number).dependencies = list(
+                set(self.lines_info.get(line_number).dependencies))
+        else:
+            self.lines_info[line_number] = LineMetaData(
+                list(set(dependencies)))
+
+    def record_subscript_read(self, line_number: int, variable_name: str, key: str) -> None:
+        """This method updates the meta-data for a read of an element. The line depends on the definition of the
+        element if it is known, otherwise on the definition of the whole variable. A read of an unknown variable is
+        skipped
+
+        Parameters
+        ----------
+        line_number: int
+            The line number where the read occurs
+
+        variable_name: str
+            The name of the variable
+
+        key: str
+            The accessed index
+
+        Returns
+        -------
+        None
+        """
+        if (variable_name not in self.variables_info):
             return
-        self.remove_last_control_flow(iid)
+        dependencies: List[int] = list(
+            self.control_dependencies.get(line_number, []))
+        if (self.variables_info[variable_name].elements.get(key) is not None):
+            dependencies.append(
+                self.variables_info[variable_name].elements[key].active_definition)
+        else:
+            dependencies.append(
+                self.variables_info[variable_name].active_definition)
+
+        if line_number in self.lines_info:
+            self.lines_info.get(
+                line_number).dependencies += list(set(dependencies))
+            self.lines_info.get(line_number).dependencies = list(
+                set(self.lines_info.get(line_number).dependencies))
+        else:
+            self.lines_info[line_number] = LineMetaData(
+                list(set(dependencies)))
+
+    def record_return(self, call_site: int, line_number: int) -> None:
+        """This method updates the meta-data for a return of a function of another code file: the call site
+        depends on the return statement
+
+        Parameters
+        ----------
+        call_site: int
+            The node of the call
+
+        line_number: int
+            The node of the return statement
+
+        Returns
+        -------
+        None
+        """
+        if call_site in self.lines_info:
+            self.lines_info.get(call_site).dependencies = list(
+                set(self.lines_info.get(call_site).dependencies + [line_number]))
+        else:
+            self.lines_info[call_site] = LineMetaData([line_number])
+
+    def get_bytecode_table(self, dyn_ast: str) -> Optional[BytecodeTable]:
+        """This method returns the BytecodeTable of a code file, which is built on its first use
+
+        Parameters
+        ----------
+        dyn_ast : str
+            The path to the original code.
+
+        Returns
+        -------
+        BytecodeTable
+            The table of the code file, None if the interpreter has no instruction positions (before Python 3.11)
+            or the code file can not be compiled
+        """
+        if BYTECODE_POSITIONS_AVAILABLE == False:
+            return None
+        if dyn_ast not in self.bytecode_tables:
+            syntax_tree = self._get_ast(dyn_ast)
+            try:
+                self.bytecode_tables[dyn_ast] = None if syntax_tree is None else \
+                    BytecodeTable.from_source(syntax_tree[0].code, dyn_ast)
+            except (SyntaxError, ValueError):
+                self.bytecode_tables[dyn_ast] = None
+        return self.bytecode_tables[dyn_ast]
+
+    def bytecode_stores(self, table: BytecodeTable, span: Tuple[int, int, int, int]) -> List[Tuple[str, str, str]]:
+        """This method returns the targets of an assignment that the meta-data tracks: variables, and attributes
+        and elements of variables. Attributes of self are left out, like in extract_lhs
+
+        Parameters
+        ----------
+        table : BytecodeTable
+            The table of the code file
+
+        span : Tuple[int, int, int, int]
+            The location of the assignment
+
+        Returns
+        -------
+        List[Tuple[str, str, str]]
+            The variable name, attribute name and index of every target, in order
+        """
+        targets: List[Tuple[str, str, str]] = []
+        for variable_name, property_name, index in table.stores_of(span):
+            if variable_name is None or '.' in variable_name:
+                continue
+            if property_name is not None and variable_name == 'self':
+                continue
+            targets.append((variable_name, property_name, index))
+        return targets
 
     def reference_variable(self, dyn_ast: str, iid: int) -> (str, str):
         """We check whether an read-hook is via object's attribute
@@ -672,12 +1334,7 @@ class Slice(BaseAnalysis):
         """
         location = self.iid_to_location(dyn_ast, iid)
         node = get_node_by_location(self._get_ast(dyn_ast)[0], location)
-        if isinstance(node, cst.Assign):
-            if isinstance(node.targets[0], cst.AssignTarget):
-                if isinstance(node.targets[0].target, cst.Name) and \
-                        isinstance(node.value, cst.Name):
-                    return node.targets[0].target.value, node.value.value
-        return None, None
+        return assignment_reference(node)
 
     def extract_variables(self, dyn_ast: str, iid: int) -> List[str]:
         """We extract a list of variables which were used on the left-hand side
@@ -727,32 +1384,7 @@ class Slice(BaseAnalysis):
         """
         location = self.iid_to_location(dyn_ast, iid)
         node = get_node_by_location(self._get_ast(dyn_ast)[0], location)
-        if (not isinstance(node, cst.Assign)) and (not isinstance(node, cst.AugAssign)):
-            return None, None, None
-        elif isinstance(node, cst.AugAssign):
-            if isinstance(node.target, cst.Name):
-                return node.target.value, None, None
-            elif isinstance(node.target, cst.Subscript):
-                return node.target.value.value, None, self.extract_subscript(node.target.slice[0])
-            elif isinstance(node.target, cst.Attribute):
-                if isinstance(node.target.value, cst.Name) and (node.target.attr, cst.Name):
-                    return node.target.value.value, node.target.attr.value, None
-        elif not isinstance(node.targets[0], cst.AssignTarget):
-            return None, None, None
-        elif isinstance(node.targets[0].target, cst.Name):
-            return node.targets[0].target.value, None, None
-        elif isinstance(node.targets[0].target, cst.Attribute):
-            if (isinstance(node.targets[0].target.value, cst.Name) and
-                    node.targets[0].target.value.value == 'self'):
-                return None, None, None
-            elif (isinstance(node.targets[0].target.value, cst.Name) and
-                  isinstance(node.targets[0].target.attr, cst.Name)):
-                return node.targets[0].target.value.value, node.targets[0].target.attr.value, None
-            else:
-                return node.targets[0].target.value, node.targets[0].target.attr, None
-        elif isinstance(node.targets[0].target, cst.Subscript):
-            return node.targets[0].target.value.value, None, self.extract_subscript(node.targets[0].target.slice[0])
-        return None, None, None
+        return assignment_target(node)
 
     def extract_subscript(self, node: cst.SubscriptElement) -> str:
         """We extract subscript of an Index-access
@@ -770,18 +1402,7 @@ class Slice(BaseAnalysis):
         str
             The accessed index, if applicable, otherwise None
         """
-        if not isinstance(node.slice, cst.Index):
-            return None
-
-        if isinstance(node.slice.value, cst.Integer):
-            return str(node.slice.value.value)
-        elif isinstance(node.slice.value, cst.Name):
-            return node.slice.value.value
-        elif isinstance(node.slice.value, cst.UnaryOperation) and \
-            isinstance(node.slice.value.operator, cst.Minus) and \
-                isinstance(node.slice.value.expression, cst.Integer) \
-            and node.slice.value.expression.value == '1':
-            return '-1'
+        return subscript_index(node)
 
     def read_is_via_attribute(self, dyn_ast: str, iid: int) -> (str, str):
         """Here we check whether a read is an access to object's attribute
@@ -799,8 +1420,7 @@ class Slice(BaseAnalysis):
         (str, str)
             A tuple consisting of object's name and its attribute, otherwise None
         """
-        self.prepare_file_attributes()
-        if iid + 1 not in self.iids:
+        if iid + 1 not in self._get_ast(dyn_ast)[1].iid_to_location:
             return None, None
         current_location = self.iid_to_location(dyn_ast, iid)
         next_location = self.iid_to_location(dyn_ast, iid + 1)
@@ -810,7 +1430,9 @@ class Slice(BaseAnalysis):
             return None, None
         elif current_location.end_column > next_location.end_column:
             return None, None
-        lines = self.source.split('\n')
+        if dyn_ast not in self.file_lines:
+            self.file_lines[dyn_ast] = self.file_source(dyn_ast).split('\n')
+        lines = self.file_lines[dyn_ast]
         expression = lines[current_location.start_line -
                            1][next_location.start_column:next_location.end_column]
         node = cst.parse_statement(expression)
@@ -835,6 +1457,8 @@ class Slice(BaseAnalysis):
         List[int]
             A list of line numbers that should be kept
         """
+        if self.reachability_index is not None:
+            return self.reachability_index.slice(slice_line_number)
         result: List[int] = list()
         result.append(slice_line_number)
         if (slice_line_number in self.lines_info):
@@ -844,28 +1468,104 @@ class Slice(BaseAnalysis):
                     self.lines_info[slice_line_number].dependencies
                 for item in self.lines_info[slice_line_number].dependencies:
                     result = result + self.compute_slice(item)
-        return list(set(result))
+        return [line for line in set(result) if line >= 0]
+
+    def sliced_files(self, lines_to_keep: List[int]) -> Dict[int, str]:
+        """This method removes the lines which are not in a slice from every code file which the slice touches
+
+        Parameters
+        ----------
+        lines_to_keep: List[int]
+            The nodes of the slice
+
+        Returns
+        -------
+        Dict[int, str]
+            A dictionary which maps the file id of the code file of the sliced function, and of every other code file
+            which has a line in the slice, to its sliced code
+        """
+        lines_by_file: Dict[int, List[int]] = {0: []}
+        for node in lines_to_keep:
+            file_id, line_number = node_location(node)
+            lines_by_file.setdefault(file_id, []).append(line_number)
+        sliced_files: Dict[int, str] = dict()
+        for file_id, lines in lines_by_file.items():
+            if file_id == 0:
+                sliced_files[file_id] = remove_lines(self.source, lines, self.slice_start_line, self.slice_end_line)
+            elif 0 < file_id < len(self.files):
+                sliced_code = self.sliced_module(self.files[file_id], lines)
+                if sliced_code is not None:
+                    sliced_files[file_id] = sliced_code
+        return sliced_files
+
+    def sliced_module(self, file_path: str, lines_to_keep: List[int]) -> Optional[str]:
+        """This method removes the analyzed lines which are not in a slice from a code file other than file 0. The
+        lines outside slice_ranges and callee_ranges are kept
+
+        Parameters
+        ----------
+        file_path: str
+            The path to the original code
+
+        lines_to_keep: List[int]
+            The line numbers of the slice in the code file
+
+        Returns
+        -------
+        Optional[str]
+            The sliced code, None if no line of the code file was analyzed
+        """
+        analyzed_ranges = list(self.callee_ranges.get(file_path, set()))
+        if file_path in self.slice_ranges:
+            analyzed_ranges.append(self.slice_ranges[file_path])
+        if len(analyzed_ranges) == 0:
+            return None
+        source = self.file_source(file_path)
+        line_count = source.count("\n") + 1
+        lines_to_keep = lines_to_keep + [line_number for line_number in range(1, line_count + 1)
+                                         if all(line_number < start_line or line_number > end_line
+                                                for start_line, end_line in analyzed_ranges)]
+        return remove_lines(source, lines_to_keep, 1, line_count)
 
-    def create_sliced_file(self, sliced_code: str) -> None:
-        """This method creates the slice.py file
+    def create_sliced_file(self, sliced_code: str, file_id: int = 0) -> None:
+        """This method creates the slice.py file, or sliced_<module>.py for another code file
 
         Parameters
         ----------
         sliced_code: str
             Sliced Python code that should be written inside sliced.py file
 
+        file_id: int
+            The code file which was sliced
+
         Returns
         -------
         None
         """
-        slice_path: str = ""
-        directory, file_name_extension = path.split(self.source_path)
-        _, extension = path.splitext(file_name_extension)
-        if extension == ".orig":
-            slice_path = path.join(directory, "sliced.py")
-        with open(slice_path, 'w') as file:
+        with open(self.sliced_file_path(file_id), 'w') as file:
             file.write(sliced_code)
 
+    def sliced_file_path(self, file_id: int = 0) -> str:
+        """This method returns the path of the sliced file of a code file: sliced.py next to the code file of the
+        sliced function, sliced_<module>.py next to another code file
+
+        Parameters
+        ----------
+        file_id: int
+            The code file which was sliced
+
+        Returns
+        -------
+        str
+            The path of the sliced file
+        """
+        if file_id == 0:
+            directory, _ = path.split(self.source_path)
+            return path.join(directory, "sliced.py")
+        directory, file_name = path.split(self.files[file_id])
+        module_name = file_name.split(".")[0]
+        return path.join(directory, f"sliced_{module_name}.py")
+
     def get_slicing_criterion_line(self, code: str, comment: str) -> int:
         """This method finds the line number that contains a specific comment
 
@@ -887,32 +1587,74 @@ class Slice(BaseAnalysis):
         _ = wrapper.visit(comment_finder)
         return comment_finder.line_number
 
-    def remove_last_control_flow(self, iid: int) -> None:
-        """This method removes a specific control flow's iid from the control_flow_stack and control_flow_dict.
-        It also removes all iids that are inside that control flow
+    def get_control_dependencies(self, dyn_ast: str, function_line: int) -> Dict[int, List[int]]:
+        """This method returns the static control dependences of the function which starts at function_line.
+        They are computed once per function from the syntax tree, with post-dominators
+
+        Parameters
+        ----------
+        dyn_ast : str
+            The path to the original code. Can be used to extract the syntax tree.
+
+        function_line: int
+            The line number of the `def` keyword of the function
+
+        Returns
+        -------
+        Dict[int, List[int]]
+            A dictionary which maps every node of the function to the nodes of the headers of the branches it
+            depends on
+        """
+        key = (dyn_ast, function_line)
+        if key not in self.control_dependence_cache:
+            file_id = self.file_id(dyn_ast)
+            self.control_dependence_cache[key] = {
+                node_id(file_id, line_number): [node_id(file_id, header) for header in headers]
+                for line_number, headers in compute_control_dependencies(self._get_ast(dyn_ast)[0],
+                                                                         function_line).items()}
+        return self.control_dependence_cache[key]
+
+    def record_branch(self, key: Tuple, line_number: int) -> None:
+        """This method records that a branch was taken. The first time, we add the control dependences of its
+        header line to lines_info, so that the slice of a nested branch also keeps the enclosing branches
 
         Parameters
         ----------
-        iid: int
-            IID of the control flow
+        key: Tuple
+            The code file and the IID of the control flow, or the span of its node when it is monitored or a
+            recorded path is replayed
+
+        line_number: int
+            The node of the header of the control flow
 
         Returns
         -------
         None
         """
-        if iid not in self.control_flow_dict:
-            return None
+        self.taken_branches.add(key)
+        self.record_header(line_number)
 
-        while True:
-            current = self.control_flow_stack.pop()
-            self.control_flow_dict.pop(current.iid)
-            if current.iid == iid:
-                break
-            else:
-                continue
+    def record_header(self, line_number: int) -> None:
+        """This method adds the control dependences of the header line of a taken branch to lines_info
+
+        Parameters
+        ----------
+        line_number: int
+            The node of the header of the control flow
+
+        Returns
+        -------
+        None
+        """
+        dependencies: List[int] = self.control_dependencies.get(line_number, [])
+        if line_number in self.lines_info:
+            self.lines_info.get(line_number).dependencies = list(
+                set(self.lines_info.get(line_number).dependencies + dependencies))
+        else:
+            self.lines_info[line_number] = LineMetaData(list(dependencies))
 
     def prepare_file_attributes(self):
-        """This method prepares source_path, source and iids after the execution 
+        """This method prepares source_path and source after the execution
 
         Parameters
         ----------
@@ -922,15 +1664,129 @@ class Slice(BaseAnalysis):
         -------
         None
         """
-        if self.source_path == "":
+        if self.source_path == "" and len(self.files) > 0:
+            self.source_path = self.files[0]
+        elif self.source_path == "":
             self.source_path = next(iter(self.asts))
 
         if self.source == "":
-            with open(self.source_path, "r") as file:
-                self.source = file.read()
+            self.source = self.file_source(self.source_path)
 
-        if self.iids is None:
-            self.iids = IIDs(self.source_path).iid_to_location
+    def create_store(self) -> MutableMapping:
+        """This method creates an empty lines_info or variables_info
+
+        Returns
+        -------
+        MutableMapping
+            A SpillStore which keeps spill_limit records in memory, or a dictionary if spill_limit is None
+        """
+        if self.spill_limit is None:
+            return dict()
+        return SpillStore(self.spill_limit, self.spill_directory)
+
+    def file_id(self, dyn_ast: str) -> int:
+        """This method returns the id of a code file, a new one the first time
+
+        Parameters
+        ----------
+        dyn_ast : str
+            The path to the original code
+
+        Returns
+        -------
+        int
+            The file id
+        """
+        file_id = self.file_ids.get(dyn_ast)
+        if file_id is None:
+            file_id = len(self.files)
+            self.file_ids[dyn_ast] = file_id
+            self.files.append(dyn_ast)
+        return file_id
+
+    def node(self, dyn_ast: str, line_number: int) -> int:
+        """This method returns the node of a line of a code file in the dependence graph
+
+        Parameters
+        ----------
+        dyn_ast : str
+            The path to the original code
+
+        line_number : int
+            The line number
+
+        Returns
+        -------
+        int
+            The node
+        """
+        file_id = self.file_ids.get(dyn_ast)
+        if file_id is None:
+            file_id = self.file_id(dyn_ast)
+        return node_id(file_id, line_number)
+
+    def file_source(self, filepath: str) -> str:
+        """This method returns the source of a code file, from its syntax tree if it is cached
+
+        Parameters
+        ----------
+        filepath : str
+            The path to the original code
+
+        Returns
+        -------
+        str
+            The source
+        """
+        if filepath in self.asts:
+            return self.asts[filepath][0].code
+        with open(filepath, "r") as file:
+            return file.read()
+
+    def _get_ast(self, filepath: str) -> Tuple[cst.Module, IIDs]:
+        """This method returns the syntax tree and the IIDs of a code file. Unlike BaseAnalysis, a cached entry is
+        returned even if the file does not exist, which is the case when the code was instrumented in memory
+
+        Parameters
+        ----------
+        filepath : str
+            The path to the original code
+
+        Returns
+        -------
+        Tuple[cst.Module, IIDs]
+            The syntax tree and the IIDs, None if the file is not known
+        """
+        if filepath in self.asts:
+            return self.asts[filepath]
+        if path.exists(filepath) == False:
+            return None
+        with open(filepath, "r") as file:
+            entry = (cst.parse_module(file.read()), IIDs(filepath))
+        self.asts.load(filepath, entry)
+        return entry
+
+    def iid_to_location(self, filepath: str, iid: int) -> Location:
+        """This method returns the location of an iid from the cached IIDs of the code file, instead of reading its
+        IID file again on every call
+
+        Parameters
+        ----------
+        filepath : str
+            The path to the original code
+
+        iid : int
+            Unique ID of the syntax tree node.
+
+        Returns
+        -------
+        Location
+            The location of the node
+        """
+        entry = self._get_ast(filepath)
+        if entry is not None and entry[1] is not None:
+            return entry[1].iid_to_location[iid]
+        return super(Slice, self).iid_to_location(filepath, iid)
 
     def can_run_analysis(self, dyn_ast: str, iid: int) -> bool:
         """This method checks whether we can run analysis inside current node.
@@ -946,13 +1802,20 @@ class Slice(BaseAnalysis):
         Returns
         -------
         bool
-            A boolean which indicates whether we are in a line (node) that could be analized for sliciing
+            A boolean which indicates whether we are in a line (node) that could be analized for sliciing, whose
+            node is current_node then
         """
         if self.start_analysis == False:
             return False
-        location = self.iid_to_location(dyn_ast, iid)
-        if (location.start_line < self.slice_start_line):
-            return False
-        if (location.start_line > self.slice_end_line):
+        slice_range = self.slice_ranges.get(dyn_ast)
+        callee_ranges = self.callee_ranges.get(dyn_ast)
+        if slice_range is None and callee_ranges is None:
             return False
+        line_number = self.iid_to_location(dyn_ast, iid).start_line
+        if slice_range is None or line_number < slice_range[0] or line_number > slice_range[1]:
+            if callee_ranges is None:
+                return False
+            if any(start_line <= line_number <= end_line for start_line, end_line in callee_ranges) == False:
+                return False
+        self.current_node = self.node(dyn_ast, line_number)
         return True
@@ -1,13 +1,15 @@
 import libcst as cst
 from collections import namedtuple
 from os import path
-from typing import Callable, Dict, List, Any, Union, Tuple
+from typing import Callable, Dict, Iterable, List, Any, Union, Tuple
 from dynapyt.utils.nodeLocator import get_node_by_location
 from dynapyt.analyses.BaseAnalysis import BaseAnalysis
 from dynapyt.instrument.IIDs import IIDs
 from dynamicslicing.utils import AttributeMetaData, LineMetaData, VariableMetaData, CommentFinder, ElementMetaData, remove_lines
+from dynamicslicing.dependence_graph import DependenceGraph, DependenceQueries, ReachabilityIndex
+from dynamicslicing.stats import HookStatistics, LineProfile, MemoryReport
 
-class SliceDataflow(BaseAnalysis):
+class SliceDataflow(DependenceQueries, BaseAnalysis):
     """
     This class runs slicing algorithm on a Python files, with a specified comment pointing to slicing criterion, 
     and creates another Python file named sliced.py with sliced code. This class only covers data flow analysis.
@@ -53,8 +55,23 @@ class SliceDataflow(BaseAnalysis):
     iids: Dict[Location, int]
         A Dictionary that maps every iid to its Location
 
+    reachability_index: ReachabilityIndex
+        An index over lines_info which answers slice queries for any line, built once after the execution
+
+    dependence_graph: DependenceGraph
+        The dependence graph of lines_info with its reverse edges, which answers forward slice and chop queries
+
     start_analysis : bool
         Boolean variable which indicates the slicing computation should start or not
+
+    statistics : HookStatistics
+        Counts and times the hooks when a statistics report is requested, None otherwise
+
+    profile : LineProfile
+        Attributes the time of the hooks to the lines of the program when a profile is requested, None otherwise
+
+    memory : MemoryReport
+        Measures the memory of the analysis when a memory report is requested, None otherwise
     -------
     """
     Location = namedtuple(
@@ -74,23 +91,79 @@ class SliceDataflow(BaseAnalysis):
     source: str = ""
     source_path: str = ""
     iids: Dict[Location, int] = None
+    reachability_index: ReachabilityIndex = None
+    dependence_graph: DependenceGraph = None
     start_analysis = False
+    statistics: HookStatistics = None
+    profile: LineProfile = None
+    memory: MemoryReport = None
 
-    def __init__(self, source_path: str = ""):
+    def __init__(self, source_path: str = "", statistics_path: str = None, profile_path: str = None,
+                 memory_path: str = None):
         """
         Parameters
         ----------
         source_path: str
             The path to the code file to be sliced
+
+        statistics_path: str
+            The path of a JSON report with the calls and time of every hook and the size of the dependence graph,
+            written at the end of the execution. None disables the counting
+
+        profile_path: str
+            The path of collapsed stacks which attribute the time and the events of the hooks to the lines and iids
+            of the program, written at the end of the execution with a line-annotated source (suffix .lines). None
+            disables the profile
+
+        memory_path: str
+            The path of a JSON report with the bytes which every structure of the analysis retains and the peak
+            memory of the run, traced with tracemalloc from now on. None disables the report
         """
         super(SliceDataflow, self).__init__()
+        self.statistics = None
+        if statistics_path is not None:
+            self.statistics = HookStatistics(statistics_path)
+            self.statistics.install(self)
+        self.profile = None
+        if profile_path is not None:
+            self.profile = LineProfile(profile_path)
+            self.profile.install(self)
+        self.memory = None
+        if memory_path is not None:
+            self.memory = MemoryReport(memory_path)
+            self.memory.start()
+        self.reset(source_path)
+
+    def reset(self, source_path: str = "") -> None:
+        """This method forgets everything that was recorded about the previous run, so that the same instance can
+        analyze another run without being created again. The syntax trees and IIDs in asts stay cached, they are
+        keyed by the path of their code file
+
+        Parameters
+        ----------
+        source_path: str
+            The path to the code file to be sliced in the next run
+
+        Returns
+        -------
+        None
+        """
         self.source = ""
         self.source_path = source_path
+        self.iids = None
         self.lines_info = dict()
         self.variables_info = dict()
         self.slice_start_line = -1
         self.slice_end_line = -1
+        self.reachability_index = None
+        self.dependence_graph = None
         self.start_analysis = False
+        if self.statistics is not None:
+            self.statistics.clear()
+        if self.profile is not None:
+            self.profile.clear()
+        if self.memory is not None:
+            self.memory.clear()
 
     def read(self, dyn_ast: str, iid: int, val: Any) -> Any:
         """Hook for reading an object attribute. Here we update our meta-data which helps us to compute the slice.
@@ -488,27 +561,24 @@ class SliceDataflow(BaseAnalysis):
     def end_execution(self) -> None:
         """Hook for the end of execution. Here we reached end of exuction, so we have to compute slice and create slice.py file
         """
-        for key, value in self.variables_info.items():
-            print(
-                f"Variables: {key} -- {value.active_definition} -- {value.elements} -- {value.typeOf}")
-        for key, value in self.lines_info.items():
-            print(f"Lines: {key} -- {value.dependencies}")
-
         self.prepare_file_attributes()
 
         slice_line_number = self.get_slicing_criterion_line(
             self.source, self.slicing_comment)
 
-        lines_to_keep = self.compute_slice(slice_line_number)
-
-        print(f"Number To Keep = {lines_to_keep}")
-        print(
-            f"Slice Min, Max = {self.slice_start_line}-{self.slice_end_line}")
+        lines_to_keep = self.query_slices([slice_line_number])[slice_line_number]
 
         sliced_code = remove_lines(
             self.source, lines_to_keep, self.slice_start_line, self.slice_end_line)
 
         self.create_sliced_file(sliced_code)
+
+        if self.statistics is not None:
+            self.statistics.write(self, {slice_line_number: lines_to_keep})
+        if self.profile is not None:
+            self.profile.write(self)
+        if self.memory is not None:
+            self.memory.write(self)
         
     def reference_variable(self, dyn_ast: str, iid: int) -> (str, str):
         """We check whether an assignment is an object's attribute
@@ -691,6 +761,8 @@ class SliceDataflow(BaseAnalysis):
         List[int]
             A list of line numbers that should be kept
         """
+        if self.reachability_index is not None:
+            return self.reachability_index.slice(slice_line_number)
         result: List[int] = list()
         result.append(slice_line_number)
         if (slice_line_number in self.lines_info):
@@ -757,13 +829,56 @@ class SliceDataflow(BaseAnalysis):
         if self.source_path == "":
             self.source_path = next(iter(self.asts))
 
-        if self.source == "":
+        if self.source == "" and self.source_path in self.asts:
+            self.source = self.asts[self.source_path][0].code
+        elif self.source == "":
             with open(self.source_path, "r") as file:
                 self.source = file.read()
 
-        if self.iids is None:
+        if self.iids is None and self.source_path in self.asts:
+            self.iids = self.asts[self.source_path][1].iid_to_location
+        elif self.iids is None:
             self.iids = IIDs(self.source_path).iid_to_location
 
+    def _get_ast(self, filepath: str) -> Tuple[cst.Module, IIDs]:
+        """This method returns the syntax tree and the IIDs of a code file. Unlike BaseAnalysis, a cached entry is
+        returned even if the file does not exist, which is the case when the code was instrumented in memory
+
+        Parameters
+        ----------
+        filepath : str
+            The path to the original code
+
+        Returns
+        -------
+        Tuple[cst.Module, IIDs]
+            The syntax tree and the IIDs, None if the file is not known
+        """
+        if filepath in self.asts:
+            return self.asts[filepath]
+        return super(SliceDataflow, self)._get_ast(filepath)
+
+    def iid_to_location(self, filepath: str, iid: int) -> Location:
+        """This method returns the location of an iid from the cached IIDs of the code file, instead of reading its
+        IID file again on every call
+
+        Parameters
+        ----------
+        filepath : str
+            The path to the original code
+
+        iid : int
+            Unique ID of the syntax tree node.
+
+        Returns
+        -------
+        Location
+            The location of the node
+        """
+        if filepath in self.asts and self.asts[filepath][1] is not None:
+            return self.asts[filepath][1].iid_to_location[iid]
+        return super(SliceDataflow, self).iid_to_location(filepath, iid)
+
     def can_run_analysis(self, dyn_ast: str, iid: int) -> bool:
         """This method checks whether we can run analysis inside current node.
 
@@ -0,0 +1,244 @@
+import os
+import pickle
+import sqlite3
+import tempfile
+from collections import OrderedDict
+from collections.abc import ItemsView, ValuesView
+from itertools import chain
+from multiprocessing.util import Finalize
+from typing import Any, Hashable, Iterator, MutableMapping, Optional, Set, Tuple
+
+
+class SpillItems(ItemsView):
+    """
+    This class is the items view of a SpillStore, which reads the spilled records without faulting them in
+    -------
+    """
+
+    def __iter__(self) -> Iterator[Tuple[Hashable, Any]]:
+        return self._mapping.stream()
+
+
+class SpillValues(ValuesView):
+    """
+    This class is the values view of a SpillStore, which reads the spilled records without faulting them in
+    -------
+    """
+
+    def __iter__(self) -> Iterator[Any]:
+        return (record for _, record in self._mapping.stream())
+
+
+class SpillStore(MutableMapping):
+    """
+    This class is a dictionary of records, e.g. lines_info or variables_info of Slice, which keeps only its working
+    set in memory. When more than capacity records are resident, the least recently used quarter of them is pickled
+    to a SQLite file and dropped from memory, and a spilled record is faulted back in when it is accessed. The
+    records are mutated in place by the analysis, so every evicted record is written back, and a record must not be
+    kept across accesses to other records of the store. The keys of the spilled records stay in memory, so that a
+    membership test never reads the file.
+
+    items() and values() read the spilled records in one pass over the file without faulting them in, so that the
+    dependence graph can be built over the whole store, e.g. by query_slices.
+
+    The file is private to the process: a forked child copies it on its first read of a spilled record, and the
+    file of every process is removed when the store is collected or the process exits.
+
+    Attributes
+    ----------
+    capacity : int
+        The maximal number of resident records
+
+    directory : str
+        The directory of the SQLite file, the temporary directory by default
+
+    resident : OrderedDict
+        The records in memory, from the least to the most recently used one
+
+    spilled : Set[Hashable]
+        The keys of the records which are only in the file
+
+    path : str
+        The path of the SQLite file, None until the first record is spilled
+
+    pid : int
+        The process which owns the file
+    -------
+    """
+    capacity: int
+    directory: str
+    resident: OrderedDict
+    spilled: Set[Hashable]
+    path: Optional[str] = None
+    pid: int
+    database: Optional[sqlite3.Connection] = None
+
+    def __init__(self, capacity: int, directory: str = None) -> None:
+        """
+        Parameters
+        ----------
+        capacity: int
+            The maximal number of resident records
+
+        directory: str
+            The directory of the SQLite file, the temporary directory if None
+        """
+        if capacity < 1:
+            raise ValueError("capacity must be at least 1")
+        self.capacity = capacity
+        self.directory = directory if directory is not None else tempfile.gettempdir()
+        self.resident = OrderedDict()
+        self.spilled = set()
+        self.path = None
+        self.pid = os.getpid()
+        self.database = None
+
+    def __getitem__(self, key: Hashable) -> Any:
+        try:
+            record = self.resident[key]
+        except KeyError:
+            if key not in self.spilled:
+                raise
+            return self.fault(key)
+        self.resident.move_to_end(key)
+        return record
+
+    def __setitem__(self, key: Hashable, record: Any) -> None:
+        self.spilled.discard(key)
+        self.resident[key] = record
+        self.resident.move_to_end(key)
+        if len(self.resident) > self.capacity:
+            self.evict()
+
+    def __delitem__(self, key: Hashable) -> None:
+        # A stale row of a deleted key is left in the file, only the keys in spilled are read
+        if key in self.resident:
+            del self.resident[key]
+        else:
+            self.spilled.remove(key)
+
+    def __iter__(self) -> Iterator[Hashable]:
+        return chain(self.resident, self.spilled)
+
+    def __len__(self) -> int:
+        return len(self.resident) + len(self.spilled)
+
+    def __contains__(self, key: Hashable) -> bool:
+        return key in self.resident or key in self.spilled
+
+    def items(self) -> SpillItems:
+        return SpillItems(self)
+
+    def values(self) -> SpillValues:
+        return SpillValues(self)
+
+    def clear(self) -> None:
+        self.resident.clear()
+        self.spilled.clear()
+
+    def connection(self) -> sqlite3.Connection:
+        """This method opens the SQLite file of the current process, on the first spill. A forked child does not
+        use the connection of its parent, it copies the file of the parent into its own one
+
+        Returns
+        -------
+        sqlite3.Connection
+            The connection
+        """
+        if self.database is not None and self.pid == os.getpid():
+            return self.database
+        parent_path = self.path if self.database is not None else None
+        descriptor, self.path = tempfile.mkstemp(prefix="dynamicslicing-spill-", suffix=".db", dir=self.directory)
+        os.close(descriptor)
+        self.pid = os.getpid()
+        self.database = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None)
+        self.database.execute("PRAGMA journal_mode=MEMORY")
+        self.database.execute("PRAGMA synchronous=OFF")
+        if parent_path is not None:
+            parent = sqlite3.connect(parent_path)
+            try:
+                parent.backup(self.database)
+            finally:
+                parent.close()
+        else:
+            self.database.execute("CREATE TABLE records (key PRIMARY KEY, record BLOB) WITHOUT ROWID")
+        Finalize(self, close_database, args=(self.database, self.path), exitpriority=0)
+        return self.database
+
+    def fault(self, key: Hashable) -> Any:
+        """This method reads a spilled record back into memory
+
+        Parameters
+        ----------
+        key: Hashable
+            The key of the record
+
+        Returns
+        -------
+        Any
+            The record
+        """
+        row = self.connection().execute("SELECT record FROM records WHERE key = ?", (key,)).fetchone()
+        record = pickle.loads(row[0])
+        self.spilled.discard(key)
+        self.resident[key] = record
+        if len(self.resident) > self.capacity:
+            self.evict()
+        return record
+
+    def evict(self) -> None:
+        """This method writes the least recently used records to the file in one transaction, until a quarter of
+        the capacity is free
+
+        Returns
+        -------
+        None
+        """
+        count = len(self.resident) - self.capacity + self.capacity // 4
+        rows = list()
+        for _ in range(count):
+            key, record = self.resident.popitem(last=False)
+            rows.append((key, pickle.dumps(record, pickle.HIGHEST_PROTOCOL)))
+        database = self.connection()
+        database.execute("BEGIN")
+        database.executemany("INSERT OR REPLACE INTO records VALUES (?, ?)", rows)
+        database.execute("COMMIT")
+        self.spilled.update(key for key, _ in rows)
+
+    def stream(self) -> Iterator[Tuple[Hashable, Any]]:
+        """This method reads every record once: the resident ones, then the spilled ones from the file, which are
+        not faulted in
+
+        Returns
+        -------
+        Iterator[Tuple[Hashable, Any]]
+            The keys and the records
+        """
+        yield from list(self.resident.items())
+        if len(self.spilled) == 0:
+            return
+        for key, record in self.connection().execute("SELECT key, record FROM records"):
+            if key in self.spilled:
+                yield key, pickle.loads(record)
+
+
+def close_database(database: sqlite3.Connection, path: str) -> None:
+    """ This method closes the SQLite file of a SpillStore and removes it
+
+    Parameters
+    ----------
+    database: sqlite3.Connection
+        The connection
+
+    path: str
+        The path of the file
+
+    Returns
+    ----------
+    None
+    """
+    database.close()
+    try:
+        os.remove(path)
+    except OSError:
+        pass
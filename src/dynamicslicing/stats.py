@@ -0,0 +1,674 @@
+import gc
+import json
+import sys
+import tracemalloc
+from functools import wraps
+from os import path
+from time import perf_counter, perf_counter_ns
+from types import BuiltinFunctionType, CodeType, FunctionType, MethodType, ModuleType
+from typing import Any, Callable, Dict, List, Optional, Set, Tuple
+import libcst as cst
+from libcst.metadata import PositionProvider
+from dynapyt.analyses.BaseAnalysis import BaseAnalysis
+
+# The hooks which are profiled, if the analysis has them. All of them take the file and the iid first
+HOOKS = ["read", "write", "augmented_assignment", "read_attribute", "read_subscript", "function_enter",
+         "function_exit", "enter_if", "enter_for", "enter_while", "_return"]
+# The hooks which do nothing while no invocation of sliced_function_name is analyzed
+GATED_HOOKS = [hook for hook in HOOKS if hook not in ("function_enter", "function_exit")]
+# The methods which are counted and timed, if the analysis has them
+TIMED_METHODS = HOOKS + ["query_slices"]
+# The objects which deep_size does not follow
+SHARED_TYPES = (type, ModuleType, FunctionType, BuiltinFunctionType, MethodType, CodeType)
+
+
+class HookStatistics():
+    """
+    This class counts and times the hooks of an analysis, and the events which it drops, and writes
+    them with the size of the dependence graph as a JSON report. It is opt-in and costs nothing when it is not
+    used: the counting wrappers are installed as attributes of the analysis instance, which shadow the methods of
+    its class, and dynapyt looks the hooks up on the instance for every event.
+
+    Attributes
+    ----------
+    path : str
+        The path of the JSON report
+
+    calls : Dict[str, int]
+        The number of calls of every method
+
+    seconds : Dict[str, float]
+        The time spent in every method, including the methods it calls
+
+    checked : Dict[str, int]
+        The number of events of every hook which can_run_analysis checked
+
+    dropped : Dict[str, int]
+        The number of events of every hook which were dropped: by can_run_analysis, or before it since no
+        invocation was analyzed
+
+    inactive : Dict[str, int]
+        The number of events of every hook which were dropped since no invocation was analyzed
+
+    current : str
+        The hook which is running, the events which can_run_analysis checks are counted for it
+
+    current_inactive : bool
+        Whether the running hook was called while no invocation was analyzed, its event is counted as dropped
+        already
+    -------
+    """
+    path: str
+    calls: Dict[str, int]
+    seconds: Dict[str, float]
+    checked: Dict[str, int]
+    dropped: Dict[str, int]
+    inactive: Dict[str, int]
+    current: str
+    current_inactive: bool
+
+    def __init__(self, path: str) -> None:
+        """
+        Parameters
+        ----------
+        path: str
+            The path of the JSON report
+        """
+        self.path = path
+        self.clear()
+
+    def clear(self) -> None:
+        """Forgets all counts and times
+
+        Returns
+        -------
+        None
+        """
+        self.calls = dict()
+        self.seconds = dict()
+        self.checked = dict()
+        self.dropped = dict()
+        self.inactive = dict()
+        self.current = None
+        self.current_inactive = False
+
+    def install(self, analysis: BaseAnalysis) -> None:
+        """This method installs the counting wrappers on an analysis instance
+
+        Parameters
+        ----------
+        analysis: BaseAnalysis
+            The analysis
+
+        Returns
+        -------
+        None
+        """
+        for name in TIMED_METHODS:
+            if hasattr(analysis, name):
+                setattr(analysis, name, self.timed(name, getattr(analysis, name)))
+        if hasattr(analysis, "can_run_analysis"):
+            analysis.can_run_analysis = self.checking(analysis.can_run_analysis)
+
+    def timed(self, name: str, method: Callable) -> Callable:
+        """This method wraps a method to count and time its calls. The docstring is kept, since dynapyt reads the
+        filters of a hook from it
+
+        Parameters
+        ----------
+        name: str
+            The name of the method
+
+        method: Callable
+            The bound method
+
+        Returns
+        -------
+        Callable
+            The wrapper
+        """
+        analysis = method.__self__
+        gated = name in GATED_HOOKS
+
+        @wraps(method)
+        def wrapper(*args: Any) -> Any:
+            caller, caller_inactive = self.current, self.current_inactive
+            self.current = name
+            # The hooks of Slice return before can_run_analysis while no invocation is analyzed
+            self.current_inactive = gated and analysis.start_analysis == False
+            if self.current_inactive:
+                self.inactive[name] = self.inactive.get(name, 0) + 1
+                self.dropped[name] = self.dropped.get(name, 0) + 1
+            start = perf_counter()
+            try:
+                return method(*args)
+            finally:
+                self.seconds[name] = self.seconds.get(name, 0.0) + perf_counter() - start
+                self.calls[name] = self.calls.get(name, 0) + 1
+                self.current, self.current_inactive = caller, caller_inactive
+        return wrapper
+
+    def checking(self, method: Callable) -> Callable:
+        """This method wraps can_run_analysis to count the events which it checks and drops, for the running hook.
+        An event of a hook which was called while no invocation was analyzed is dropped once
+
+        Parameters
+        ----------
+        method: Callable
+            The bound can_run_analysis
+
+        Returns
+        -------
+        Callable
+            The wrapper
+        """
+        @wraps(method)
+        def wrapper(*args: Any) -> bool:
+            result = method(*args)
+            self.checked[self.current] = self.checked.get(self.current, 0) + 1
+            if result == False and self.current_inactive == False:
+                self.dropped[self.current] = self.dropped.get(self.current, 0) + 1
+            return result
+        return wrapper
+
+    def report(self, analysis: BaseAnalysis, slices: Dict[int, List[int]]) -> Dict[str, Any]:
+        """This method collects the statistics and the size of the dependence graph of an analysis
+
+        Parameters
+        ----------
+        analysis: BaseAnalysis
+            The analysis, after the execution
+
+        slices: Dict[int, List[int]]
+            The slice of every criterion
+
+        Returns
+        -------
+        Dict[str, Any]
+            The report
+        """
+        methods = {name: {"calls": self.calls[name], "seconds": round(self.seconds[name], 6),
+                          "checked": self.checked.get(name, 0), "dropped": self.dropped.get(name, 0),
+                          "inactive": self.inactive.get(name, 0)}
+                   for name in sorted(self.calls)}
+        variables = analysis.variables_info.values()
+        graph = {"lines": len(analysis.lines_info),
+                 "dependencies": sum(len(set(line.dependencies)) for line in analysis.lines_info.values()),
+                 "variables": len(analysis.variables_info),
+                 "elements": sum(len(variable.elements) for variable in variables),
+                 "attributes": sum(len(variable.attributes) for variable in variables)}
+        return {"source_path": analysis.source_path, "methods": methods,
+                "hook_seconds": round(sum(self.seconds.get(name, 0.0) for name in self.calls
+                                          if name != "query_slices"), 6),
+                "graph": graph, "slice_range": [analysis.slice_start_line, analysis.slice_end_line],
+                "slices": {str(line_number): lines for line_number, lines in slices.items()}}
+
+    def write(self, analysis: BaseAnalysis, slices: Dict[int, List[int]]) -> None:
+        """This method writes the report of an analysis to path
+
+        Parameters
+        ----------
+        analysis: BaseAnalysis
+            The analysis, after the execution
+
+        slices: Dict[int, List[int]]
+            The slice of every criterion
+
+        Returns
+        -------
+        None
+        """
+        with open(self.path, "w") as file:
+            json.dump(self.report(analysis, slices), file, indent=2)
+
+
+class LineProfile():
+    """
+    This class attributes the time and the events of the hooks of an analysis to the iids, and so to the source
+    lines, of the analyzed program. It writes collapsed stacks (`file;function;line;hook count`), which standard
+    flame graph tools read, with nanoseconds as count, and a copy of the source annotated with the events and the
+    time of every line. Like HookStatistics, it is opt-in and installs its wrappers on the analysis instance only.
+
+    Attributes
+    ----------
+    path : str
+        The path of the collapsed stacks, the annotated source is written next to it with the suffix .lines
+
+    events : Dict[Tuple[str, int, str], List[int]]
+        The number of events and the nanoseconds spent, by file, iid and hook
+    -------
+    """
+    path: str
+    events: Dict[Tuple[str, int, str], List[int]]
+
+    def __init__(self, path: str) -> None:
+        """
+        Parameters
+        ----------
+        path: str
+            The path of the collapsed stacks
+        """
+        self.path = path
+        self.events = dict()
+
+    def clear(self) -> None:
+        """Forgets all events. The dictionary is kept, the wrappers refer to it
+
+        Returns
+        -------
+        None
+        """
+        self.events.clear()
+
+    def install(self, analysis: BaseAnalysis) -> None:
+        """This method installs the profiling wrappers on an analysis instance
+
+        Parameters
+        ----------
+        analysis: BaseAnalysis
+            The analysis
+
+        Returns
+        -------
+        None
+        """
+        for name in HOOKS:
+            if hasattr(analysis, name):
+                setattr(analysis, name, self.profiled(name, getattr(analysis, name)))
+
+    def profiled(self, name: str, method: Callable) -> Callable:
+        """This method wraps a hook to count and time its events by file and iid
+
+        Parameters
+        ----------
+        name: str
+            The name of the hook
+
+        method: Callable
+            The bound hook
+
+        Returns
+        -------
+        Callable
+            The wrapper
+        """
+        events = self.events
+
+        @wraps(method)
+        def wrapper(dyn_ast: str, iid: int, *args: Any) -> Any:
+            start = perf_counter_ns()
+            try:
+                return method(dyn_ast, iid, *args)
+            finally:
+                elapsed = perf_counter_ns() - start
+                entry = events.get((dyn_ast, iid, name))
+                if entry is None:
+                    events[(dyn_ast, iid, name)] = [1, elapsed]
+                else:
+                    entry[0] += 1
+                    entry[1] += elapsed
+        return wrapper
+
+    def lines(self, analysis: BaseAnalysis) -> Dict[Tuple[str, int], Dict[Tuple[int, str], List[int]]]:
+        """This method groups the events by file and line
+
+        Parameters
+        ----------
+        analysis: BaseAnalysis
+            The analysis, which knows the locations of the iids
+
+        Returns
+        -------
+        Dict[Tuple[str, int], Dict[Tuple[int, str], List[int]]]
+            The events and nanoseconds of every iid and hook, by file and line
+        """
+        result: Dict[Tuple[str, int], Dict[Tuple[int, str], List[int]]] = dict()
+        for (file_path, iid, hook), entry in self.events.items():
+            line_number = analysis.iid_to_location(file_path, iid).start_line
+            result.setdefault((file_path, line_number), dict())[(iid, hook)] = entry
+        return result
+
+    def collapsed_stacks(self, analysis: BaseAnalysis) -> List[str]:
+        """This method formats the events as collapsed stacks: the file, the function, the line with its code and
+        the hook with the iid, and the nanoseconds spent
+
+        Parameters
+        ----------
+        analysis: BaseAnalysis
+            The analysis, which knows the syntax trees and the locations of the iids
+
+        Returns
+        -------
+        List[str]
+            One stack per iid and hook
+        """
+        stacks: List[str] = []
+        functions: Dict[str, Dict[int, str]] = dict()
+        sources: Dict[str, List[str]] = dict()
+        for (file_path, line_number), iids in sorted(self.lines(analysis).items()):
+            if file_path not in functions:
+                module = analysis._get_ast(file_path)[0]
+                functions[file_path] = function_lines(module)
+                sources[file_path] = module.code.split("\n")
+            code = sources[file_path][line_number - 1].strip() if line_number <= len(sources[file_path]) else ""
+            frames = [path.basename(file_path[:-5] if file_path.endswith(".orig") else file_path),
+                      functions[file_path].get(line_number, "<module>"), f"{line_number}: {code}"]
+            prefix = ";".join(frame.replace(";", ",") for frame in frames)
+            for (iid, hook), (_, nanoseconds) in sorted(iids.items()):
+                stacks.append(f"{prefix};{hook} [iid {iid}] {nanoseconds}")
+        return stacks
+
+    def annotated_source(self, analysis: BaseAnalysis, file_path: str) -> str:
+        """This method prefixes every line of a code file with the events and the milliseconds of its hooks
+
+        Parameters
+        ----------
+        analysis: BaseAnalysis
+            The analysis, which knows the syntax trees and the locations of the iids
+
+        file_path: str
+            The path which the instrumented code reports for the file
+
+        Returns
+        -------
+        str
+            The annotated source
+        """
+        totals: Dict[int, List[int]] = dict()
+        for (profiled_path, line_number), iids in self.lines(analysis).items():
+            if profiled_path == file_path:
+                totals[line_number] = [sum(entry[0] for entry in iids.values()),
+                                       sum(entry[1] for entry in iids.values())]
+        lines = [f"{'events':>10}{'ms':>10}  source"]
+        for line_number, code in enumerate(analysis._get_ast(file_path)[0].code.split("\n"), start=1):
+            events, nanoseconds = totals.get(line_number, (0, 0))
+            if events == 0:
+                lines.append(f"{'':>20}  {code}")
+            else:
+                lines.append(f"{events:>10}{nanoseconds / 1e6:>10.3f}  {code}")
+        return "\n".join(lines) + "\n"
+
+    def write(self, analysis: BaseAnalysis) -> None:
+        """This method writes the collapsed stacks to path, and the annotated source of the sliced file to path
+        with the suffix .lines
+
+        Parameters
+        ----------
+        analysis: BaseAnalysis
+            The analysis, after the execution
+
+        Returns
+        -------
+        None
+        """
+        with open(self.path, "w") as file:
+            file.write("".join(stack + "\n" for stack in self.collapsed_stacks(analysis)))
+        with open(self.path + ".lines", "w") as file:
+            file.write(self.annotated_source(analysis, analysis.source_path))
+
+
+class FunctionLines(cst.CSTVisitor):
+    """
+    This class maps every line of a module to the qualified name of the innermost function or class around it
+
+    Attributes
+    ----------
+    names : List[str]
+        The names of the definitions which are being visited, outermost first
+
+    lines : Dict[int, str]
+        The qualified name of every line which belongs to a definition
+    -------
+    """
+    METADATA_DEPENDENCIES = (
+        PositionProvider,
+    )
+
+    def __init__(self) -> None:
+        self.names: List[str] = []
+        self.lines: Dict[int, str] = dict()
+
+    def visit_ClassDef(self, node: cst.ClassDef) -> Optional[bool]:
+        """ We enter a class
+
+        Parameters
+        ----------
+        node: cst.ClassDef
+            The class definition
+
+        Returns
+        ----------
+        Optional[bool]
+            None, so that the body is visited
+        """
+        self.enter(node, node.name.value)
+        return None
+
+    def leave_ClassDef(self, original_node: cst.ClassDef) -> None:
+        """ We leave a class
+
+        Parameters
+        ----------
+        original_node: cst.ClassDef
+            The class definition
+
+        Returns
+        ----------
+        None
+        """
+        self.names.pop()
+
+    def visit_FunctionDef(self, node: cst.FunctionDef) -> Optional[bool]:
+        """ We enter a function
+
+        Parameters
+        ----------
+        node: cst.FunctionDef
+            The function definition
+
+        Returns
+        ----------
+        Optional[bool]
+            None, so that the body is visited
+        """
+        self.enter(node, node.name.value)
+        return None
+
+    def leave_FunctionDef(self, original_node: cst.FunctionDef) -> None:
+        """ We leave a function
+
+        Parameters
+        ----------
+        original_node: cst.FunctionDef
+            The function definition
+
+        Returns
+        ----------
+        None
+        """
+        self.names.pop()
+
+    def enter(self, node: cst.CSTNode, name: str) -> None:
+        """ We assign the lines of a definition to its qualified name, the nested definitions overwrite them later
+
+        Parameters
+        ----------
+        node: cst.CSTNode
+            The definition
+
+        name: str
+            Its name
+
+        Returns
+        ----------
+        None
+        """
+        self.names.append(name)
+        position = self.get_metadata(PositionProvider, node)
+        for line_number in range(position.start.line, position.end.line + 1):
+            self.lines[line_number] = ".".join(self.names)
+
+
+def function_lines(module: cst.Module) -> Dict[int, str]:
+    """ This method maps every line of a module which belongs to a function or class to its qualified name
+
+    Parameters
+    ----------
+    module: cst.Module
+        The syntax tree
+
+    Returns
+    ----------
+    Dict[int, str]
+        The qualified name, e.g. `Point.__init__`, by line number
+    """
+    visitor = FunctionLines()
+    cst.metadata.MetadataWrapper(module).visit(visitor)
+    return visitor.lines
+
+
+class MemoryReport():
+    """
+    This class reports the memory of an analysis at the end of the execution. tracemalloc traces the allocations
+    from the creation of the analysis on, which gives the peak over the run and the allocation sites which retain
+    the most memory. The retained bytes of every structure of the analysis are measured by walking the objects
+    which it references; an object which is shared by several structures is counted once, for the first one.
+
+    Attributes
+    ----------
+    path : str
+        The path of the JSON report
+
+    started : bool
+        Whether tracemalloc was started by the report, and so is stopped by it
+    -------
+    """
+    path: str
+    started: bool
+
+    def __init__(self, path: str) -> None:
+        """
+        Parameters
+        ----------
+        path: str
+            The path of the JSON report
+        """
+        self.path = path
+        self.started = False
+
+    def start(self) -> None:
+        """Starts tracing the allocations, unless they are traced already
+
+        Returns
+        -------
+        None
+        """
+        if tracemalloc.is_tracing() == False:
+            tracemalloc.start()
+            self.started = True
+
+    def clear(self) -> None:
+        """Starts a new peak, e.g. when the analysis is reset for another run, and traces the allocations again if
+        write stopped tracing them after the last run
+
+        Returns
+        -------
+        None
+        """
+        if tracemalloc.is_tracing() and hasattr(tracemalloc, "reset_peak"):
+            tracemalloc.reset_peak()
+        elif tracemalloc.is_tracing() and self.started:
+            # tracemalloc.reset_peak is new in Python 3.9, tracing from scratch starts a new peak too
+            tracemalloc.stop()
+        self.start()
+
+    def report(self, analysis: BaseAnalysis) -> Dict[str, Any]:
+        """This method measures the retained bytes of every structure of an analysis, and takes the traced and peak
+        memory and the top allocation sites from tracemalloc
+
+        Parameters
+        ----------
+        analysis: BaseAnalysis
+            The analysis, after the execution
+
+        Returns
+        -------
+        Dict[str, Any]
+            The report
+        """
+        variables = list(analysis.variables_info.values())
+        structures = [
+            ("elements", [variable.elements for variable in variables]),
+            ("attributes", [variable.attributes for variable in variables]),
+            ("variables", analysis.variables_info),
+            ("lines", analysis.lines_info),
+            ("control_flow", [getattr(analysis, name) for name in
+                              ("control_dependencies", "control_dependence_cache", "taken_branches")
+                              if hasattr(analysis, name)]),
+            ("indexes", [analysis.reachability_index, analysis.dependence_graph]),
+            ("bytecode_tables", getattr(analysis, "bytecode_tables", None)),
+            ("asts", analysis.asts),
+        ]
+        report: Dict[str, Any] = {"source_path": analysis.source_path}
+        # tracemalloc is read first, so that the walk below does not show up in it
+        if tracemalloc.is_tracing():
+            current, peak = tracemalloc.get_traced_memory()
+            snapshot = tracemalloc.take_snapshot().filter_traces([tracemalloc.Filter(False, tracemalloc.__file__)])
+            report["traced_bytes"] = current
+            report["peak_bytes"] = peak
+            report["allocation_sites"] = [{"site": f"{statistic.traceback[0].filename}:"
+                                                   f"{statistic.traceback[0].lineno}",
+                                           "bytes": statistic.size, "blocks": statistic.count}
+                                          for statistic in snapshot.statistics("lineno")[:20]]
+        seen = {id(analysis)}
+        report["retained_bytes"] = {name: deep_size(structure, seen) for name, structure in structures}
+        report["retained_total"] = sum(report["retained_bytes"].values())
+        return report
+
+    def write(self, analysis: BaseAnalysis) -> None:
+        """This method writes the report of an analysis to path, and stops tracemalloc if it was started for it
+
+        Parameters
+        ----------
+        analysis: BaseAnalysis
+            The analysis, after the execution
+
+        Returns
+        -------
+        None
+        """
+        report = self.report(analysis)
+        if self.started:
+            tracemalloc.stop()
+            self.started = False
+        with open(self.path, "w") as file:
+            json.dump(report, file, indent=2)
+
+
+def deep_size(root: Any, seen: Set[int]) -> int:
+    """ This method sums the sizes of an object and of all objects which it references and which are not in seen.
+    Classes, modules, functions and code objects are not followed, they do not belong to a single structure
+
+    Parameters
+    ----------
+    root: Any
+        The object
+
+    seen: Set[int]
+        The ids of the objects which are counted already, updated with the ones counted now
+
+    Returns
+    ----------
+    int
+        The bytes
+    """
+    size = 0
+    stack = [root]
+    while len(stack) > 0:
+        current = stack.pop()
+        if id(current) in seen or isinstance(current, SHARED_TYPES):
+            continue
+        seen.add(id(current))
+        size += sys.getsizeof(current)
+        stack.extend(gc.get_referents(current))
+    return size
@@ -0,0 +1,491 @@
+import heapq
+import threading
+import weakref
+from itertools import count
+from operator import itemgetter
+from types import FrameType
+from typing import Any, Callable, Iterator, List, Optional, Set, Tuple
+from dynamicslicing.slice import Slice
+
+
+class ThreadSentinel():
+    """
+    This class marks the lifetime of the attributes of a thread in a ThreadState: they are dropped when the thread
+    ends, and with them the only reference to its sentinel
+    -------
+    """
+
+
+def retire_buffer(analysis_reference: "weakref.ref[ThreadAwareSlice]", pending: List[list]) -> None:
+    """ This method retires the buffer of a thread which ended from its analysis, if the analysis still exists. The
+    analysis is referenced weakly, so that the finalizers of the threads do not keep it alive
+
+    Parameters
+    ----------
+    analysis_reference: weakref.ref[ThreadAwareSlice]
+        The analysis which the thread state belongs to
+
+    pending: List[list]
+        The buffer of the thread
+
+    Returns
+    ----------
+    None
+    """
+    analysis = analysis_reference()
+    if analysis is not None:
+        analysis.retire(pending)
+
+
+class ThreadState(threading.local):
+    """
+    This class is the state of the analysis which belongs to a single thread: every thread which touches it gets its
+    own attributes, initialized by __init__. The buffer of pending records is registered with the analysis, so that
+    the buffers of all threads can be merged together, until the thread ends
+
+    Attributes
+    ----------
+    start_analysis : bool
+        Whether the current invocation of sliced_function_name in this thread is analyzed
+
+    invocation_depth : int
+        The number of active (nested) invocations of sliced_function_name in this thread
+
+    invocation_start : float
+        The time when the current sampled invocation of this thread was entered
+
+    taken_branches : Set[Tuple]
+        The keys of the branches that were taken during the current invocation of this thread, see
+        Slice.taken_branches
+
+    call_sites : List[int]
+        The call sites of the active functions of other code files in this thread, see Slice.call_sites
+
+    returned_call_site : Optional[int]
+        The call site of the function of another code file which exits now in this thread
+
+    current_node : Optional[int]
+        The node of the last event which this thread analyzed
+
+    invocation_frames : List[FrameType]
+        The frames of the active invocations of sliced_function_name in this thread
+
+    pending : List[list]
+        The records of this thread which are not merged into lines_info and variables_info yet, in order: their
+        sequence number, None while it is being taken, the record method and its arguments
+
+    sentinel : ThreadSentinel
+        Retires the buffer of this thread from the analysis when the thread ends
+    -------
+    """
+    start_analysis: bool
+    invocation_depth: int
+    invocation_start: float
+    taken_branches: Set[Tuple]
+    call_sites: List[int]
+    returned_call_site: Optional[int]
+    current_node: Optional[int]
+    invocation_frames: List[FrameType]
+    pending: List[list]
+    sentinel: ThreadSentinel
+
+    def __init__(self, analysis: "ThreadAwareSlice") -> None:
+        """
+        Parameters
+        ----------
+        analysis: ThreadAwareSlice
+            The analysis which the state belongs to
+        """
+        self.start_analysis = False
+        self.invocation_depth = 0
+        self.invocation_start = 0.0
+        self.taken_branches = set()
+        self.call_sites = list()
+        self.returned_call_site = None
+        self.current_node = None
+        self.invocation_frames = list()
+        self.pending = list()
+        self.sentinel = ThreadSentinel()
+        finalizer = weakref.finalize(self.sentinel, retire_buffer, weakref.ref(analysis), self.pending)
+        # At exit, the records are merged by prepare_file_attributes
+        finalizer.atexit = False
+        with analysis.lock:
+            analysis.buffers.append(self.pending)
+
+
+class ThreadAwareSlice(Slice):
+    """
+    This class is Slice for programs which run sliced_function_name in several threads. The control-flow state of
+    an invocation (whether it is analyzed, its nesting depth and its taken branches) is kept per thread, and the
+    hooks do not update the shared lines_info and variables_info directly: every thread appends its records to its
+    own buffer, so the hooks never wait for a lock. Every record gets a sequence number, and the buffers of all
+    threads are merged under a lock in the order of the sequence numbers, i.e. in the order in which the hooks ran,
+    so that a dependence between threads, e.g. a worker which writes what the invocation reads, is kept. The
+    buffers are merged when one of them is full, when sliced_function_name is entered or exited, which update the
+    sampling policy and take the lock anyway, when a thread ends and at the end of the execution.
+
+    A thread which is not inside sliced_function_name itself, e.g. a worker started by it, is analyzed while any
+    thread runs an analyzed invocation, like with Slice.
+
+    Attributes
+    ----------
+    local : ThreadState
+        The state of the current thread
+
+    lock : threading.RLock
+        Guards lines_info, variables_info, the sampling policy and buffers
+
+    buffers : List[List[list]]
+        The pending records of every running thread
+
+    sequence : Iterator[int]
+        Numbers the records of all threads
+
+    batch_size : int
+        The number of pending records at which a thread merges its buffer
+
+    analyzed_invocations : int
+        The number of threads which run an analyzed invocation of sliced_function_name
+    -------
+    """
+    local: ThreadState
+    lock: threading.RLock
+    buffers: List[List[list]]
+    sequence: Iterator[int]
+    batch_size: int
+    analyzed_invocations: int = 0
+
+    def __init__(self, source_path: str = "", batch_size: int = 1024, **options: Any) -> None:
+        """
+        Parameters
+        ----------
+        source_path: str
+            The path to the code file to be sliced
+
+        batch_size: int
+            The number of pending records at which a thread merges its buffer
+
+        options: Any
+            The other arguments of Slice, e.g. sampling_rate
+        """
+        self.lock = threading.RLock()
+        self.buffers = list()
+        self.sequence = count()
+        self.batch_size = batch_size
+        self.analyzed_invocations = 0
+        self.local = ThreadState(self)
+        super(ThreadAwareSlice, self).__init__(source_path, **options)
+
+    @property
+    def start_analysis(self) -> bool:
+        local = self.local
+        if local.invocation_depth > 0:
+            return local.start_analysis
+        return self.analyzed_invocations > 0
+
+    @start_analysis.setter
+    def start_analysis(self, value: bool) -> None:
+        self.local.start_analysis = value
+
+    @property
+    def invocation_depth(self) -> int:
+        return self.local.invocation_depth
+
+    @invocation_depth.setter
+    def invocation_depth(self, value: int) -> None:
+        self.local.invocation_depth = value
+
+    @property
+    def invocation_start(self) -> float:
+        return self.local.invocation_start
+
+    @invocation_start.setter
+    def invocation_start(self, value: float) -> None:
+        self.local.invocation_start = value
+
+    @property
+    def taken_branches(self) -> Set[Tuple]:
+        return self.local.taken_branches
+
+    @taken_branches.setter
+    def taken_branches(self, value: Set[Tuple]) -> None:
+        self.local.taken_branches = value
+
+    @property
+    def call_sites(self) -> List[int]:
+        return self.local.call_sites
+
+    @call_sites.setter
+    def call_sites(self, value: List[int]) -> None:
+        self.local.call_sites = value
+
+    @property
+    def returned_call_site(self) -> Optional[int]:
+        return self.local.returned_call_site
+
+    @returned_call_site.setter
+    def returned_call_site(self, value: Optional[int]) -> None:
+        self.local.returned_call_site = value
+
+    @property
+    def current_node(self) -> Optional[int]:
+        return self.local.current_node
+
+    @current_node.setter
+    def current_node(self, value: Optional[int]) -> None:
+        self.local.current_node = value
+
+    @property
+    def invocation_frames(self) -> List[FrameType]:
+        return self.local.invocation_frames
+
+    @invocation_frames.setter
+    def invocation_frames(self, value: List[FrameType]) -> None:
+        self.local.invocation_frames = value
+
+    def reset(self, source_path: str = "") -> None:
+        """This method forgets the previous run, including the pending records of all threads
+
+        Parameters
+        ----------
+        source_path: str
+            The path to the code file to be sliced in the next run
+
+        Returns
+        -------
+        None
+        """
+        with self.lock:
+            for buffer in self.buffers:
+                buffer.clear()
+            self.analyzed_invocations = 0
+        super(ThreadAwareSlice, self).reset(source_path)
+
+    def function_enter(self, dyn_ast: str, iid: int, args: List[Any], name: str, is_lambda: bool) -> None:
+        """Hook for when an instrumented function is entered. The entry of sliced_function_name updates the
+        sampling policy, which is shared, so it takes the lock and merges the pending records. Another function
+        only takes the lock the first time it is analyzed, see enter_callee
+
+        Parameters
+        ----------
+        dyn_ast : str
+            The path to the original code. Can be used to extract the syntax tree.
+
+        iid : int
+            Unique ID of the syntax tree node.
+
+        args : List[Any]
+            The arguments passed to the function.
+
+        name:
+            Name of the function called.
+
+        is_lambda : bool
+            Whether the function is a lambda function.
+        """
+        if name != self.sliced_function_name:
+            if self.analysis_finished == False:
+                self.enter_call(dyn_ast, iid, name)
+            return
+        with self.lock:
+            self.merge()
+            super(ThreadAwareSlice, self).function_enter(dyn_ast, iid, args, name, is_lambda)
+            if self.invocation_depth == 1 and self.start_analysis:
+                self.analyzed_invocations += 1
+
+    def function_exit(self, dyn_ast: str, function_iid: int, name: str, result: Any) -> Any:
+        """Hook for exiting an instrumented function. The exit of sliced_function_name merges the pending records
+
+        Parameters
+        ----------
+        dyn_ast : str
+            The path to the original code. Can be used to extract the syntax tree.
+
+        function_iid : int
+            Unique ID of the function.
+
+        name : str
+            Name of the function called.
+
+        result : Any
+            The result of the function.
+
+        Returns
+        -------
+        Any
+            If provided, overwrites the returned value.
+        """
+        if name != self.sliced_function_name:
+            if self.analysis_finished == False:
+                self.exit_call(dyn_ast)
+            return
+        with self.lock:
+            self.merge()
+            super(ThreadAwareSlice, self).function_exit(dyn_ast, function_iid, name, result)
+
+    def enter_callee(self, dyn_ast: str, iid: int) -> None:
+        """This method analyzes a function of another code file under the lock, since its lines and control
+        dependences are shared by all threads
+
+        Returns
+        -------
+        None
+        """
+        with self.lock:
+            super(ThreadAwareSlice, self).enter_callee(dyn_ast, iid)
+
+    def finish_invocation(self) -> None:
+        """This method finishes the outermost invocation of the current thread, which is not counted as analyzed
+        anymore
+
+        Returns
+        -------
+        None
+        """
+        if self.start_analysis == True:
+            self.analyzed_invocations -= 1
+        super(ThreadAwareSlice, self).finish_invocation()
+
+    def prepare_file_attributes(self):
+        """This method merges the records which are still pending in any thread, then prepares source_path and
+        source after the execution. It runs before every slice, by end_execution or by AnalysisSession, also when
+        no exit hook flushed the buffers, e.g. after an invocation which raised
+
+        Returns
+        -------
+        None
+        """
+        with self.lock:
+            self.merge()
+        super(ThreadAwareSlice, self).prepare_file_attributes()
+
+    def defer(self, method: Callable, args: Tuple) -> None:
+        """This method appends a record to the buffer of the current thread, and merges the buffers when it is full
+
+        Parameters
+        ----------
+        method: Callable
+            The record method of Slice
+
+        args: Tuple
+            Its arguments
+
+        Returns
+        -------
+        None
+        """
+        pending = self.local.pending
+        # The record is appended before it is numbered, so merge sees the numbers which are being taken
+        record = [None, method, args]
+        pending.append(record)
+        record[0] = next(self.sequence)
+        if len(pending) >= self.batch_size:
+            with self.lock:
+                self.merge()
+
+    def merge(self) -> None:
+        """This method applies the pending records of all threads to lines_info and variables_info, in the order of
+        their sequence numbers. The caller holds the lock. Only the records which are numbered before the merge
+        starts are applied: a record which is still being numbered gets a later number, so all records after it
+        stay in their buffers for the next merge, with the ones which the other threads append meanwhile
+
+        Returns
+        -------
+        None
+        """
+        limit = next(self.sequence)
+        batches = list()
+        for buffer in self.buffers:
+            size = 0
+            for record in buffer:
+                if record[0] is None or record[0] > limit:
+                    break
+                size += 1
+            if size > 0:
+                batches.append(buffer[:size])
+                del buffer[:size]
+        for _, method, args in heapq.merge(*batches, key=itemgetter(0)):
+            method(self, *args)
+
+    def retire(self, pending: List[list]) -> None:
+        """This method merges the records of a thread which ended and forgets its buffer
+
+        Parameters
+        ----------
+        pending: List[list]
+            The buffer of the thread
+
+        Returns
+        -------
+        None
+        """
+        with self.lock:
+            self.merge()
+            self.buffers = [buffer for buffer in self.buffers if buffer is not pending]
+
+    def record_read(self, line_number: int, read_variables: List[str], attribute_name: str) -> None:
+        """This method defers Slice.record_read to the next merge of the buffers
+
+        Returns
+        -------
+        None
+        """
+        self.defer(Slice.record_read, (line_number, read_variables, attribute_name))
+
+    def record_write(self, line_number: int, variable_name: str, property_name: str, index: str, type_name: str,
+                     reference: Tuple[str, str]) -> None:
+        """This method defers Slice.record_write to the next merge of the buffers
+
+        Returns
+        -------
+        None
+        """
+        self.defer(Slice.record_write, (line_number, variable_name, property_name, index, type_name, reference))
+
+    def record_augmented_assignment(self, line_number: int, variable_name: str, property_name: str, index: str) -> None:
+        """This method defers Slice.record_augmented_assignment to the next merge of the buffers
+
+        Returns
+        -------
+        None
+        """
+        self.defer(Slice.record_augmented_assignment, (line_number, variable_name, property_name, index))
+
+    def record_attribute_read(self, line_number: int, variable_name: str, attribute_name: str, is_method: bool) -> None:
+        """This method defers Slice.record_attribute_read to the next merge of the buffers
+
+        Returns
+        -------
+        None
+        """
+        self.defer(Slice.record_attribute_read, (line_number, variable_name, attribute_name, is_method))
+
+    def record_subscript_read(self, line_number: int, variable_name: str, key: str) -> None:
+        """This method defers Slice.record_subscript_read to the next merge of the buffers
+
+        Returns
+        -------
+        None
+        """
+        self.defer(Slice.record_subscript_read, (line_number, variable_name, key))
+
+    def record_return(self, call_site: int, line_number: int) -> None:
+        """This method defers Slice.record_return to the next merge of the buffers
+
+        Returns
+        -------
+        None
+        """
+        self.defer(Slice.record_return, (call_site, line_number))
+
+    def record_branch(self, key: Tuple, line_number: int) -> None:
+        """This method marks the branch as taken in the current thread at once, and defers the update of
+        lines_info to the next merge of the buffers. The merge may run in another thread, or in a thread which
+        ends, so the deferred record does not touch the state of the current thread
+
+        Returns
+        -------
+        None
+        """
+        self.taken_branches.add(key)
+        self.defer(Slice.record_header, (line_number, ))
@@ -1,4 +1,5 @@
-from typing import Dict, List
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, Iterator, List, MutableMapping, Optional, Set, Tuple, Union
 import libcst as cst
 from libcst._nodes.statement import SimpleStatementLine, BaseStatement, For, If, Else, While
 from libcst.metadata import (
@@ -7,26 +8,9 @@ from libcst.metadata import (
 )
 import libcst.matchers as m
 
-class ControlFlowMetaData():
-    """
-    This class stores meta-data about a control flow 
-
-    Attributes
-    ----------
-    start_line : int
-        Start line number of control-flow
-
-    iid : int
-        Unique number that dyna-pyt assigns to the control-flow
-    -------
-    """
-    start_line: int
-    iid: int
-
-    def __init__(self, start_line: int, iid: int) -> None:
-        self.start_line = start_line
-        self.iid = iid
-
+# A node of the dependence graph is a line of a code file, packed into one int: file_id * FILE_STRIDE + line. The
+# code file of the sliced function has file id 0, so its nodes are its line numbers
+FILE_STRIDE = 1000000
 
 class ElementMetaData():
     """
@@ -133,6 +117,247 @@ class LineMetaData():
         self.slice_computed = False
 
 
+class SamplingPolicy():
+    """
+    This class decides which invocations of the sliced function are analyzed. If a single invocation is selected
+    (the first, the last or the n-th one), only that invocation is analyzed. Otherwise an invocation is sampled if it
+    is one in every `rate` invocations and the time budget is not spent yet, and the slices of all sampled
+    invocations are merged into one graph.
+
+    Attributes
+    ----------
+    invocation : Union[str, int]
+        "first", "last", the number (starting at 1) of the invocation to analyze, or None to sample invocations
+
+    rate : int
+        Every rate-th invocation is sampled, 1 samples every invocation
+
+    time_budget : float
+        Seconds of execution that may be analyzed in total, None for no limit
+
+    invocations : int
+        The number of invocations seen so far
+
+    sampled : List[int]
+        The numbers (starting at 1) of the sampled invocations
+
+    spent_time : float
+        Seconds spent inside sampled invocations so far
+    -------
+    """
+    invocation: Union[str, int]
+    rate: int
+    time_budget: float
+    invocations: int
+    sampled: List[int]
+    spent_time: float
+
+    def __init__(self, rate: int = 1, time_budget: float = None, invocation: Union[str, int] = None) -> None:
+        """
+        Parameters
+        ----------
+        rate: int
+            Every rate-th invocation is sampled, 1 samples every invocation
+
+        time_budget: float
+            Seconds of execution that may be analyzed in total, None for no limit
+
+        invocation: Union[str, int]
+            "first", "last", the number (starting at 1) of the invocation to analyze, or None to sample invocations
+        """
+        if rate < 1:
+            raise ValueError("sampling rate must be at least 1")
+        if invocation not in (None, "first", "last") and not (isinstance(invocation, int) and invocation >= 1):
+            raise ValueError(f"invalid invocation selection: {invocation}")
+        self.invocation = 1 if invocation == "first" else invocation
+        self.rate = rate
+        self.time_budget = time_budget
+        self.reset()
+
+    def reset(self) -> None:
+        """ Forgets the invocations seen so far, the selection stays the same
+
+        Returns
+        ----------
+        None
+        """
+        self.invocations = 0
+        self.sampled = list()
+        self.spent_time = 0.0
+
+    def sample(self) -> bool:
+        """ Counts a new invocation and decides whether it should be analyzed
+
+        Returns
+        ----------
+        bool
+            True if the invocation is sampled
+        """
+        self.invocations += 1
+        if self.invocation == "last" or self.invocations == self.invocation:
+            self.sampled.append(self.invocations)
+            return True
+        if self.invocation is not None:
+            return False
+        if (self.invocations - 1) % self.rate != 0:
+            return False
+        if self.time_budget is not None and self.spent_time >= self.time_budget:
+            return False
+        self.sampled.append(self.invocations)
+        return True
+
+    def record(self, elapsed: float) -> None:
+        """ Adds the duration of a sampled invocation to the spent time
+
+        Parameters
+        ----------
+        elapsed: float
+            Duration of the sampled invocation in seconds
+
+        Returns
+        ----------
+        None
+        """
+        self.spent_time += elapsed
+
+    def keeps_previous(self) -> bool:
+        """ Checks whether the dependencies of earlier sampled invocations are kept when a new one starts
+
+        Returns
+        ----------
+        bool
+            False if only the last invocation is analyzed, True otherwise
+        """
+        return self.invocation != "last"
+
+    def finished(self) -> bool:
+        """ Checks whether no later invocation can be sampled anymore
+
+        Returns
+        ----------
+        bool
+            True if the selected invocation has been analyzed or the time budget is spent
+        """
+        if isinstance(self.invocation, int):
+            return self.invocations >= self.invocation
+        if self.invocation is None and self.time_budget is not None:
+            return self.spent_time >= self.time_budget
+        return False
+
+
+class LRUCache(MutableMapping):
+    """
+    This class is a dictionary with a capacity: when a new key would exceed it, the least recently used entry is
+    evicted. Reading or writing a key makes it the most recently used one.
+
+    Attributes
+    ----------
+    capacity : int
+        The maximal number of entries
+
+    entries : OrderedDict
+        The entries, from the least to the most recently used one
+    -------
+    """
+    capacity: int
+    entries: OrderedDict
+
+    def __init__(self, capacity: int) -> None:
+        """
+        Parameters
+        ----------
+        capacity: int
+            The maximal number of entries
+        """
+        if capacity < 1:
+            raise ValueError("capacity must be at least 1")
+        self.capacity = capacity
+        self.entries = OrderedDict()
+
+    def __getitem__(self, key: Hashable) -> Any:
+        value = self.entries[key]
+        self.entries.move_to_end(key)
+        return value
+
+    def __setitem__(self, key: Hashable, value: Any) -> None:
+        self.entries[key] = value
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.capacity:
+            self.entries.popitem(last=False)
+
+    def __delitem__(self, key: Hashable) -> None:
+        del self.entries[key]
+
+    def __iter__(self) -> Iterator[Hashable]:
+        return iter(self.entries)
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    def __contains__(self, key: Hashable) -> bool:
+        return key in self.entries
+
+
+class FileCache(LRUCache):
+    """
+    This class is the cache of the syntax trees and the IIDs of the analyzed code files. The entries which are loaded
+    from disk with load are evicted when the capacity is exceeded and loaded again on the next access. The entries
+    which are set from outside, e.g. the files instrumented in memory, cannot be loaded again, so they are pinned.
+
+    Attributes
+    ----------
+    pinned : Set[Hashable]
+        The keys which are never evicted
+    -------
+    """
+    pinned: Set[Hashable]
+
+    def __init__(self, capacity: Optional[int] = None) -> None:
+        """
+        Parameters
+        ----------
+        capacity: Optional[int]
+            The maximal number of entries which are loaded from disk, None for no limit
+        """
+        super(FileCache, self).__init__(capacity if capacity is not None else 1)
+        self.capacity = capacity
+        self.pinned = set()
+
+    def __setitem__(self, key: Hashable, value: Any) -> None:
+        self.pinned.add(key)
+        self.entries[key] = value
+        self.entries.move_to_end(key)
+
+    def __delitem__(self, key: Hashable) -> None:
+        self.pinned.discard(key)
+        del self.entries[key]
+
+    def load(self, key: Hashable, value: Any) -> None:
+        """ Adds an entry which can be loaded again, and evicts the least recently used ones of them if the
+        capacity is exceeded
+
+        Parameters
+        ----------
+        key: Hashable
+            The path to the code file
+
+        value: Any
+            The syntax tree and the IIDs
+
+        Returns
+        ----------
+        None
+        """
+        self.pinned.discard(key)
+        self.entries[key] = value
+        self.entries.move_to_end(key)
+        if self.capacity is None:
+            return
+        evictable = [entry for entry in self.entries if entry not in self.pinned]
+        for entry in evictable[:max(0, len(evictable) - self.capacity)]:
+            del self.entries[entry]
+
+
 class OddIfNegation(m.MatcherDecoratableTransformer):
     """
     Negate the test of every if statement on an odd line.
@@ -344,6 +569,41 @@ class CommentFinder(cst.CSTVisitor):
             location = self.get_metadata(PositionProvider, node)
             self.line_number = location.start.line
 
+def node_id(file_id: int, line_number: int) -> int:
+    """ This method returns the node of a line of a code file in the dependence graph
+
+    Parameters
+    ----------
+    file_id: int
+        The id of the code file, 0 for the file of the sliced function
+
+    line_number: int
+        The line number
+
+    Returns
+    ----------
+    int
+        The node
+    """
+    return file_id * FILE_STRIDE + line_number
+
+
+def node_location(node: int) -> Tuple[int, int]:
+    """ This method returns the code file and the line of a node of the dependence graph
+
+    Parameters
+    ----------
+    node: int
+        The node
+
+    Returns
+    ----------
+    Tuple[int, int]
+        The id of the code file and the line number
+    """
+    return divmod(node, FILE_STRIDE)
+
+
 def remove_lines(code: str, lines_to_keep: List[int], slice_start_line: int, slice_end_line: int) -> str:
     """ This method accepts a code and an array of lines which refers to the lines that should be kept, and
     returns the new code after traversing the AST and removing the specified lines. 
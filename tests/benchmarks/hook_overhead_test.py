@@ -0,0 +1,192 @@
+import gc
+import sys
+from functools import wraps
+from time import perf_counter_ns
+from typing import Any, Dict, List, Tuple, Type
+import pytest
+from dynapyt.analyses.BaseAnalysis import BaseAnalysis
+from dynamicslicing.session import AnalysisSession
+from dynamicslicing.slice import Slice
+from dynamicslicing.slice_dataflow import SliceDataflow
+
+# A program which triggers every hook inside slice_me at least once
+PROGRAM = '''class Point:
+    def __init__(self, x, y):
+        self.x = x
+        self.y = y
+
+
+def slice_me():
+    point = Point(1, 2)
+    values = [1, 2, 3]
+    table = {"a": 1}
+    total = 0
+    for value in values:
+        if value > 1:
+            total += value
+    while total > 4:
+        total -= 1
+    point.x = total
+    values.append(point.y)
+    first = values[0] + table["a"]
+    result = point.x + first  # slicing criterion
+    return result
+
+
+slice_me()
+'''
+
+# The benchmarked hooks. function_enter and function_exit are measured as one event, since the analysis of an
+# invocation starts in the first and stops in the second
+HOOKS = ["read", "write", "augmented_assignment", "read_attribute", "read_subscript", "enter_if", "enter_for",
+         "enter_while", ("function_enter", "function_exit")]
+# A hook is measured over EVENTS_PER_HOOK events, or fewer if they take more than TIME_BUDGET seconds
+EVENTS_PER_HOOK = 2000
+TIME_BUDGET = 0.2
+
+
+def recording_class(analysis_class: Type[BaseAnalysis], events: List[Tuple[str, Tuple]]) -> Type[BaseAnalysis]:
+    """ This method returns a subclass of an analysis which records its hook calls while it analyzes slice_me. The
+    docstrings are kept, since dynapyt reads the hook filters from them
+
+    Parameters
+    ----------
+    analysis_class: Type[BaseAnalysis]
+        The analysis
+
+    events: List[Tuple[str, Tuple]]
+        Receives the hook and the arguments of every recorded call, in order
+
+    Returns
+    ----------
+    Type[BaseAnalysis]
+        The recording subclass
+    """
+    def record(hook: str) -> Any:
+        method = getattr(analysis_class, hook)
+
+        @wraps(method)
+        def recorded(self, *args):
+            if hook == "function_enter" or hook == "function_exit":
+                if (args[3] if hook == "function_enter" else args[2]) == self.sliced_function_name:
+                    events.append((hook, args))
+            elif self.start_analysis:
+                events.append((hook, args))
+            return method(self, *args)
+        return recorded
+
+    hooks = [name for hook in HOOKS for name in (hook if isinstance(hook, tuple) else (hook, ))]
+    return type("Recording" + analysis_class.__name__, (analysis_class, ),
+                {hook: record(hook) for hook in hooks if hasattr(analysis_class, hook)})
+
+
+def calibrate() -> float:
+    """ This method measures a plain call of a Python function with three arguments, the unit of the baseline, so
+    that baselines measured on different machines stay comparable
+
+    Returns
+    ----------
+    float
+        Nanoseconds per call
+    """
+    def call(a, b, c):
+        return a
+    best = None
+    for _ in range(5):
+        start = perf_counter_ns()
+        for _ in range(EVENTS_PER_HOOK * 10):
+            call(1, 2, 3)
+        elapsed = (perf_counter_ns() - start) / (EVENTS_PER_HOOK * 10)
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def measure(analysis: BaseAnalysis, calls: List[List[Tuple[str, Tuple]]]) -> Tuple[float, float]:
+    """ This method replays the recorded events of a hook on an analysis, round robin, EVENTS_PER_HOOK times or
+    until TIME_BUDGET is spent
+
+    Parameters
+    ----------
+    analysis: BaseAnalysis
+        The analysis, in the state which the events expect
+
+    calls: List[List[Tuple[str, Tuple]]]
+        The recorded events, every event is a list of (hook, arguments) calls
+
+    Returns
+    ----------
+    Tuple[float, float]
+        Nanoseconds and allocated memory blocks (still alive after the loop) per event
+    """
+    methods = [[(getattr(analysis, hook), args) for hook, args in event] for event in calls]
+    budget = TIME_BUDGET * 1e9
+    count = 0
+    gc.collect()
+    gc.disable()
+    try:
+        blocks = sys.getallocatedblocks()
+        start = perf_counter_ns()
+        while count < EVENTS_PER_HOOK and (count < len(methods) or perf_counter_ns() - start < budget):
+            for method, args in methods[count % len(methods)]:
+                method(*args)
+            count += 1
+        elapsed = perf_counter_ns() - start
+        blocks = sys.getallocatedblocks() - blocks
+    finally:
+        gc.enable()
+    return elapsed / count, blocks / count
+
+
+@pytest.fixture(scope="module")
+def calibration() -> float:
+    return calibrate()
+
+
+@pytest.fixture(scope="module")
+def recordings(tmp_path_factory) -> Dict[Type[BaseAnalysis], Tuple[AnalysisSession, List[Tuple[str, Tuple]]]]:
+    program_path = tmp_path_factory.mktemp("hooks") / "program.py"
+    program_path.write_text(PROGRAM)
+    recordings = dict()
+    for analysis_class in (Slice, SliceDataflow):
+        events = list()
+        session = AnalysisSession(recording_class(analysis_class, events))
+        response = session.run(str(program_path))
+        assert response["status"] == "ok", response.get("error")
+        recordings[analysis_class] = (session, events)
+    return recordings
+
+
+@pytest.mark.benchmark
+@pytest.mark.parametrize("analysis_class", [Slice, SliceDataflow], ids=lambda c: c.__name__)
+@pytest.mark.parametrize("hook", HOOKS, ids=lambda h: "+".join(h) if isinstance(h, tuple) else h)
+def test_hook_overhead(analysis_class, hook, recordings, calibration, hook_benchmarks, request):
+    session, events = recordings[analysis_class]
+    names = tuple(name for name in (hook if isinstance(hook, tuple) else (hook, )) if hasattr(analysis_class, name))
+    if len(names) == 0:
+        pytest.skip(f"{analysis_class.__name__} has no {hook} hook")
+    calls = [list(zip(names, arguments))
+             for arguments in zip(*[[args for name_, args in events if name_ == name] for name in names])]
+    assert len(calls) > 0, f"slice_me did not trigger {names}"
+
+    # A fresh analysis is brought into the state which the events expect by replaying the recorded run: up to the
+    # exit of slice_me for the data and branch hooks, the whole run for the function hooks
+    analysis = analysis_class(session.analysis.source_path)
+    analysis.asts = session.analysis.asts
+    if hasattr(analysis, "bytecode_tables"):
+        analysis.bytecode_tables = session.analysis.bytecode_tables
+    for name, args in events:
+        if name == "function_exit" and "function_enter" not in names:
+            break
+        getattr(analysis, name)(*args)
+    nanoseconds, blocks = measure(analysis, calls)
+
+    name = "+".join(names)
+    relative = nanoseconds / calibration
+    hook_benchmarks[analysis_class.__name__][name] = {"ns_per_event": round(nanoseconds, 1),
+                                                      "blocks_per_event": round(blocks, 3),
+                                                      "relative": round(relative, 2)}
+    baseline = request.config.hook_baseline.get(analysis_class.__name__, {}).get(name)
+    threshold = request.config.getoption("benchmark_threshold")
+    if baseline is not None and relative > baseline["relative"] * threshold:
+        pytest.fail(f"{analysis_class.__name__}.{name} costs {relative:.1f} calls per event, more than {threshold} "
+                    f"times its baseline of {baseline['relative']:.1f}")
@@ -0,0 +1,159 @@
+import argparse
+import csv
+import io
+import platform
+import tracemalloc
+from contextlib import redirect_stdout
+from datetime import datetime, timezone
+from os import path
+from tempfile import TemporaryDirectory
+from time import perf_counter
+from typing import Any, Dict, List
+from dynamicslicing.session import AnalysisSession
+from dynamicslicing.slice import Slice
+from dynamicslicing.slice_dataflow import SliceDataflow
+from program_generator import generate_program
+
+# The default value of every dimension, and the values it takes when it grows
+DEFAULTS = {"statements": 10, "trip_count": 3, "depth": 1, "variables": 4, "container_size": 4, "aliases": 1}
+DIMENSIONS = {"statements": [10, 20, 40, 80, 160],
+              "trip_count": [3, 10, 30, 100, 300],
+              "depth": [1, 2, 3, 4],
+              "variables": [4, 8, 16, 32, 64],
+              "container_size": [4, 16, 64, 256, 1024],
+              "aliases": [1, 4, 16, 64]}
+ANALYSES = {"slice": Slice, "dataflow": SliceDataflow}
+COLUMNS = ["timestamp", "python", "analysis", "dimension", "value", "source_lines", "execution_seconds",
+           "slicing_seconds", "overhead", "peak_bytes", "slice_lines", "status"]
+
+
+def execute(source: str) -> float:
+    """ This method runs a program without any analysis
+
+    Parameters
+    ----------
+    source: str
+        The source of the program
+
+    Returns
+    ----------
+    float
+        The seconds of the execution
+    """
+    code = compile(source, "program.py", "exec")
+    start = perf_counter()
+    with redirect_stdout(io.StringIO()):
+        exec(code, {"__name__": "__main__"})
+    return perf_counter() - start
+
+
+def measure(analysis: str, dimension: str, value: int, directory: str) -> Dict[str, Any]:
+    """ This method generates the program of a point of a dimension and slices it end to end: instrumentation,
+    execution under the analysis and slice. The peak memory is measured in a second run with tracemalloc, which
+    would distort the time
+
+    Parameters
+    ----------
+    analysis: str
+        The name of the analysis, a key of ANALYSES
+
+    dimension: str
+        The dimension which grows, a key of DIMENSIONS
+
+    value: int
+        The value of the dimension, the others keep their default
+
+    directory: str
+        The directory to write the program to
+
+    Returns
+    ----------
+    Dict[str, Any]
+        The row of the CSV file
+    """
+    arguments = dict(DEFAULTS, **{dimension: value})
+    source = generate_program(**arguments)
+    program_path = path.join(directory, f"{analysis}_{dimension}_{value}.py")
+    with open(program_path, "w") as file:
+        file.write(source)
+
+    execution_seconds = execute(source)
+    start = perf_counter()
+    response = AnalysisSession(ANALYSES[analysis]).run(program_path)
+    slicing_seconds = perf_counter() - start
+    tracemalloc.start()
+    try:
+        AnalysisSession(ANALYSES[analysis]).run(program_path)
+        _, peak_bytes = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    slice_lines = None
+    if response["status"] == "ok":
+        slice_lines = len(next(iter(response["slices"].values())))
+    return {"analysis": analysis, "dimension": dimension, "value": value,
+            "source_lines": source.count("\n"), "execution_seconds": round(execution_seconds, 6),
+            "slicing_seconds": round(slicing_seconds, 6),
+            "overhead": round(slicing_seconds / execution_seconds, 1) if execution_seconds > 0 else None,
+            "peak_bytes": peak_bytes, "slice_lines": slice_lines, "status": response["status"]}
+
+
+def run(analyses: List[str], dimensions: List[str], output: str) -> List[Dict[str, Any]]:
+    """ This method grows every dimension in turn and appends one row per point to the CSV file, so that the file
+    tracks the results over time
+
+    Parameters
+    ----------
+    analyses: List[str]
+        The names of the analyses
+
+    dimensions: List[str]
+        The dimensions to grow
+
+    output: str
+        The path of the CSV file, the header is written if it does not exist
+
+    Returns
+    ----------
+    List[Dict[str, Any]]
+        The rows
+    """
+    timestamp = datetime.now(timezone.utc).isoformat(timespec="seconds")
+    rows: List[Dict[str, Any]] = []
+    exists = path.exists(output)
+    with TemporaryDirectory() as directory, open(output, "a", newline="") as file:
+        writer = csv.DictWriter(file, COLUMNS)
+        if exists == False:
+            writer.writeheader()
+        for analysis in analyses:
+            for dimension in dimensions:
+                for value in DIMENSIONS[dimension]:
+                    row = dict(timestamp=timestamp, python=platform.python_version(),
+                               **measure(analysis, dimension, value, directory))
+                    writer.writerow(row)
+                    file.flush()
+                    print(f"{analysis:<10}{dimension:<16}{value:>6}{row['slicing_seconds']:>12.3f} s"
+                          f"{row['peak_bytes'] / 1e6:>10.1f} MB{row['slice_lines'] or 0:>6} lines  {row['status']}")
+                    rows.append(row)
+    return rows
+
+
+def main() -> None:
+    """ This method runs the macro-benchmark from the command line
+
+    Returns
+    ----------
+    None
+    """
+    parser = argparse.ArgumentParser(description="Measure how slicing scales with the size of generated programs")
+    parser.add_argument("--analysis", choices=list(ANALYSES), action="append", default=None,
+                        help="The analysis to measure, may be repeated. slice by default")
+    parser.add_argument("--dimension", choices=list(DIMENSIONS), action="append", default=None,
+                        help="The dimension to grow, may be repeated. All dimensions by default")
+    parser.add_argument("--output", default="macro_benchmark.csv", help="The CSV file the rows are appended to")
+    arguments = parser.parse_args()
+    run(arguments.analysis or ["slice"], arguments.dimension or list(DIMENSIONS), arguments.output)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,93 @@
+from random import Random
+from typing import List
+
+HEADER = '''class Node:
+    def __init__(self, value):
+        self.value = value
+
+
+def slice_me():
+'''
+
+FOOTER = '''    return result
+
+
+slice_me()
+'''
+
+
+def generate_program(statements: int = 10, trip_count: int = 3, depth: int = 1, variables: int = 4,
+                     container_size: int = 4, aliases: int = 1, seed: int = 0) -> str:
+    """ This method generates a slice_me program of a controlled size, shaped like the programs of tests/milestone3:
+    scalar variables, a list, and an object which is reached through several aliases, which are read and written by
+    random statements inside nested loops. The last line of slice_me is the slicing criterion and reads every
+    variable, so the slice grows with the program
+
+    Parameters
+    ----------
+    statements: int
+        The number of statements in the body of the innermost loop
+
+    trip_count: int
+        The number of iterations of every loop
+
+    depth: int
+        The number of nested loops, 0 runs the statements once
+
+    variables: int
+        The number of scalar variables
+
+    container_size: int
+        The number of elements of the list
+
+    aliases: int
+        The number of variables which refer to the same object
+
+    seed: int
+        The seed of the random statements, the same arguments always give the same program
+
+    Returns
+    ----------
+    str
+        The source of the program
+    """
+    random = Random(seed)
+    lines: List[str] = []
+    for variable in range(variables):
+        lines.append(f"v{variable} = {variable}")
+    lines.append(f"items = list(range({container_size}))")
+    lines.append("node = Node(0)")
+    for alias in range(aliases):
+        lines.append(f"a{alias} = node")
+
+    indent = ""
+    for level in range(depth):
+        lines.append(f"{indent}for i{level} in range({trip_count}):")
+        indent += "    "
+    counters = [f"i{level}" for level in range(depth)] or ["1"]
+    for _ in range(statements):
+        target = f"v{random.randrange(variables)}"
+        left = f"v{random.randrange(variables)}"
+        right = f"v{random.randrange(variables)}"
+        index = random.randrange(container_size)
+        alias = f"a{random.randrange(aliases)}"
+        kind = random.randrange(7)
+        if kind == 0:
+            lines.append(f"{indent}{target} = ({left} + {right}) % 1000")
+        elif kind == 1:
+            lines.append(f"{indent}{target} += {random.choice(counters)}")
+        elif kind == 2:
+            lines.append(f"{indent}items[{index}] = {left}")
+        elif kind == 3:
+            lines.append(f"{indent}{target} = items[{index}] + {left}")
+        elif kind == 4:
+            lines.append(f"{indent}{alias}.value = {left}")
+        elif kind == 5:
+            lines.append(f"{indent}{target} = ({alias}.value + {left}) % 1000")
+        else:
+            lines.append(f"{indent}if {left} > {right}:")
+            lines.append(f"{indent}    {target} = {right} - 1")
+
+    values = [f"v{variable}" for variable in range(variables)] + ["sum(items)", "node.value"]
+    lines.append(f"result = {' + '.join(values)}  # slicing criterion")
+    return HEADER + "".join(f"    {line}\n" for line in lines) + FOOTER
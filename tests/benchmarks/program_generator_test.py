@@ -0,0 +1,21 @@
+import pytest
+from dynamicslicing.session import AnalysisSession
+from dynamicslicing.slice import Slice
+from dynamicslicing.slice_dataflow import SliceDataflow
+from program_generator import generate_program
+
+
+@pytest.mark.parametrize("analysis_class", [Slice, SliceDataflow], ids=lambda c: c.__name__)
+@pytest.mark.parametrize("arguments", [dict(), dict(depth=0), dict(depth=2, trip_count=2, aliases=3),
+                                       dict(statements=20, trip_count=1, variables=8, container_size=8)],
+                         ids=["default", "flat", "nested", "wide"])
+def test_generated_program(analysis_class, arguments, tmp_path):
+    source = generate_program(**arguments)
+    assert source == generate_program(**arguments)
+    program_path = tmp_path / "program.py"
+    program_path.write_text(source)
+    response = AnalysisSession(analysis_class).run(str(program_path))
+    assert response["status"] == "ok", response.get("error")
+    criterion, lines = next(iter(response["slices"].items()))
+    assert int(criterion) in lines
+    compile(response["sliced"][criterion], "sliced.py", "exec")
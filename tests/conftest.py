@@ -1,5 +1,32 @@
-from os import walk
-from os.path import realpath, dirname, sep
+import json
+from collections import defaultdict
+from os import listdir, walk
+from os.path import realpath, dirname, exists, join, sep
+import pytest
+
+BENCHMARK_BASELINE = join(dirname(realpath(__file__)), "benchmarks", "hook_baseline.json")
+MILESTONE3 = join(dirname(realpath(__file__)), "milestone3")
+
+
+def original_program(directory: str) -> str:
+    """ This method reads the uninstrumented program of a micro-test, which the test runner may have instrumented
+
+    Parameters
+    ----------
+    directory: str
+        The directory of the micro-test
+
+    Returns
+    ----------
+    str
+        The code of the program
+    """
+    with open(join(directory, "program.py"), "r") as file:
+        code = file.read()
+    if "DYNAPYT: DO NOT INSTRUMENT" in code and exists(join(directory, "program.py.orig")):
+        with open(join(directory, "program.py.orig"), "r") as file:
+            code = file.read()
+    return code
 
 
 def pytest_addoption(parser):
@@ -9,9 +36,80 @@ def pytest_addoption(parser):
         default=None,
         help="Run only the test in the specified directory",
     )
+    parser.addoption(
+        "--benchmark",
+        action="store_true",
+        default=False,
+        help="Run the hook benchmarks, which are skipped by default",
+    )
+    parser.addoption(
+        "--benchmark-baseline",
+        action="store",
+        default=BENCHMARK_BASELINE,
+        help="JSON file with the baseline cost of every hook",
+    )
+    parser.addoption(
+        "--benchmark-threshold",
+        action="store",
+        type=float,
+        default=3.0,
+        help="Fail a hook benchmark when the hook costs more than this many times its baseline",
+    )
+    parser.addoption(
+        "--benchmark-report",
+        action="store",
+        default=None,
+        help="Write the measured cost of every hook to this JSON file, e.g. to update the baseline",
+    )
+
+
+def pytest_configure(config):
+    config.addinivalue_line("markers", "benchmark: a timing benchmark, which only runs with --benchmark")
+    baseline = config.getoption("benchmark_baseline")
+    config.hook_baseline = {}
+    if exists(baseline):
+        with open(baseline, "r") as file:
+            config.hook_baseline = json.load(file)
+    config.hook_benchmarks = defaultdict(dict)
+
+
+def pytest_collection_modifyitems(config, items):
+    if config.getoption("benchmark"):
+        return
+    skip_benchmark = pytest.mark.skip(reason="benchmarks only run with --benchmark")
+    for item in items:
+        if "benchmark" in item.keywords:
+            item.add_marker(skip_benchmark)
+
+
+@pytest.fixture(scope="session")
+def hook_benchmarks(request):
+    return request.config.hook_benchmarks
+
+
+def pytest_terminal_summary(terminalreporter, config):
+    if len(config.hook_benchmarks) == 0:
+        return
+    terminalreporter.section("hook overhead")
+    terminalreporter.write_line(f"{'hook':<44}{'ns/event':>12}{'blocks/event':>14}{'relative':>10}")
+    for analysis, hooks in sorted(config.hook_benchmarks.items()):
+        for hook, cost in sorted(hooks.items()):
+            terminalreporter.write_line(f"{analysis + '.' + hook:<44}{cost['ns_per_event']:>12.1f}"
+                                        f"{cost['blocks_per_event']:>14.3f}{cost['relative']:>10.2f}")
+    report = config.getoption("benchmark_report")
+    if report is not None:
+        with open(report, "w") as file:
+            json.dump(config.hook_benchmarks, file, indent=2, sort_keys=True)
 
 
 def pytest_generate_tests(metafunc):
+    if "milestone3_program" in metafunc.fixturenames:
+        # the uninstrumented program of every micro-test in milestone3, for the tests which compare analyses on them
+        test_names = sorted(name for name in listdir(MILESTONE3) if exists(join(MILESTONE3, name, "program.py")))
+        metafunc.parametrize("milestone3_program", [original_program(join(MILESTONE3, name)) for name in test_names],
+                             ids=test_names)
+    if "directory_pair" not in metafunc.fixturenames:
+        return
     # find all subdirectories that contain a micro-test
     directories = []
     selection = metafunc.config.getoption("only", default=None, skip=False)
@@ -0,0 +1,18 @@
+def slice_me():
+    total = 0
+    limit = 3
+    skipped = 0
+    for i in range(10):
+        if i > limit:
+            break
+        if i == 1:
+            skipped += 1
+            continue
+        total += i
+    count = 5
+    if total > 100:
+        return total
+    result = count + total # slicing criterion
+    return result
+
+slice_me()
\ No newline at end of file
@@ -0,0 +1,70 @@
+import json
+import sys
+from dynamicslicing import batch
+from dynamicslicing.batch import find_programs, slice_programs
+
+PROGRAM = '''def slice_me():
+    a = 1
+    b = 2
+    result = a  # slicing criterion
+    return result
+
+
+slice_me()
+'''
+
+FAILING = '''def slice_me():
+    a = 1
+    result = a  # slicing criterion
+    raise ValueError("failed")
+
+
+slice_me()
+'''
+
+
+def write_programs(directory):
+    """ This method writes a directory which is shaped like tests/milestone3 """
+    for name, code in [("test_1", PROGRAM), ("test_2", "def slice_me(:\n"), ("test_3", FAILING)]:
+        (directory / name).mkdir()
+        (directory / name / "program.py").write_text(code)
+    (directory / "notes").mkdir()
+    (directory / "notes" / "other.py").write_text(PROGRAM)
+    return find_programs(str(directory))
+
+
+def test_find_programs(tmp_path):
+    assert write_programs(tmp_path) == [str(tmp_path / name / "program.py") for name in ("test_1", "test_2", "test_3")]
+
+
+def test_report(tmp_path):
+    program_paths = write_programs(tmp_path)
+    report = slice_programs(program_paths, processes=2, cache_directory=str(tmp_path / "cache"))
+    assert report["processes"] == 2 and report["seconds"] > 0
+    assert [program["program"] for program in report["programs"]] == program_paths
+    sliced, broken, failing = report["programs"]
+    assert sliced["status"] == "ok"
+    assert sliced["slices"] == {"4": [2, 4]}
+    assert sliced["sliced"]["4"] == "def slice_me():\n    a = 1\n    result = a  # slicing criterion\n\n\nslice_me()\n"
+    assert sliced["seconds"]["instrument"] >= 0 and sliced["seconds"]["slice"] >= 0
+    # A program which cannot be instrumented is not sliced
+    assert broken["status"] == "error" and broken["seconds"]["slice"] is None
+    assert broken["error"].endswith("could not be instrumented")
+    # A program which raises is sliced as far as it ran
+    assert failing["status"] == "ok" and failing["exit"] == "ValueError: failed"
+    assert failing["slices"] == {"3": [2, 3]}
+    assert sliced["exit"] is None
+    # The programs were instrumented into the cache directory
+    assert len(list((tmp_path / "cache").iterdir())) == 2
+
+
+def test_main_writes_report(tmp_path, monkeypatch):
+    (tmp_path / "programs").mkdir()
+    write_programs(tmp_path / "programs")
+    monkeypatch.setattr(sys, "argv", ["batch", str(tmp_path / "programs"), "--processes", "1",
+                                      "--report", str(tmp_path / "report.json")])
+    batch.main()
+    with open(tmp_path / "report.json") as file:
+        report = json.load(file)
+    assert report["processes"] == 1
+    assert [program["status"] for program in report["programs"]] == ["ok", "error", "ok"]
@@ -0,0 +1,93 @@
+import pytest
+from dynamicslicing.bytecode import BYTECODE_POSITIONS_AVAILABLE, BytecodeTable, Store
+from dynamicslicing.session import AnalysisSession
+
+pytestmark = pytest.mark.skipif(BYTECODE_POSITIONS_AVAILABLE == False,
+                                reason="requires the positions of instructions (Python 3.11+)")
+
+SOURCE = '''def f(p, items):
+    a, (b, *c) = items
+    p.x.y = a
+    d = p.x.y
+    m = {"k": 1}
+    m["k"] = b
+    m[a] = 2
+    e = m["k"] + m[a]
+    f = e
+    g = [v * 2 for v in c]
+    return g
+'''
+
+
+@pytest.fixture(scope="module")
+def table() -> BytecodeTable:
+    return BytecodeTable.from_source(SOURCE, "program.py")
+
+
+def test_stores(table):
+    assert table.stores_of((2, 4, 2, 22)) == [Store("a", None, None), Store("b", None, None), Store("c", None, None)]
+    assert table.stores_of((3, 4, 3, 13)) == [Store("p.x", "y", None)]
+    assert table.stores_of((6, 4, 6, 14)) == [Store("m", None, "k")]
+    assert table.stores_of((7, 4, 7, 12)) == [Store("m", None, "a")]
+    # The variable of the comprehension is not a store of the line
+    assert table.stores_of((10, 4, 10, 26)) == [Store("g", None, None)]
+
+
+def test_loads(table):
+    assert table.name_load((3, 12, 3, 13)) == ("a", None)
+    assert table.name_load((3, 4, 3, 5)) == ("p", "x")
+    assert table.name_load((4, 8, 4, 9)) == ("p", "x")
+    assert table.name_load((5, 4, 5, 5)) is None
+    assert table.attribute_loads[(4, 8, 4, 13)] == ("p.x", "y")
+    assert table.attribute_loads[(4, 8, 4, 11)] == ("p", "x")
+    assert table.subscript_loads[(8, 8, 8, 14)] == ("m", "k")
+    assert table.subscript_loads[(8, 17, 8, 21)] == ("m", "a")
+
+
+def test_reference(table):
+    assert table.reference_of((9, 4, 9, 9)) == ("f", "e")
+    assert table.reference_of((4, 4, 4, 13)) == (None, None)
+    assert table.reference_of((5, 4, 5, 16)) == (None, None)
+
+
+UNPACKING = '''def slice_me():
+    pair = (1, 2)
+    a, b = pair
+    c = b
+    d = a
+    result = c  # slicing criterion
+    return result
+
+
+slice_me()
+'''
+
+
+def test_slice_through_unpacking(tmp_path):
+    program_path = tmp_path / "program.py"
+    program_path.write_text(UNPACKING)
+    session = AnalysisSession()
+    assert session.run(str(program_path))["slices"] == {"6": [2, 3, 4, 6]}
+    assert str(program_path) + ".orig" in session.analysis.bytecode_tables
+
+
+SHADOWED = '''def slice_me():
+    x = 1
+    y = [x for x in range(3)]
+    x = 5
+    z = x + 1  # slicing criterion
+    return z
+
+
+slice_me()
+'''
+
+
+def test_slice_past_a_comprehension_variable(tmp_path):
+    # On Python 3.12+ the comprehension is inlined, only its own stores of x are skipped
+    table = BytecodeTable.from_source(SHADOWED, "program.py")
+    assert table.stores_of((3, 4, 3, 29)) == [Store("y", None, None)]
+    assert table.stores_of((4, 4, 4, 9)) == [Store("x", None, None)]
+    program_path = tmp_path / "program.py"
+    program_path.write_text(SHADOWED)
+    assert AnalysisSession().run(str(program_path))["slices"] == {"5": [4, 5]}
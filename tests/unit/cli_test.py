@@ -0,0 +1,63 @@
+import shutil
+from os.path import dirname, join, realpath
+from dynamicslicing.cli import main
+from dynamicslicing.session import AnalysisSession
+
+PROGRAM = '''def slice_me():
+    a = 1
+    b = 2
+    c = a + b
+    print(c)
+    result = a  # slicing criterion
+    return result
+
+
+slice_me()
+'''
+
+
+def test_cli_writes_sliced_file(tmp_path, capsys):
+    program_path = tmp_path / "program.py"
+    program_path.write_text(PROGRAM)
+    assert main([str(program_path)]) == 0
+    captured = capsys.readouterr()
+    assert captured.out == "3\n"
+    assert "execute" in captured.err and "total" in captured.err
+    assert (tmp_path / "sliced.py").read_text() == AnalysisSession().run(str(program_path))["sliced"]["6"]
+    assert (tmp_path / "sliced.py").read_text() == "def slice_me():\n    a = 1\n    result = a  # slicing criterion\n\n\nslice_me()\n"
+
+
+def test_cli_writes_one_file_per_criterion(tmp_path):
+    program_path = tmp_path / "program.py"
+    program_path.write_text(PROGRAM)
+    output = tmp_path / "out" / "slice.py"
+    output.parent.mkdir()
+    assert main([str(program_path), "--criterion", "4", "--criterion", "6", "--output", str(output)]) == 0
+    assert sorted(entry.name for entry in output.parent.iterdir()) == ["slice-4.py", "slice-6.py"]
+    assert "    b = 2\n" in (output.parent / "slice-4.py").read_text()
+    assert "    b = 2\n" not in (output.parent / "slice-6.py").read_text()
+
+
+def test_cli_writes_sliced_modules(tmp_path):
+    for name in ("main.py", "helper.py"):
+        shutil.copy(join(dirname(realpath(__file__)), "multi_module", name), str(tmp_path))
+    assert main([str(tmp_path / "main.py"), "--module", str(tmp_path / "helper.py")]) == 0
+    assert sorted(entry.name for entry in tmp_path.iterdir() if entry.name.startswith("sliced")) == \
+        ["sliced.py", "sliced_helper.py"]
+    assert "    scaled = helper.scale(base)\n" in (tmp_path / "sliced.py").read_text()
+    assert "    unused = 5\n" not in (tmp_path / "sliced_helper.py").read_text()
+    assert "    return value * factor\n" in (tmp_path / "sliced_helper.py").read_text()
+
+
+def test_cli_missing_program(tmp_path, capsys):
+    assert main([str(tmp_path / "missing.py")]) == 1
+    assert capsys.readouterr().err.startswith("dynamicslicing: ")
+
+
+def test_cli_slices_a_program_which_exits(tmp_path, capsys):
+    program_path = tmp_path / "program.py"
+    program_path.write_text(PROGRAM + "raise SystemExit(3)\n")
+    assert main([str(program_path)]) == 0
+    assert "dynamicslicing: the program stopped with SystemExit: 3" in capsys.readouterr().err
+    assert (tmp_path / "sliced.py").read_text() == \
+        "def slice_me():\n    a = 1\n    result = a  # slicing criterion\n\n\nslice_me()\nraise SystemExit(3)\n"
@@ -0,0 +1,127 @@
+from functools import partial
+import pytest
+from dynamicslicing.context_aware import ContextAwareSlice
+from dynamicslicing.session import AnalysisSession
+from dynamicslicing.slice import Slice
+from dynamicslicing.utils import SamplingPolicy
+
+GENERATORS = '''def slice_me(values):
+    total = 0
+    noise = 0
+    for value in values:
+        if value > 1:
+            total += value
+        else:
+            noise += 1
+        yield total
+    result = total + 1  # slicing criterion
+    yield result
+
+
+first = slice_me([1, 2, 3])
+second = slice_me([0, 1])
+next(first)
+for _ in second:
+    pass
+for _ in first:
+    pass
+'''
+
+SUSPENDED = '''def slice_me(flag):
+    total = 0
+    noise = 0
+    yield total
+    if flag:
+        total += 2
+    yield noise
+    result = total + 1  # slicing criterion
+    yield result
+    yield total
+
+
+first = slice_me(True)
+second = slice_me(False)
+for _ in range(3):
+    next(first)
+    next(second)
+'''
+
+TASKS = '''import asyncio
+
+
+async def slice_me(values):
+    total = 0
+    noise = 0
+    for value in values:
+        await asyncio.sleep(0)
+        if value > 1:
+            total += value
+        else:
+            noise += 1
+    result = total + 1  # slicing criterion
+    return result
+
+
+async def main():
+    await asyncio.gather(slice_me([2, 3]), slice_me([0, 1]))
+
+
+asyncio.run(main())
+'''
+
+
+@pytest.mark.parametrize("program, invocation, expected", [
+    (GENERATORS, 1, {"10": [2, 4, 5, 6, 10]}),
+    (GENERATORS, 2, {"10": [2, 10]}),
+    (TASKS, 1, {"13": [5, 7, 9, 10, 13]}),
+    (TASKS, 2, {"13": [5, 13]}),
+], ids=["generator_1", "generator_2", "gather_1", "gather_2"])
+def test_interleaved_invocations(tmp_path, program, invocation, expected):
+    program_path = tmp_path / "program.py"
+    program_path.write_text(program)
+    session = AnalysisSession(ContextAwareSlice)
+    session.analysis.sampling_policy = SamplingPolicy(invocation=invocation)
+    assert session.run(str(program_path))["slices"] == expected
+    assert session.analysis.invocations == dict()
+
+
+@pytest.mark.parametrize("invocation, expected", [
+    (1, {"8": [2, 5, 6, 8]}),
+    (2, {"8": [2, 8]}),
+], ids=["suspended_1", "suspended_2"])
+def test_suspended_invocations(tmp_path, invocation, expected):
+    program_path = tmp_path / "program.py"
+    program_path.write_text(SUSPENDED)
+    session = AnalysisSession(ContextAwareSlice)
+    session.analysis.sampling_policy = SamplingPolicy(invocation=invocation)
+    # No exit hook runs for the generators which are never exhausted, their records are merged before slicing
+    assert session.run(str(program_path))["slices"] == expected
+    assert len(session.analysis.invocations) == 2
+
+
+@pytest.mark.parametrize("program", [GENERATORS, TASKS], ids=["generator", "gather"])
+def test_state_is_resolved_once_per_hook(tmp_path, program, monkeypatch):
+    program_path = tmp_path / "program.py"
+    program_path.write_text(program)
+    session = AnalysisSession(ContextAwareSlice)
+    # The number of times the stack was searched during every hook
+    resolutions = []
+    resolve = ContextAwareSlice.resolve
+
+    def counting_resolve(analysis):
+        if len(resolutions) > 0:
+            resolutions[-1] += 1
+        return resolve(analysis)
+
+    def counting_hook(*args, hook):
+        resolutions.append(0)
+        return hook(*args)
+
+    monkeypatch.setattr(ContextAwareSlice, "resolve", counting_resolve)
+    for name in ("read", "write", "augmented_assignment", "read_attribute", "read_subscript", "enter_if",
+                 "enter_for", "enter_while", "function_enter", "function_exit"):
+        setattr(session.analysis, name, partial(counting_hook, hook=getattr(session.analysis, name)))
+    response = session.run(str(program_path))
+    # All invocations are analyzed together, like Slice does
+    assert response["slices"] == AnalysisSession(Slice).run(str(program_path))["slices"]
+    assert len(resolutions) > 0 and max(resolutions) <= 1
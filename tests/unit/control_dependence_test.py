@@ -0,0 +1,140 @@
+import libcst as cst
+import pytest
+from dynamicslicing.control_dependence import compute_control_dependencies
+from dynamicslicing.session import AnalysisSession
+
+FUNCTION = '''def slice_me(items):
+    found = None
+    for item in items:
+        if item < 0:
+            continue
+        if item > 10:
+            found = item
+            break
+    else:
+        found = -1
+    while found is None:
+        found = 0
+    else:
+        found += 1
+    if found > 5:
+        label = "big"
+    elif found > 0:
+        label = "small"
+    else:
+        label = "none"
+    result = label  # slicing criterion
+    return result
+'''
+
+
+def test_control_dependencies():
+    dependencies = compute_control_dependencies(cst.parse_module(FUNCTION), 1)
+    # continue and break are jumps, the loop headers depend on the branches which guard them
+    assert dependencies[3] == [4, 6]
+    assert dependencies[4] == [3, 5]
+    assert dependencies[5] == [4]
+    assert dependencies[6] == [4, 8]
+    assert dependencies[7] == [6]
+    assert dependencies[8] == [6]
+    # the else clause of a loop runs only if no break left it
+    assert dependencies[10] == [3]
+    # the else clause of a loop without break always runs, it still needs its loop
+    assert dependencies[12] == [11]
+    assert dependencies[14] == [11]
+    assert dependencies[16] == [15]
+    assert dependencies[18] == [17]
+    assert dependencies[20] == [17]
+    assert dependencies[21] == []
+
+
+def test_no_function():
+    assert compute_control_dependencies(cst.parse_module(FUNCTION), 2) == {}
+
+
+BREAK = '''def slice_me():
+    total = 0
+    for i in range(10):
+        if i > 2:
+            break
+        total += i
+    result = total  # slicing criterion
+    return result
+
+
+slice_me()
+'''
+
+CONTINUE = '''def slice_me():
+    total = 0
+    skipped = 0
+    for i in range(4):
+        if i % 2 == 0:
+            skipped += 1
+            continue
+        total += i
+    result = total  # slicing criterion
+    return result
+
+
+slice_me()
+'''
+
+FOR_ELSE = '''def slice_me(items):
+    found = None
+    for item in items:
+        if item > 10:
+            found = item
+            break
+    else:
+        found = -1
+    result = found  # slicing criterion
+    return result
+
+
+slice_me([1, 2])
+'''
+
+FOR_BREAK = '''def slice_me(items):
+    found = None
+    for item in items:
+        if item > 10:
+            found = item
+            break
+    else:
+        found = -1
+    result = found  # slicing criterion
+    return result
+
+
+slice_me([1, 20])
+'''
+
+WHILE_ELSE = '''def slice_me():
+    n = 0
+    while n < 3:
+        n += 1
+    else:
+        n = n * 2
+    result = n  # slicing criterion
+    return result
+
+
+slice_me()
+'''
+
+
+@pytest.mark.parametrize("program, criterion, lines", [
+    (BREAK, 7, [2, 3, 4, 5, 6, 7]),
+    (CONTINUE, 9, [2, 4, 5, 7, 8, 9]),
+    (FOR_ELSE, 9, [3, 4, 6, 8, 9]),
+    (FOR_BREAK, 9, [3, 4, 5, 6, 9]),
+    (WHILE_ELSE, 7, [2, 3, 4, 6, 7]),
+])
+def test_slice(tmp_path, program, criterion, lines):
+    program_path = tmp_path / "program.py"
+    program_path.write_text(program)
+    response = AnalysisSession().run(str(program_path))
+    assert response["slices"] == {str(criterion): lines}
+    # Every kept line keeps the branches and the jumps it depends on, so the sliced code still compiles
+    compile(response["sliced"][str(criterion)], "sliced.py", "exec")
@@ -0,0 +1,169 @@
+import random
+from typing import Dict, List, Set
+import pytest
+from dynamicslicing.dependence_graph import DependenceGraph, MatrixClosureEngine, ReachabilityIndex, np, \
+    select_closure_engine
+from dynamicslicing.session import AnalysisSession
+from dynamicslicing.slice import Slice
+
+
+def random_graph(seed: int, line_count: int, edge_count: int) -> Dict[int, List[int]]:
+    """ This method generates a dependence graph with cycles and self-edges, and with dependencies on lines which
+    have no dependencies of their own
+
+    Parameters
+    ----------
+    seed: int
+        The seed of the generator
+
+    line_count: int
+        The number of lines which have dependencies
+
+    edge_count: int
+        The number of dependencies
+
+    Returns
+    ----------
+    Dict[int, List[int]]
+        The dependencies of every line
+    """
+    generator = random.Random(seed)
+    edges: Dict[int, List[int]] = {line: [] for line in range(1, line_count + 1)}
+    for _ in range(edge_count):
+        edges[generator.randint(1, line_count)].append(generator.randint(1, line_count + 5))
+    return edges
+
+
+def reachable(edges: Dict[int, List[int]], line: int, reverse: bool = False) -> Set[int]:
+    """ This method is the oracle: a breadth-first search over the dependencies, or over the dependents
+
+    Parameters
+    ----------
+    edges: Dict[int, List[int]]
+        The dependencies of every line
+
+    line: int
+        The line where the search starts
+
+    reverse: bool
+        Whether the search follows the dependents
+
+    Returns
+    ----------
+    Set[int]
+        The reached lines, including line
+    """
+    if reverse:
+        dependents: Dict[int, List[int]] = {}
+        for source, dependencies in edges.items():
+            for dependency in dependencies:
+                dependents.setdefault(dependency, []).append(source)
+        edges = dependents
+    reached = {line}
+    queue = [line]
+    while queue:
+        current = queue.pop(0)
+        for neighbour in edges.get(current, []):
+            if neighbour not in reached:
+                reached.add(neighbour)
+                queue.append(neighbour)
+    return reached
+
+
+GRAPHS = [(seed, line_count, edge_count) for seed, (line_count, edge_count) in
+          enumerate([(1, 0), (1, 1), (5, 8), (30, 20), (30, 90), (200, 300), (200, 2000)])]
+
+
+@pytest.mark.parametrize("seed, line_count, edge_count", GRAPHS)
+def test_reachability_index(seed, line_count, edge_count):
+    edges = random_graph(seed, line_count, edge_count)
+    index = ReachabilityIndex(edges)
+    for line in range(1, line_count + 6):
+        assert index.slice(line) == sorted(reachable(edges, line))
+    criteria = [1, line_count, line_count + 3]
+    assert index.slice_many(criteria) == sorted(set().union(*[reachable(edges, line) for line in criteria]))
+
+
+@pytest.mark.skipif(np is None, reason="requires numpy")
+@pytest.mark.parametrize("seed, line_count, edge_count", GRAPHS)
+def test_matrix_closure_engine(seed, line_count, edge_count):
+    edges = random_graph(seed, line_count, edge_count)
+    criteria = list(range(1, line_count + 6)) + [-1]
+    slices = MatrixClosureEngine(edges).slices(criteria)
+    assert slices == {line: sorted(reachable(edges, line)) for line in criteria}
+
+
+@pytest.mark.skipif(np is None, reason="requires numpy")
+def test_matrix_closure_engine_packs_bits():
+    engine = MatrixClosureEngine({line: [line + 1] for line in range(1, 100)})
+    assert engine.adjacency.dtype == np.uint8
+    assert engine.adjacency.shape == (100, 13)
+
+
+@pytest.mark.parametrize("seed, line_count, edge_count", GRAPHS)
+def test_forward_slice_and_chop(seed, line_count, edge_count):
+    edges = random_graph(seed, line_count, edge_count)
+    graph = DependenceGraph(edges)
+    lines = range(1, line_count + 6)
+    for line in lines:
+        assert graph.backward_slice(line) == sorted(reachable(edges, line))
+        assert graph.forward_slice(line) == sorted(reachable(edges, line, reverse=True))
+    for source in lines:
+        for sink in list(lines)[::7]:
+            expected = reachable(edges, source, reverse=True) & reachable(edges, sink)
+            assert graph.chop(source, sink) == sorted(expected)
+
+
+PROGRAM = '''def slice_me():
+    a = 1
+    b = 2
+    c = a + 1
+    d = c + b
+    e = a * 3
+    result = d  # slicing criterion
+    return result
+
+
+slice_me()
+'''
+
+
+def test_slice_forward_slice_and_chop(tmp_path):
+    program_path = tmp_path / "program.py"
+    program_path.write_text(PROGRAM)
+    session = AnalysisSession(Slice)
+    assert session.run(str(program_path))["slices"] == {"7": [2, 3, 4, 5, 7]}
+    assert session.analysis.forward_slice(2) == [2, 4, 5, 6, 7, 8]
+    assert session.analysis.forward_slice(6) == [6]
+    assert session.analysis.chop(2, 7) == [2, 4, 5, 7]
+    assert session.analysis.chop(6, 7) == []
+
+
+UNDEFINED = '''def slice_me(values):
+    unused = 0
+    values += [4]
+    result = values  # slicing criterion
+    return result
+
+
+slice_me([1, 2])
+'''
+
+
+def test_slice_leaves_undefined_definitions_out(tmp_path):
+    program_path = tmp_path / "program.py"
+    program_path.write_text(UNDEFINED)
+    session = AnalysisSession(Slice)
+    response = session.run(str(program_path))
+    # The augmented assignment depends on the parameter, which has no definition (-1) in the function
+    assert -1 in session.analysis.lines_info[3].dependencies
+    assert response["slices"] == {"4": [3, 4]}
+    assert response["modules"] == {"4": dict()}
+    assert session.analysis.forward_slice(3) == [3, 4, 5]
+    assert list(session.analysis.sliced_files([-1, 3, 4])) == [0]
+
+
+def test_select_closure_engine():
+    assert select_closure_engine(10, 100) == "python"
+    assert select_closure_engine(5000, 10) == "python"
+    assert select_closure_engine(5000, 5000 * 5000) == ("python" if np is None else "numpy")
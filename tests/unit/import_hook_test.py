@@ -0,0 +1,52 @@
+from dynapyt.utils.hooks import get_hooks_from_analysis
+from dynamicslicing.import_hook import PROGRAM_CAPACITY, InstrumentingFinder, run_program
+from dynamicslicing.slice import Slice
+from dynamicslicing.utils import LRUCache
+
+PROGRAM = '''def slice_me():
+    a = 1
+    b = 2
+    if a > 0:
+        b = a
+    result = b  # slicing criterion
+    return result
+
+
+slice_me()
+'''
+
+
+def test_run_program(tmp_path):
+    program_path = tmp_path / "program.py"
+    program_path.write_text(PROGRAM)
+    analysis = run_program(str(program_path), [Slice(str(program_path) + ".orig")])[0]
+    criterion = analysis.get_slicing_criterion_line(analysis.source, analysis.slicing_comment)
+    assert analysis.query_slices([criterion]) == {6: [2, 4, 5, 6]}
+    # The program is instrumented in memory: neither the .orig copy nor the IID file is written
+    assert sorted(entry.name for entry in tmp_path.iterdir()) == ["program.py", "sliced.py"]
+    assert program_path.read_text() == PROGRAM
+
+
+def test_programs_are_cached_per_finder(tmp_path):
+    program_path = tmp_path / "program.py"
+    program_path.write_text(PROGRAM)
+    hooks = get_hooks_from_analysis([Slice()])
+    finder = InstrumentingFinder([str(program_path)], [], None, hooks)
+    other_finder = InstrumentingFinder([str(program_path)], [], None, hooks)
+    assert isinstance(finder.programs, LRUCache) and finder.programs.capacity == PROGRAM_CAPACITY
+    program = finder.instrument(str(program_path))
+    assert finder.instrument(str(program_path)) is program
+    assert len(other_finder.programs) == 0
+    assert other_finder.instrument(str(program_path)) is not program
+
+
+def test_programs_are_bounded(tmp_path):
+    paths = [tmp_path / "first.py", tmp_path / "second.py"]
+    for program_path in paths:
+        program_path.write_text(PROGRAM)
+    finder = InstrumentingFinder([str(program_path) for program_path in paths], [], None,
+                                 get_hooks_from_analysis([Slice()]), LRUCache(1))
+    first = finder.instrument(str(paths[0]))
+    finder.instrument(str(paths[1]))
+    assert len(finder.programs) == 1
+    assert finder.instrument(str(paths[0])) is not first
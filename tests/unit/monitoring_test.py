@@ -0,0 +1,19 @@
+import pytest
+from dynamicslicing.monitoring import MONITORING_AVAILABLE, MonitoringBackend
+from dynamicslicing.session import AnalysisSession
+
+
+@pytest.mark.skipif(MONITORING_AVAILABLE == False, reason="requires sys.monitoring (Python 3.12+)")
+def test_monitoring_matches_dynapyt(tmp_path, milestone3_program):
+    instrumented_path = tmp_path / "instrumented" / "program.py"
+    monitored_path = tmp_path / "monitored" / "program.py"
+    for program_path in (instrumented_path, monitored_path):
+        program_path.parent.mkdir()
+        program_path.write_text(milestone3_program)
+    expected = AnalysisSession().run(str(instrumented_path))
+    assert expected["status"] == "ok"
+    analysis = MonitoringBackend(str(monitored_path)).run()
+    criterion = analysis.get_slicing_criterion_line(analysis.source, analysis.slicing_comment)
+    slices = analysis.query_slices([criterion])
+    assert {str(line_number): lines for line_number, lines in slices.items()} == expected["slices"]
+    assert (monitored_path.parent / "sliced.py").read_text() == expected["sliced"][str(criterion)]
@@ -0,0 +1,18 @@
+FACTOR = 2
+
+
+def log(value):
+    message = str(value)
+    return message
+
+
+def fill(box):
+    box.value = 5
+
+
+def scale(value):
+    factor = FACTOR
+    unused = 5
+    if factor > 1:
+        factor += 1
+    return value * factor
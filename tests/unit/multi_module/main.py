@@ -0,0 +1,16 @@
+import types
+import helper
+
+
+def slice_me():
+    base = 3
+    noise = 1
+    box = types.SimpleNamespace(value=0)
+    scaled = helper.scale(base)
+    helper.log(noise)
+    helper.fill(box)
+    result = scaled + 1  # slicing criterion
+    return result
+
+
+slice_me()
@@ -0,0 +1,55 @@
+import shutil
+from os.path import dirname, join, realpath
+import pytest
+from dynamicslicing.context_aware import ContextAwareSlice
+from dynamicslicing.session import AnalysisSession
+from dynamicslicing.slice import Slice
+from dynamicslicing.thread_aware import ThreadAwareSlice
+from dynamicslicing.utils import node_id
+
+MULTI_MODULE = join(dirname(realpath(__file__)), "multi_module")
+
+SLICED_HELPER = '''FACTOR = 2
+
+
+def log(value):
+    pass
+
+
+def fill(box):
+    pass
+
+
+def scale(value):
+    factor = FACTOR
+    if factor > 1:
+        factor += 1
+    return value * factor
+'''
+
+
+@pytest.fixture
+def program(tmp_path):
+    """ Copies the two modules, since the sliced files are written next to them """
+    for name in ("main.py", "helper.py"):
+        shutil.copy(join(MULTI_MODULE, name), str(tmp_path))
+    return tmp_path
+
+
+@pytest.mark.parametrize("analysis_class", [Slice, ThreadAwareSlice, ContextAwareSlice])
+def test_slice_reaches_other_module(program, analysis_class):
+    session = AnalysisSession(analysis_class)
+    response = session.run(str(program / "main.py"), module_paths=[str(program / "helper.py")])
+    assert response["status"] == "ok"
+    # helper.scale(base) depends on the return statement of scale, and on the lines of scale which it reads
+    assert response["slices"] == {"12": [6, 9, 12] + [node_id(1, line_number) for line_number in (14, 16, 17, 18)]}
+    assert response["modules"] == {"12": {str(program / "sliced_helper.py"): SLICED_HELPER}}
+    assert session.analysis.callee_ranges == {str(program / "helper.py.orig"): {(5, 6), (10, 10), (14, 18)}}
+
+
+def test_callee_of_unanalyzed_invocation(program):
+    session = AnalysisSession()
+    session.analysis.sampling_policy.invocation = 2
+    response = session.run(str(program / "main.py"), module_paths=[str(program / "helper.py")])
+    assert response["status"] == "ok"
+    assert session.analysis.callee_ranges == dict()
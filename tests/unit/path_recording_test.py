@@ -0,0 +1,115 @@
+import json
+import runpy
+from importlib import import_module
+import pytest
+from dynapyt.instrument.instrument import instrument_file
+from dynapyt.utils.hooks import get_hooks_from_analysis
+from dynamicslicing.path_recording import PathRecorder, path_file_name, replay_path
+from dynamicslicing.session import AnalysisSession
+
+
+def record_path(program_path: str) -> str:
+    """ This method instruments a program in place, runs it under PathRecorder and writes its path file
+
+    Parameters
+    ----------
+    program_path: str
+        The path to the code file
+
+    Returns
+    ----------
+    str
+        The path to the path file
+    """
+    recorder = PathRecorder(program_path + ".orig")
+    instrument_file(program_path, get_hooks_from_analysis([recorder]))
+    runtime = import_module("dynapyt.runtime")
+    analyses = runtime.analyses
+    runtime.analyses = [recorder]
+    try:
+        runpy.run_path(program_path, run_name="__main__")
+    finally:
+        runtime.analyses = analyses
+    recorder.end_execution()
+    return path_file_name(program_path)
+
+
+NESTED_SUBSCRIPT = '''def slice_me():
+    m = {"a": {"y": 1}, "y": {"y": 2}}
+    k = "a"
+    m["a"] = {"y": 3}
+    m["y"] = {"y": 4}
+    v = m[k]["y"]
+    result = v  # slicing criterion
+    return result
+
+
+slice_me()
+'''
+
+NESTED_WRITE = '''def slice_me():
+    m = {"a": {"y": 1}, "b": {"y": 2}}
+    k = "a"
+    v = m[k]["y"]
+    m["b"]["y"] = 5
+    w = m["b"]["y"]
+    result = v + w  # slicing criterion
+    return result
+
+
+slice_me()
+'''
+
+BRANCHES = '''def slice_me(items):
+    counts = {"odd": 0, "even": 0}
+    total = 0
+    for item in items:
+        if item % 2 == 0:
+            counts["even"] += 1
+            continue
+        counts["odd"] += 1
+        total += item
+    result = counts["odd"]  # slicing criterion
+    return result
+
+
+slice_me([1, 2, 3])
+slice_me([4])
+'''
+
+MODULE_ATTRIBUTE = '''import types
+
+settings = types.SimpleNamespace(scale=1)
+
+
+def slice_me():
+    settings.scale = 2
+    a = 3
+    result = a  # slicing criterion
+    return result
+
+
+slice_me()
+'''
+
+
+@pytest.mark.parametrize("program", [NESTED_SUBSCRIPT, NESTED_WRITE, BRANCHES, MODULE_ATTRIBUTE],
+                         ids=["nested_subscript", "nested_write", "branches", "module_attribute"])
+def test_replay_matches_slice(tmp_path, program):
+    program_path = tmp_path / "program.py"
+    program_path.write_text(program)
+    expected = AnalysisSession().run(str(program_path))
+    assert expected["status"] == "ok"
+    analysis = replay_path(record_path(str(program_path)))
+    criterion = analysis.get_slicing_criterion_line(analysis.source, analysis.slicing_comment)
+    slices = analysis.query_slices([criterion])
+    assert {str(line_number): lines for line_number, lines in slices.items()} == expected["slices"]
+
+
+def test_nested_nodes_have_their_own_values(tmp_path):
+    program_path = tmp_path / "program.py"
+    program_path.write_text(NESTED_SUBSCRIPT)
+    with open(record_path(str(program_path))) as file:
+        recorded_path = json.load(file)
+    # m[k] and m[k]["y"] start at the same line and column
+    assert recorded_path["subscript_keys"] == {"6:8:6:12": [["a", 1]], "6:8:6:17": [["y", 1]]}
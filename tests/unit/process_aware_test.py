@@ -0,0 +1,133 @@
+import multiprocessing
+import pytest
+from dynamicslicing.process_aware import ProcessAwareSlice
+from dynamicslicing.session import AnalysisSession
+from dynamicslicing.utils import node_id
+
+PROCESS = '''import multiprocessing
+
+
+def slice_me(Process=multiprocessing.Process, Queue=multiprocessing.Queue):
+    queue = Queue()
+    base = 10
+    noise = 0
+
+    def work(value):
+        scaled = value * base
+        queue.put(scaled)
+
+    worker = Process(target=work, args=(2, ))
+    worker.start()
+    worker.join()
+    received = queue.get()
+    result = received + noise  # slicing criterion
+    return result
+
+
+slice_me()
+'''
+
+UNRELATED_GET = '''import multiprocessing
+
+
+def slice_me(Process=multiprocessing.Process, Queue=multiprocessing.Queue):
+    queue = Queue()
+    options = {"scale": 3}
+    noise = 0
+
+    def work(value):
+        queue.put(value * 2)
+
+    worker = Process(target=work, args=(2, ))
+    worker.start()
+    worker.join()
+    received = queue.get()
+    scale = options.get("scale")
+    result = scale + noise  # slicing criterion
+    return result
+
+
+slice_me()
+'''
+
+POOL = '''from concurrent.futures import ProcessPoolExecutor
+
+
+def slice_me(value):
+    total = 0
+    noise = 0
+    for step in range(3):
+        if step > 0:
+            total += value
+        noise += step
+    result = total + 1  # slicing criterion
+    return result
+
+
+if __name__ == "__main__":
+    with ProcessPoolExecutor(2) as executor:
+        print(sum(executor.map(slice_me, [1, 2, 3])))
+'''
+
+requires_fork = pytest.mark.skipif(multiprocessing.get_start_method() != "fork",
+                                   reason="requires the fork start method")
+
+
+@requires_fork
+def test_process_and_queue(tmp_path):
+    program_path = tmp_path / "program.py"
+    program_path.write_text(PROCESS)
+    response = AnalysisSession(ProcessAwareSlice).run(str(program_path))
+    # queue.get() receives from the child started at worker.start(), which sends what queue.put(scaled) computed
+    assert response["slices"] == {"17": [5, 6, 7, 10, 11, 13, 14, 16, 17]}
+
+
+@requires_fork
+def test_get_of_a_dict_receives_nothing(tmp_path):
+    program_path = tmp_path / "program.py"
+    program_path.write_text(UNRELATED_GET)
+    session = AnalysisSession(ProcessAwareSlice)
+    response = session.run(str(program_path))
+    # options.get("scale") is called after the fork, but a dict is no receiver of the child
+    assert response["slices"] == {"17": [6, 7, 16, 17]}
+    assert session.analysis.receivers == {node_id(0, 13): {node_id(0, 14), node_id(0, 15)}}
+
+
+@requires_fork
+def test_process_pool_executor(tmp_path):
+    program_path = tmp_path / "program.py"
+    program_path.write_text(POOL)
+    response = AnalysisSession(ProcessAwareSlice).run(str(program_path))
+    assert response["output"] == "15\n"
+    assert response["slices"] == {"11": [5, 7, 8, 9, 11]}
+
+
+def test_merge_fragment():
+    analysis = ProcessAwareSlice("/program.py.orig")
+    analysis.file_id("/program.py.orig")
+    analysis.receivers = {15: {17}}
+    analysis.merge_fragment({"call_site": 15, "source_path": "/program.py.orig", "slice_start_line": 4,
+                             "slice_end_line": 18, "files": ["/program.py.orig"], "slice_ranges": {},
+                             "callee_ranges": {}, "lines": {"10": [6], "11": [5, 10, 11], "12": [7]}})
+    # The self-edge of line 11 does not hide it from the call site
+    assert sorted(analysis.lines_info[15].dependencies) == [11, 12]
+    assert analysis.lines_info[17].dependencies == [15]
+    assert sorted(analysis.lines_info[11].dependencies) == [5, 10, 11]
+
+
+def test_merge_fragment_maps_file_ids():
+    analysis = ProcessAwareSlice("/program.py.orig")
+    for file_path in ("/program.py.orig", "/parent.py.orig"):
+        analysis.file_id(file_path)
+    # The child imported another module than the parent after the fork
+    analysis.merge_fragment({"call_site": 14, "source_path": "/program.py.orig", "slice_start_line": 4,
+                             "slice_end_line": 18, "files": ["/program.py.orig", "/child.py.orig"],
+                             "slice_ranges": {"/child.py.orig": [1, 5]},
+                             "callee_ranges": {"/child.py.orig": [[7, 9]]},
+                             "lines": {str(node_id(1, 3)): [node_id(1, 2)], str(node_id(1, 2)): [10]}})
+    assert analysis.files == ["/program.py.orig", "/parent.py.orig", "/child.py.orig"]
+    assert analysis.lines_info[node_id(2, 3)].dependencies == [node_id(2, 2)]
+    assert analysis.lines_info[node_id(2, 2)].dependencies == [10]
+    assert analysis.lines_info[14].dependencies == [node_id(2, 3)]
+    assert analysis.slice_ranges["/child.py.orig"] == (1, 5)
+    assert analysis.callee_ranges["/child.py.orig"] == {(7, 9)}
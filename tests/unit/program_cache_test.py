@@ -0,0 +1,87 @@
+import os
+import pickle
+import pytest
+from dynapyt.utils.hooks import get_hooks_from_analysis
+from dynamicslicing import program_cache
+from dynamicslicing.program_cache import ProgramCache, program_hash
+from dynamicslicing.slice import Slice
+
+PROGRAM = '''def slice_me():
+    a = 1
+    result = a  # slicing criterion
+    return result
+
+
+slice_me()
+'''
+
+
+@pytest.fixture
+def instrumentations(monkeypatch):
+    """ Counts the programs which are instrumented instead of loaded from the cache """
+    calls = list()
+    instrument_program = program_cache.instrument_program
+
+    def counting(source_path, source, selected_hooks):
+        calls.append(source_path)
+        return instrument_program(source_path, source, selected_hooks)
+    monkeypatch.setattr(program_cache, "instrument_program", counting)
+    return calls
+
+
+@pytest.fixture
+def hooks():
+    return get_hooks_from_analysis([Slice()])
+
+
+def test_cache_hit(tmp_path, instrumentations, hooks):
+    program_path = tmp_path / "program.py"
+    program_path.write_text(PROGRAM)
+    first = ProgramCache(str(tmp_path / "cache")).get(str(program_path), hooks)
+    second = ProgramCache(str(tmp_path / "cache")).get(str(program_path), hooks)
+    assert len(instrumentations) == 1
+    assert second.instrumented_source == first.instrumented_source
+    assert second.iids.iid_to_location == first.iids.iid_to_location
+    assert second.module.deep_equals(first.module)
+    assert (tmp_path / "cache").stat().st_mode & 0o777 == 0o700
+
+
+def test_cache_invalidation(tmp_path, instrumentations, hooks):
+    program_path = tmp_path / "program.py"
+    program_path.write_text(PROGRAM)
+    cache = ProgramCache(str(tmp_path / "cache"))
+    cache.get(str(program_path), hooks)
+    # Another source is another entry
+    program_path.write_text(PROGRAM.replace("a = 1", "a = 2"))
+    assert "a = 2" in cache.get(str(program_path), hooks).source
+    assert len(instrumentations) == 2
+    # An entry of another toolchain is instrumented again
+    key = program_hash(str(program_path), program_path.read_text(), hooks)
+    with open(cache.entry_path(key), "rb") as file:
+        entry = pickle.load(file)
+    entry["toolchain"] = (0, ) + entry["toolchain"][1:]
+    with open(cache.entry_path(key), "wb") as file:
+        pickle.dump(entry, file)
+    assert cache.load(key) is None
+    cache.get(str(program_path), hooks)
+    assert len(instrumentations) == 3
+    assert cache.load(key) is not None
+    # A damaged entry is like a missing one
+    with open(cache.entry_path(key), "wb") as file:
+        file.write(b"damaged")
+    assert cache.load(key) is None
+
+
+@pytest.mark.skipif(not hasattr(os, "getuid"), reason="requires POSIX permissions")
+def test_untrusted_directory(tmp_path, instrumentations, hooks):
+    program_path = tmp_path / "program.py"
+    program_path.write_text(PROGRAM)
+    cache = ProgramCache(str(tmp_path / "cache"))
+    cache.get(str(program_path), hooks)
+    key = program_hash(str(program_path), PROGRAM, hooks)
+    assert cache.trusted() and cache.load(key) is not None
+    os.chmod(cache.directory, 0o777)
+    assert cache.trusted() == False
+    assert cache.load(key) is None
+    cache.get(str(program_path), hooks)
+    assert len(instrumentations) == 2
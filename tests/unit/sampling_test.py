@@ -0,0 +1,124 @@
+import pytest
+from dynamicslicing.context_aware import ContextAwareSlice
+from dynamicslicing.session import AnalysisSession
+from dynamicslicing.slice import Slice
+from dynamicslicing.thread_aware import ThreadAwareSlice
+from dynamicslicing.utils import SamplingPolicy
+
+
+def test_rate():
+    policy = SamplingPolicy(rate=3)
+    assert [policy.sample() for _ in range(7)] == [True, False, False, True, False, False, True]
+    assert policy.sampled == [1, 4, 7]
+    assert policy.finished() == False
+    policy.reset()
+    assert policy.invocations == 0 and policy.sampled == []
+
+
+def test_time_budget():
+    policy = SamplingPolicy(time_budget=1.0)
+    assert policy.sample() == True
+    policy.record(0.6)
+    assert policy.finished() == False
+    assert policy.sample() == True
+    policy.record(0.6)
+    assert policy.finished() == True
+    assert policy.sample() == False
+    assert policy.sampled == [1, 2]
+
+
+def test_keeps_previous():
+    assert SamplingPolicy().keeps_previous() == True
+    assert SamplingPolicy(invocation="first").keeps_previous() == True
+    assert SamplingPolicy(invocation=2).keeps_previous() == True
+    assert SamplingPolicy(invocation="last").keeps_previous() == False
+
+
+def test_finished():
+    policy = SamplingPolicy(invocation=2)
+    assert policy.sample() == False
+    assert policy.finished() == False
+    assert policy.sample() == True
+    assert policy.finished() == True
+    policy = SamplingPolicy(invocation="last")
+    for _ in range(3):
+        assert policy.sample() == True
+    assert policy.finished() == False
+
+
+def test_invalid_policy():
+    with pytest.raises(ValueError):
+        SamplingPolicy(rate=0)
+    with pytest.raises(ValueError):
+        SamplingPolicy(invocation=0)
+    with pytest.raises(ValueError):
+        SamplingPolicy(invocation="second")
+
+
+RAISING_PROGRAM = '''def slice_me(n):
+    a = n * 2
+    if n == 2:
+        raise ValueError(n)
+    b = a + 1
+    result = b  # slicing criterion
+    return result
+
+
+for n in range(1, 6):
+    try:
+        slice_me(n)
+    except ValueError:
+        pass
+'''
+
+
+@pytest.mark.parametrize("analysis_class", [Slice, ThreadAwareSlice, ContextAwareSlice])
+def test_invocation_which_raises(tmp_path, analysis_class):
+    program_path = tmp_path / "program.py"
+    program_path.write_text(RAISING_PROGRAM)
+    session = AnalysisSession(analysis_class)
+    session.analysis.sampling_policy = SamplingPolicy(rate=2)
+    assert session.run(str(program_path))["slices"] == {"6": [2, 3, 4, 5, 6]}
+    assert session.analysis.sampling_policy.invocations == 5
+    assert session.analysis.sampling_policy.sampled == [1, 3, 5]
+    assert session.analysis.invocation_depth == 0
+
+
+SELECTION_PROGRAM = '''def slice_me(n):
+    a = 1
+    b = 2
+    if n == 2:
+        raise ValueError(a)
+    if n == 1:
+        c = a
+    else:
+        c = b
+    result = c  # slicing criterion
+    return result
+
+
+for n in range(1, 4):
+    try:
+        slice_me(n)
+    except ValueError:
+        pass
+'''
+
+
+@pytest.mark.parametrize("analysis_class", [Slice, ThreadAwareSlice, ContextAwareSlice])
+@pytest.mark.parametrize("invocation, lines, sampled, finished", [
+    ("first", [2, 4, 5, 6, 7, 10], [1], True),
+    (1, [2, 4, 5, 6, 7, 10], [1], True),
+    (2, [10], [2], True),
+    (3, [3, 4, 5, 6, 9, 10], [3], True),
+    (4, [10], [], False),
+    ("last", [3, 4, 5, 6, 9, 10], [1, 2, 3], False),
+])
+def test_invocation_selection(tmp_path, analysis_class, invocation, lines, sampled, finished):
+    program_path = tmp_path / "program.py"
+    program_path.write_text(SELECTION_PROGRAM)
+    session = AnalysisSession(analysis_class)
+    session.analysis.sampling_policy = SamplingPolicy(invocation=invocation)
+    assert session.run(str(program_path))["slices"] == {"10": lines}
+    assert session.analysis.sampling_policy.sampled == sampled
+    assert session.analysis.analysis_finished == finished
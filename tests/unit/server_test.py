@@ -0,0 +1,57 @@
+import json
+import socket
+import pytest
+from dynamicslicing.server import SlicingServer
+
+PROGRAM = '''def slice_me():
+    a = 1
+    b = 2
+    result = a  # slicing criterion
+    return result
+
+
+slice_me()
+'''
+
+
+def exchange(server: SlicingServer, line: bytes):
+    """ This method lets the server handle one request line and returns whether it keeps running and its response """
+    client, connection = socket.socketpair()
+    with client, connection:
+        client.sendall(line)
+        running = server.handle(connection)
+        response = json.loads(client.makefile("rb").readline())
+    server.reap_workers(block=True)
+    return running, response
+
+
+@pytest.mark.parametrize("line", [b"[1, 2]\n", b"42\n", b"\"program.py\"\n", b"null\n", b"{not json\n",
+                                  b"{\"entry\": \"program.py\"}\n", b"{\"program\": \"program.py\", \"criteria\": 3}\n"],
+                         ids=["list", "number", "string", "null", "invalid", "no_program", "criteria_not_a_list"])
+def test_malformed_request(tmp_path, line):
+    server = SlicingServer(str(tmp_path / "server.sock"))
+    running, response = exchange(server, line)
+    assert running
+    assert response["status"] == "error"
+
+
+def test_job_after_malformed_request(tmp_path):
+    program_path = tmp_path / "program.py"
+    program_path.write_text(PROGRAM)
+    server = SlicingServer(str(tmp_path / "server.sock"))
+    assert exchange(server, b"[]\n")[1]["status"] == "error"
+    running, response = exchange(server, json.dumps({"program": str(program_path)}).encode("utf-8") + b"\n")
+    assert running
+    assert response["status"] == "ok"
+    assert response["slices"] == {"4": [2, 4]}
+    assert exchange(server, b"{\"command\": \"shutdown\"}\n") == (False, {"status": "ok"})
+
+
+def test_job_which_exits(tmp_path):
+    program_path = tmp_path / "program.py"
+    program_path.write_text(PROGRAM + "raise SystemExit(0)\n")
+    server = SlicingServer(str(tmp_path / "server.sock"))
+    running, response = exchange(server, json.dumps({"program": str(program_path)}).encode("utf-8") + b"\n")
+    assert running
+    assert response["status"] == "ok" and response["exit"] == "SystemExit: 0"
+    assert response["slices"] == {"4": [2, 4]}
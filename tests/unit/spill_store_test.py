@@ -0,0 +1,83 @@
+import gc
+import shutil
+from os.path import dirname, exists, join, realpath
+import pytest
+from dynamicslicing.context_aware import ContextAwareSlice
+from dynamicslicing.session import AnalysisSession
+from dynamicslicing.slice import Slice
+from dynamicslicing.spill_store import SpillStore
+from dynamicslicing.utils import LineMetaData
+
+MULTI_MODULE = join(dirname(realpath(__file__)), "multi_module")
+
+
+def test_records_are_spilled_and_faulted_in(tmp_path):
+    store = SpillStore(1, str(tmp_path))
+    for line_number in (1, 2, 3):
+        store[line_number] = LineMetaData([line_number - 1])
+    assert list(store.resident) == [3] and store.spilled == {1, 2}
+    assert exists(store.path) and store.path.startswith(str(tmp_path))
+    assert len(store) == 3 and sorted(store) == [1, 2, 3] and 1 in store and 4 not in store
+    # A mutation of a record is written back when it is evicted
+    store[1].dependencies.append(5)
+    assert list(store.resident) == [1] and store.spilled == {2, 3}
+    assert store[2].dependencies == [1]
+    assert store[1].dependencies == [0, 5]
+    assert store.get(4) is None
+    with pytest.raises(KeyError):
+        store[4]
+
+
+def test_views_read_the_spilled_records(tmp_path):
+    store = SpillStore(1, str(tmp_path))
+    for line_number in (1, 2, 3):
+        store[line_number] = LineMetaData([line_number * 10])
+    assert sorted((line_number, line.dependencies) for line_number, line in store.items()) == \
+        [(1, [10]), (2, [20]), (3, [30])]
+    assert sorted(line.dependencies[0] for line in store.values()) == [10, 20, 30]
+    # The views do not fault the spilled records in
+    assert list(store.resident) == [3] and store.spilled == {1, 2}
+    del store[1]
+    del store[3]
+    assert sorted(store) == [2] and [line.dependencies for line in store.values()] == [[20]]
+    store.clear()
+    assert len(store) == 0 and list(store.items()) == []
+
+
+def test_file_is_removed_with_the_store(tmp_path):
+    store = SpillStore(1, str(tmp_path))
+    store[1], store[2] = LineMetaData([]), LineMetaData([])
+    spill_path = store.path
+    del store
+    gc.collect()
+    assert exists(spill_path) == False
+
+
+def test_capacity_must_be_positive():
+    with pytest.raises(ValueError):
+        SpillStore(0)
+
+
+@pytest.mark.parametrize("analysis_class", [Slice, ContextAwareSlice])
+def test_spilled_slices_match(tmp_path, analysis_class, milestone3_program):
+    program_path = tmp_path / "program.py"
+    program_path.write_text(milestone3_program)
+    expected = AnalysisSession(analysis_class).run(str(program_path))
+    session = AnalysisSession(analysis=analysis_class(spill_limit=1, spill_directory=str(tmp_path)))
+    response = session.run(str(program_path))
+    assert response["status"] == "ok"
+    assert response["slices"] == expected["slices"]
+    assert response["sliced"] == expected["sliced"]
+    assert isinstance(session.analysis.lines_info, SpillStore)
+
+
+def test_spilled_slices_of_modules(tmp_path):
+    for name in ("main.py", "helper.py"):
+        shutil.copy(join(MULTI_MODULE, name), str(tmp_path))
+    module_paths = [str(tmp_path / "helper.py")]
+    expected = AnalysisSession().run(str(tmp_path / "main.py"), module_paths=module_paths)
+    session = AnalysisSession(analysis=Slice(spill_limit=1, spill_directory=str(tmp_path)))
+    response = session.run(str(tmp_path / "main.py"), module_paths=module_paths)
+    assert response["slices"] == expected["slices"]
+    assert response["modules"] == expected["modules"]
+    assert len(session.analysis.lines_info.spilled) > 0
@@ -0,0 +1,100 @@
+import json
+import tracemalloc
+import pytest
+from dynamicslicing.cli import main
+from dynamicslicing.session import AnalysisSession
+from dynamicslicing.slice import Slice
+
+PROGRAM = '''def double(value):
+    twice = value * 2
+    return twice
+
+
+offset = double(1)
+unused = offset
+
+
+def slice_me():
+    a = offset
+    b = 2
+    if a > 1:
+        b = a
+    result = b  # slicing criterion
+    return result
+
+
+slice_me()
+'''
+
+
+def test_statistics_report(tmp_path):
+    program_path = tmp_path / "program.py"
+    program_path.write_text(PROGRAM)
+    assert main([str(program_path), "--stats", str(tmp_path / "stats.json")]) == 0
+    with open(tmp_path / "stats.json") as file:
+        report = json.load(file)
+    assert report["slices"] == {"15": [11, 13, 14, 15]}
+    assert report["slice_range"] == [11, 16]
+    methods = report["methods"]
+    # The writes of twice, offset and unused happen before slice_me is analyzed
+    assert methods["write"]["inactive"] == 3
+    assert methods["write"]["calls"] == 7
+    assert methods["write"]["dropped"] == 3 and methods["write"]["checked"] == 4
+    assert methods["enter_if"] == dict(methods["enter_if"], calls=1, checked=1, dropped=0, inactive=0)
+    assert methods["function_enter"]["inactive"] == 0
+    for cost in methods.values():
+        assert cost["dropped"] <= cost["calls"] and cost["inactive"] <= cost["dropped"]
+    assert report["hook_seconds"] > 0 and methods["query_slices"]["calls"] == 1
+    assert report["graph"]["lines"] == 5 and report["graph"]["variables"] == 3
+
+
+def test_line_profile(tmp_path):
+    program_path = tmp_path / "program.py"
+    program_path.write_text(PROGRAM)
+    assert main([str(program_path), "--profile", str(tmp_path / "profile.folded")]) == 0
+    stacks = (tmp_path / "profile.folded").read_text().splitlines()
+    assert any(stack.startswith("program.py;slice_me;14: b = a;write [iid ") for stack in stacks)
+    assert any(stack.startswith("program.py;double;2: twice = value * 2;write [iid ") for stack in stacks)
+    assert any(stack.startswith("program.py;<module>;6: offset = double(1);") for stack in stacks)
+    assert all(int(stack.rsplit(" ", 1)[1]) >= 0 for stack in stacks)
+    lines = (tmp_path / "profile.folded.lines").read_text().splitlines()
+    assert lines[0].split() == ["events", "ms", "source"]
+    assert len(lines) == PROGRAM.count("\n") + 2
+    assert lines[14].endswith("        b = a") and int(lines[14].split()[0]) >= 1
+    assert lines[4].strip() == ""
+
+
+def test_memory_report(tmp_path):
+    program_path = tmp_path / "program.py"
+    program_path.write_text(PROGRAM)
+    assert main([str(program_path), "--memory", str(tmp_path / "memory.json")]) == 0
+    with open(tmp_path / "memory.json") as file:
+        report = json.load(file)
+    assert report["source_path"] == str(program_path) + ".orig"
+    assert set(report["retained_bytes"]) == {"elements", "attributes", "variables", "lines", "control_flow",
+                                             "indexes", "bytecode_tables", "asts"}
+    assert report["retained_total"] == sum(report["retained_bytes"].values())
+    assert report["retained_bytes"]["lines"] > 0 and report["retained_bytes"]["asts"] > 0
+    assert report["peak_bytes"] >= report["traced_bytes"] > 0
+    assert 0 < len(report["allocation_sites"]) <= 20
+
+
+@pytest.mark.parametrize("reset_peak", [True, False], ids=["reset_peak", "without_reset_peak"])
+def test_memory_report_of_every_run(tmp_path, monkeypatch, reset_peak):
+    if reset_peak == False:
+        # Like Python 3.7 and 3.8
+        monkeypatch.delattr(tracemalloc, "reset_peak", raising=False)
+    program_path = tmp_path / "program.py"
+    program_path.write_text(PROGRAM)
+    session = AnalysisSession(analysis=Slice(memory_path=str(tmp_path / "memory.json")))
+    try:
+        for _ in range(2):
+            session.run(str(program_path))
+            # The report of a run stops tracing, resetting the analysis for the next run traces again
+            session.analysis.memory.write(session.analysis)
+            assert tracemalloc.is_tracing() == False
+            with open(tmp_path / "memory.json") as file:
+                assert json.load(file)["traced_bytes"] > 0
+    finally:
+        if session.analysis.memory.started:
+            tracemalloc.stop()
@@ -0,0 +1,221 @@
+import gc
+import sys
+import threading
+from dynamicslicing.session import AnalysisSession
+from dynamicslicing.slice import Slice
+from dynamicslicing.thread_aware import ThreadAwareSlice
+
+INVOCATION = '''class Counter:
+    def __init__(self):
+        self.count = 0
+
+
+def slice_me():
+    counter = Counter()
+    noise = 0
+    values = [1, 2, 3]
+    total = 0
+    for value in values:
+        if value > 1:
+            total += value
+        noise += value
+    counter.count = total
+    unused = noise * 2
+    result = counter.count + 1  # slicing criterion
+    return result
+
+
+'''
+
+THREADS = INVOCATION + '''import sys
+import threading
+sys.setswitchinterval(1e-6)
+threads = [threading.Thread(target=slice_me) for _ in range(8)]
+for thread in threads:
+    thread.start()
+for thread in threads:
+    thread.join()
+'''
+
+
+def test_threads_match_single_invocation(tmp_path):
+    single_path = tmp_path / "single" / "program.py"
+    threads_path = tmp_path / "threads" / "program.py"
+    for program_path, code in ((single_path, INVOCATION + "slice_me()\n"), (threads_path, THREADS)):
+        program_path.parent.mkdir()
+        program_path.write_text(code)
+    expected = AnalysisSession(Slice).run(str(single_path))
+    assert expected["slices"] == {"17": [7, 9, 10, 11, 12, 13, 15, 17]}
+    session = AnalysisSession(ThreadAwareSlice)
+    session.analysis.batch_size = 1
+    switch_interval = sys.getswitchinterval()
+    try:
+        for _ in range(3):
+            assert session.run(str(threads_path))["slices"] == expected["slices"]
+    finally:
+        sys.setswitchinterval(switch_interval)
+
+
+def test_buffers_of_ended_threads_are_retired(tmp_path):
+    program_path = tmp_path / "program.py"
+    program_path.write_text(THREADS)
+    session = AnalysisSession(ThreadAwareSlice)
+    switch_interval = sys.getswitchinterval()
+    try:
+        session.run(str(program_path))
+    finally:
+        sys.setswitchinterval(switch_interval)
+    gc.collect()
+    # Only the buffer of the main thread is left, the records of the workers were merged when they ended
+    assert session.analysis.buffers == [session.analysis.local.pending]
+
+
+def test_merge_keeps_records_after_one_being_numbered():
+    analysis = ThreadAwareSlice()
+    applied = []
+    numbered, being_numbered = [], []
+    analysis.buffers = [numbered, being_numbered]
+    # A thread appended its record and is about to number it, another thread numbered its record before the merge
+    waiting = [None, lambda analysis, name: applied.append(name), ("waiting", )]
+    being_numbered.append(waiting)
+    numbered.append([next(analysis.sequence), lambda analysis, name: applied.append(name), ("first", )])
+    with analysis.lock:
+        analysis.merge()
+    assert applied == ["first"] and being_numbered == [waiting]
+    waiting[0] = next(analysis.sequence)
+    numbered.append([next(analysis.sequence), lambda analysis, name: applied.append(name), ("last", )])
+    with analysis.lock:
+        analysis.merge()
+    assert applied == ["first", "waiting", "last"]
+    assert numbered == [] and being_numbered == []
+
+
+def test_defer_from_many_threads():
+    analysis = ThreadAwareSlice(batch_size=7)
+    applied = []
+
+    def record(analysis, thread_number, record_number):
+        applied.append((thread_number, record_number))
+
+    def worker(thread_number):
+        for record_number in range(500):
+            analysis.defer(record, (thread_number, record_number))
+
+    threads = [threading.Thread(target=worker, args=(thread_number, )) for thread_number in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    gc.collect()
+    with analysis.lock:
+        analysis.merge()
+    assert sorted(applied) == [(thread_number, record_number) for thread_number in range(8)
+                               for record_number in range(500)]
+    # The records of every thread are applied in the order in which it deferred them
+    for thread_number in range(8):
+        assert [number for thread, number in applied if thread == thread_number] == list(range(500))
+    assert len(analysis.buffers) == 1
+
+
+def test_merge_of_branches_keeps_the_merging_thread_apart():
+    analysis = ThreadAwareSlice()
+    recorded, finished = threading.Event(), threading.Event()
+
+    def take_branch():
+        analysis.record_branch(("program.py", 3), 3)
+        recorded.set()
+        finished.wait()
+    worker = threading.Thread(target=take_branch)
+    worker.start()
+    recorded.wait()
+    try:
+        with analysis.lock:
+            analysis.merge()
+        # The branch is taken in the worker only, the main thread merged its header without taking it too
+        assert 3 in analysis.lines_info
+        assert analysis.taken_branches == set()
+        assert len(analysis.buffers) == 2
+    finally:
+        finished.set()
+        worker.join()
+
+
+RAISING = '''import threading
+
+
+def slice_me():
+    total = 0
+    noise = 0
+    worker = threading.Thread(target=print, args=("worker", ))
+    worker.start()
+    worker.join()
+    for value in [1, 2, 3]:
+        if value > 1:
+            total += value
+    result = total + 1  # slicing criterion
+    raise ValueError(result)
+
+
+try:
+    slice_me()
+except ValueError:
+    pass
+'''
+
+LINGERING = '''import threading
+
+
+class Box:
+    def __init__(self):
+        self.value = 0
+
+
+def slice_me(raised, written):
+    box = Box()
+
+    def work():
+        raised.wait()
+        box.value = 2
+        written.set()
+        threading.current_thread().release.wait()
+    worker = threading.Thread(target=work, name="lingering", daemon=True)
+    worker.release = threading.Event()
+    worker.start()
+    result = box.value  # slicing criterion
+    raise ValueError(result)
+
+
+raised, written = threading.Event(), threading.Event()
+try:
+    slice_me(raised, written)
+except ValueError:
+    raised.set()
+    written.wait()
+'''
+
+
+def test_records_of_a_raising_invocation_are_merged(tmp_path):
+    program_path = tmp_path / "program.py"
+    program_path.write_text(RAISING)
+    expected = AnalysisSession(Slice).run(str(program_path))
+    assert expected["slices"] == {"13": [5, 10, 11, 12, 13]}
+    # No exit hook runs for the raising invocation, the session merges the records before slicing
+    assert AnalysisSession(ThreadAwareSlice).run(str(program_path))["slices"] == expected["slices"]
+
+
+def test_records_of_a_thread_alive_after_the_invocation_are_merged(tmp_path):
+    program_path = tmp_path / "program.py"
+    program_path.write_text(LINGERING)
+    try:
+        expected = AnalysisSession(Slice).run(str(program_path))
+        session = AnalysisSession(ThreadAwareSlice)
+        result = session.run(str(program_path))
+    finally:
+        for thread in threading.enumerate():
+            if thread.name == "lingering":
+                thread.release.set()
+                thread.join()
+    assert expected["slices"] == {"20": [10, 20]}
+    assert result["slices"] == expected["slices"]
+    # The write of the worker after the invocation ended is merged too
+    assert 14 in session.analysis.lines_info